@@ -6,23 +6,166 @@ Product Data Processing Tool - Developer Test Assignment
 Developed by Sanchit Kathpalia
 LinkedIn: https://www.linkedin.com/in/sanchit-kathpalia-a841b5252/
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import importlib.util
+import json
+import threading
+import time
 
 # Add scraper directory to path
 scraper_dir = os.path.join(os.path.dirname(__file__), '..', 'scraper')
 sys.path.insert(0, scraper_dir)
 
-from scraper import scrape_products
-from data_cleaning import clean_products
-from brand_detection import add_brand_to_products
-from config import SCRAPING_SITES
+# The scraping stack (requests, BeautifulSoup) is imported by the first scrape job,
+# so workers that only serve /api/process, /api/products or /api/health never load it
+from data_cleaning import clean_record, clean_product
+from brand_detection import add_brand, warm_up as warm_up_brands
+from batch_processing import iter_process_chunks
+from data_io import dumps
+from product_record import ProductRecord, to_dict
+import metrics
+from metrics import stage_timer
+from config import SCRAPING_SITES, PROCESS_CONFIG
+from product_store import ProductStore, site_label
+from streaming import RequestText, RequestTooLarge, iter_request_names, choose_encoding, compress_chunks
+from jobs import (JobManager, QueueFull, SiteBusy, job_to_json, SUCCEEDED, FAILED,
+                  CACHE_HIT, CACHE_STALE, CACHE_COALESCED)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Created on first use so each server process (and each forked worker) gets its own pool
+_job_manager = None
+_product_store = None
+_scraper = None
+_init_lock = threading.Lock()  # gunicorn's gthread workers serve requests on several threads
+
+# Seconds between job checks while streaming a scrape
+STREAM_POLL_INTERVAL = 0.2
+
+def load_scraper():
+    """
+    scraper.py, imported on first use
+    Loaded from its path: a plain `import scraper` finds the scraper/ package instead
+    when the scraper directory's parent is on sys.path (e.g. running both test suites)
+    """
+    global _scraper
+    with _init_lock:
+        if _scraper is None:
+            spec = importlib.util.spec_from_file_location('scraper', os.path.join(scraper_dir, 'scraper.py'))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _scraper = module
+    return _scraper
+
+def run_scrape_job(site_key, custom_url, max_products, progress_callback):
+    """Scrape, clean and brand products for a background job, yielding each as it is ready"""
+    iter_scrape_products = load_scraper().iter_scrape_products
+    print(f"Scraping from {site_key}: {custom_url if site_key == 'custom' else 'default'}")
+    products = iter_scrape_products(
+        max_products=max_products,
+        site_key=site_key,
+        custom_url=custom_url if site_key == 'custom' else None,
+        progress_callback=progress_callback,
+        # Also stops a scrape stuck on pages that add no products
+        deadline=time.time() + get_job_manager().store.job_timeout,
+    )
+    scraped = []
+    for product in products:
+        with stage_timer('clean'):
+            record = clean_record(ProductRecord.coerce(product))
+        with stage_timer('brand'):
+            add_brand(record)
+        scraped.append(record)
+        yield to_dict(record)
+    # Keep finished scrapes searchable through /api/products
+    get_product_store().upsert_products(scraped, site_label(site_key, custom_url))
+
+def warm_up():
+    """
+    Open the brand indexes and compile the cleaning patterns ahead of the first request
+    Runs at import, so under gunicorn --preload it happens once in the master and the
+    forked workers share the result copy-on-write
+    """
+    warm_up_brands()
+    add_brand(clean_product({'name': 'Coca Cola 6 x 330ml Can', 'price': 'PMP £1.25', 'volume_weight': '330ML'}))
+
+def get_job_manager():
+    """Job manager for this process"""
+    global _job_manager
+    with _init_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(run_scrape_job)
+    return _job_manager
+
+def get_product_store():
+    """Indexed product store (opened on first use)"""
+    global _product_store
+    with _init_lock:
+        if _product_store is None:
+            _product_store = ProductStore()
+    return _product_store
+
+def cached_response(response, job):
+    """Add ETag/Cache-Control for a finished job and answer 304 if the client has it"""
+    response.set_etag(job['etag'])
+    response.cache_control.private = True
+    response.cache_control.max_age = get_job_manager().cache_max_age(job)
+    return response.make_conditional(request)
+
+def queue_full_response(error):
+    """429 when one site has too many queued scrapes, 503 when the whole queue is full"""
+    status = 429 if isinstance(error, SiteBusy) else 503
+    response = jsonify({
+        'error': f'Too many scrape jobs queued, try again later ({error})',
+        'retryAfter': error.retry_after,
+        'success': False
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def read_scrape_params(data):
+    """Validated (site, url, max_products) from a request body or query string, or an error response"""
+    site_key = data.get('site', 'wegetanystock')
+    custom_url = data.get('url', '')
+    try:
+        max_products = min(int(data.get('maxProducts', 50)), 200)  # Limit to prevent abuse
+    except (TypeError, ValueError):
+        return None, (jsonify({'error': 'maxProducts must be a number', 'success': False}), 400)
+    
+    if site_key == 'custom' and not custom_url:
+        return None, (jsonify({
+            'error': 'URL is required when site is "custom"'
+        }), 400)
+    return (site_key, custom_url if site_key == 'custom' else None, max_products), None
+
+@app.before_request
+def start_request_timer():
+    if metrics.enabled():
+        g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Observe request latency per endpoint; streamed responses count until the body is sent"""
+    start = g.get('request_start')
+    if start is not None:
+        # The route pattern keeps job ids and other path values out of the labels
+        labels = (('endpoint', request.url_rule.rule if request.url_rule else 'unmatched'),
+                  ('method', request.method), ('status', str(response.status_code)))
+        response.call_on_close(lambda: metrics.observe('http_request_seconds', time.perf_counter() - start, labels))
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Runtime metrics in the Prometheus text format"""
+    if not metrics.enabled():
+        return jsonify({'error': 'Metrics are disabled', 'success': False}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -45,59 +188,261 @@ def get_sites():
 @app.route('/api/scrape', methods=['POST'])
 def scrape():
     """
-    Scrape products from a website
+    Start a background scrape job
     
     Request body:
     {
         "site": "wegetanystock" or "custom",
         "url": "https://example.com" (required if site is "custom"),
-        "maxProducts": 100
+        "maxProducts": 100,
+        "refresh": false (skip the result cache)
     }
+    
+    Responds 202 with a job id; poll GET /api/jobs/<jobId> for progress and results.
+    Identical requests share one crawl, and recent results are answered straight
+    away with 200 and the finished job (products included). A full queue answers
+    503 (429 if the backlog is for this one site) with a Retry-After header.
     """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
+        params, error = read_scrape_params(data)
+        if error:
+            return error
         
-        site_key = data.get('site', 'wegetanystock')
-        custom_url = data.get('url', '')
-        max_products = data.get('maxProducts', 50)
+        manager = get_job_manager()
+        job_id, cache_status = manager.submit(*params, use_cache=not data.get('refresh', False))
         
-        # Validate input
-        if site_key == 'custom' and not custom_url:
-            return jsonify({
-                'error': 'URL is required when site is "custom"'
-            }), 400
-        
-        if max_products > 200:
-            max_products = 200  # Limit to prevent abuse
-        
-        # Scrape products
-        print(f"Scraping from {site_key}: {custom_url if site_key == 'custom' else 'default'}")
-        products = scrape_products(
-            max_products=max_products,
-            site_key=site_key,
-            custom_url=custom_url if site_key == 'custom' else None
-        )
-        
-        # Clean products
-        cleaned_products = clean_products(products)
-        
-        # Detect brands
-        final_products = add_brand_to_products(cleaned_products)
+        if cache_status in (CACHE_HIT, CACHE_STALE):
+            job = manager.get(job_id)
+            products = [product for _, product in manager.products(job_id)]
+            response = jsonify(dict(job_to_json(job, products), success=True, cached=True,
+                                    stale=cache_status == CACHE_STALE))
+            return cached_response(response, job)
         
         return jsonify({
             'success': True,
-            'products': final_products,
-            'count': len(final_products),
-            'site': site_key,
-            'url': custom_url if site_key == 'custom' else SCRAPING_SITES.get(site_key, {}).get('base_url', '')
-        })
+            'jobId': job_id,
+            'status': 'queued',
+            'coalesced': cache_status == CACHE_COALESCED,
+            'statusUrl': f'/api/jobs/{job_id}'
+        }), 202
         
+    except QueueFull as e:
+        return queue_full_response(e)
     except Exception as e:
         return jsonify({
             'error': str(e),
             'success': False
         }), 500
 
+@app.route('/api/queue', methods=['GET'])
+def get_queue():
+    """Scrape queue depth, running jobs and wait times, overall and per site"""
+    response = jsonify(dict(get_job_manager().queue_stats(), success=True))
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status of a scrape job: queued, running, succeeded (with products) or failed (with error)
+    Finished jobs carry an ETag, so unchanged results can be revalidated with a 304
+    """
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found', 'success': False}), 404
+    if job['status'] != SUCCEEDED:
+        response = jsonify(dict(job_to_json(job), success=True))
+        response.cache_control.no_store = True
+        return response
+    products = [product for _, product in manager.products(job_id)]
+    return cached_response(jsonify(dict(job_to_json(job, products), success=True)), job)
+
+def stream_timeout(manager):
+    """Seconds a scrape stream follows its job: the longest it may wait, run and go unnoticed if orphaned"""
+    store = manager.store
+    return manager.queue_timeout + store.job_timeout + store.heartbeat_timeout
+
+def format_event(event, sse):
+    """Encode one stream event as an NDJSON line or an SSE message"""
+    data = json.dumps(event, ensure_ascii=False)
+    if sse:
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + '\n'
+
+@app.route('/api/scrape/stream', methods=['GET', 'POST'])
+def scrape_stream():
+    """
+    Scrape products and stream them as they are found
+    
+    Takes the same parameters as POST /api/scrape (JSON body, or query string for GET
+    so EventSource and the browser cache can be used). Responds with NDJSON by default,
+    or Server-Sent Events when the client accepts text/event-stream or passes ?format=sse.
+    The stream follows a scrape job, so it shares crawls and cached results with
+    POST /api/scrape. Events:
+        {"type": "progress", "pagesFetched": 1, "productsFound": 20}
+        {"type": "product", "product": {...cleaned and branded product...}}
+        {"type": "done", "count": 50, "cached": false}
+        {"type": "error", "error": "..."}
+    """
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    params, error = read_scrape_params(data)
+    if error:
+        return error
+    
+    sse = request.args.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+    refresh = str(data.get('refresh', '')).lower() in ('1', 'true')
+    
+    manager = get_job_manager()
+    try:
+        job_id, cache_status = manager.submit(*params, use_cache=not refresh)
+    except QueueFull as e:
+        return queue_full_response(e)
+    cached = cache_status in (CACHE_HIT, CACHE_STALE)
+    
+    def generate():
+        # Follow the job, sending progress and newly stored products until it finishes;
+        # give up once the job has had all the time it may queue and run for
+        deadline = time.monotonic() + stream_timeout(manager)
+        last_seq = 0
+        last_progress = None
+        while True:
+            job = manager.get(job_id)
+            if job is None:
+                yield format_event({'type': 'error', 'error': 'Job expired'}, sse)
+                return
+            progress = (job['pages_fetched'], job['products_found'])
+            if progress != last_progress and not cached:
+                last_progress = progress
+                yield format_event({'type': 'progress', 'pagesFetched': progress[0], 'productsFound': progress[1]}, sse)
+            for seq, product in manager.products(job_id, last_seq):
+                last_seq = seq
+                yield format_event({'type': 'product', 'product': product}, sse)
+            if job['status'] == SUCCEEDED:
+                yield format_event({'type': 'done', 'count': last_seq, 'cached': cached}, sse)
+                return
+            if job['status'] == FAILED:
+                yield format_event({'type': 'error', 'error': job['error']}, sse)
+                return
+            if time.monotonic() > deadline:
+                yield format_event({'type': 'error', 'error': 'Timed out waiting for the scrape job'}, sse)
+                return
+            time.sleep(STREAM_POLL_INTERVAL)
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+    if cached:
+        return cached_response(response, manager.get(job_id))
+    response.cache_control.no_cache = True
+    return response
+
+def format_processed(product):
+    """Frontend representation of a cleaned and branded product"""
+    return {
+        'originalName': product.get('original_name', product.get('name', '')),
+        'cleanedName': product.get('name', ''),
+        'detectedBrand': product.get('brand', 'Unknown'),
+        'brandConfidence': product.get('brand_confidence', 0.0),
+        'price': product.get('price', ''),
+        'volumeWeight': product.get('volume_weight', '')
+    }
+
+def iter_product_names():
+    """
+    Stream product names out of the request body, enforcing PROCESS_CONFIG limits
+    Raises RequestTooLarge (413) or ValueError (400) when the offending name is reached
+    """
+    max_bytes = PROCESS_CONFIG['max_body_bytes']
+    if request.content_length is not None and request.content_length > max_bytes:
+        raise RequestTooLarge(f"Request body is larger than {max_bytes} bytes")
+    
+    max_names = PROCESS_CONFIG['max_names']
+    max_length = PROCESS_CONFIG['max_name_length']
+    reader = RequestText(request.stream, max_bytes)
+    count = 0
+    for name in iter_request_names(reader, request.content_type):
+        if len(name) > max_length:
+            raise RequestTooLarge(f"Product names are limited to {max_length} characters")
+        count += 1
+        if count > max_names:
+            raise RequestTooLarge(f"At most {max_names} product names can be processed per request")
+        yield name
+
+@app.route('/api/products', methods=['GET'])
+def list_products():
+    """
+    Search stored products one page at a time
+    
+    Query parameters (all optional):
+        q: full-text search over name and brand (word prefixes, all must match)
+        brand, site, unit ('ml' or 'g'): exact filters
+        minPrice, maxPrice, minQuantity, maxQuantity: inclusive ranges
+        sort: name, brand, price, quantity, updated or relevance; order: asc or desc
+        limit: page size (max 200); cursor: nextCursor from the previous page
+    """
+    args = request.args
+    try:
+        page = get_product_store().search(
+            q=args.get('q'),
+            brand=args.get('brand'),
+            site=args.get('site'),
+            unit=args.get('unit'),
+            min_price=args.get('minPrice', type=float),
+            max_price=args.get('maxPrice', type=float),
+            min_quantity=args.get('minQuantity', type=float),
+            max_quantity=args.get('maxQuantity', type=float),
+            sort=args.get('sort'),
+            order=args.get('order', 'asc'),
+            limit=args.get('limit', type=int),
+            cursor=args.get('cursor'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    return jsonify({
+        'success': True,
+        'products': page['products'],
+        'count': len(page['products']),
+        'nextCursor': page['next_cursor'],
+    })
+
+@app.route('/api/changes', methods=['GET'])
+def list_changes():
+    """
+    Product changes recorded by delta runs (process_data.py --delta --store), oldest first
+
+    Query parameters (all optional):
+        since: nextSince from the previous page, or an ISO-8601 time (default: from the start)
+        site: only this site; limit: page size (max 200)
+    """
+    args = request.args
+    try:
+        page = get_product_store().changes(since=args.get('since'), site=args.get('site'),
+                                           limit=args.get('limit', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+
+    changes = [{
+        'id': change['id'],
+        'site': change['site'],
+        'key': change['key'],
+        'op': change['op'],
+        'oldPrice': change['old_price'],
+        'newPrice': change['new_price'],
+        'product': change['product'],
+        'changedAt': change['changed_at'],
+    } for change in page['changes']]
+    return jsonify({
+        'success': True,
+        'changes': changes,
+        'count': len(changes),
+        'nextSince': page['next_since'],
+    })
+
 @app.route('/api/process', methods=['POST'])
 def process_products():
     """
@@ -108,47 +453,70 @@ def process_products():
     {
         "productNames": ["Product 1", "Product 2", ...]
     }
+    A bare JSON array, NDJSON (one JSON string per line) or text/plain (one name
+    per line) body is accepted too. The body is parsed as it is read and the
+    response is streamed chunk by chunk, gzip/brotli-compressed for large batches
+    when the client accepts it. Bodies over the PROCESS_CONFIG limits get 413.
+    
+    The first chunk is processed before the response starts, so errors in it still
+    get a 400/413/500. A later failure cannot change the status any more: the JSON
+    is closed with "success": false and an "error" member instead.
     """
+    stats = {}
+    chunks = iter_process_chunks(iter_product_names(), PROCESS_CONFIG['chunk_size'], stats)
     try:
-        data = request.get_json()
-        product_names = data.get('productNames', [])
-        
-        if not product_names:
-            return jsonify({
-                'error': 'productNames array is required'
-            }), 400
-        
-        # Create product objects
-        products = [{'name': name, 'original_name': name} for name in product_names]
-        
-        # Clean products
-        cleaned_products = clean_products(products)
-        
-        # Detect brands
-        final_products = add_brand_to_products(cleaned_products)
-        
-        # Format for frontend
-        result = []
-        for product in final_products:
-            result.append({
-                'originalName': product.get('original_name', product.get('name', '')),
-                'cleanedName': product.get('name', ''),
-                'detectedBrand': product.get('brand', 'Unknown'),
-                'price': product.get('price', ''),
-                'volumeWeight': product.get('volume_weight', '')
-            })
-        
-        return jsonify({
-            'success': True,
-            'products': result,
-            'count': len(result)
-        })
-        
+        first_chunk = next(chunks, None)
+    except RequestTooLarge as e:
+        return jsonify({'error': str(e), 'success': False}), 413
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request body: {e}', 'success': False}), 400
     except Exception as e:
+        return jsonify({'error': str(e), 'success': False}), 500
+    
+    if first_chunk is None:
         return jsonify({
-            'error': str(e),
-            'success': False
-        }), 500
+            'error': 'productNames array is required'
+        }), 400
+    
+    def generate():
+        # Clean and detect brands once per distinct name, chunk by chunk, in input order.
+        # Repeated names share one record, so each distinct product is serialized once.
+        serialized = {}
+        yield b'{"products":['
+        chunk = first_chunk
+        first = True
+        try:
+            while chunk is not None:
+                parts = []
+                for product in chunk:
+                    text = serialized.get(id(product))
+                    if text is None:
+                        text = serialized[id(product)] = dumps(format_processed(product))
+                    parts.append(text)
+                yield (('' if first else ',') + ','.join(parts)).encode('utf-8')
+                first = False
+                chunk = next(chunks, None)
+        except Exception as e:
+            print(f"/api/process failed mid-stream: {e}")
+            yield f'],"success":false,"error":{dumps(str(e))}}}'.encode('utf-8')
+            return
+        yield (f'],"count":{stats["total"]},"uniqueCount":{stats["unique"]},'
+               f'"uniqueRatio":{stats["unique_ratio"]},"success":true}}').encode('utf-8')
+    
+    # Later chunks still read the request body while the response streams
+    body = stream_with_context(generate())
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = None
+    if len(first_chunk) >= min(PROCESS_CONFIG['compress_min_names'], PROCESS_CONFIG['chunk_size']):
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        body = compress_chunks(body, encoding)
+        headers['Content-Encoding'] = encoding
+    
+    return Response(body, mimetype='application/json', headers=headers)
+
+# Once per process at import; with gunicorn --preload that is the master, before forking
+warm_up()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -156,8 +524,13 @@ if __name__ == '__main__':
     print(f"API will be available at http://0.0.0.0:{port}")
     print("Endpoints:")
     print("  GET  /api/health - Health check")
+    print("  GET  /api/metrics - Prometheus metrics")
     print("  GET  /api/sites - List available sites")
-    print("  POST /api/scrape - Scrape from website")
+    print("  POST /api/scrape - Start a scrape job")
+    print("  GET  /api/jobs/<id> - Scrape job status and results")
+    print("  GET  /api/queue - Scrape queue depth and wait times")
+    print("  POST /api/scrape/stream - Scrape and stream products (NDJSON or SSE)")
+    print("  GET  /api/products - Search stored products")
     print("  POST /api/process - Process product names")
     # Always bind to 0.0.0.0 for deployment platforms
     app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the API
+The app is imported once in the master (preload_app), which warms the brand
+indexes and cleaning patterns; workers are forked from it and share those pages
+copy-on-write instead of each repeating the imports.
+
+/api/scrape/stream holds its request open for as long as its job may take
+(app.stream_timeout), so workers are threaded and the timeouts cover a whole
+stream: one open stream must neither block other requests nor be killed midway.
+"""
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraper'))
+from config import JOB_CONFIG
+
+# Longest a scrape stream follows its job: queued, running, then unnoticed if orphaned
+STREAM_SECONDS = JOB_CONFIG['queue_timeout'] + JOB_CONFIG['job_timeout'] + JOB_CONFIG['heartbeat_timeout']
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', min(os.cpu_count() or 1, 4)))  # job limits hold across workers
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))  # open streams plus other requests, per worker
+timeout = STREAM_SECONDS + 30
+graceful_timeout = STREAM_SECONDS + 30  # let streams in progress finish on a restart
+
+
+def when_ready(server):
+    # Move everything built so far out of the collector's reach, so a worker's
+    # first gc pass does not touch (and copy) the pages it shares with the master
+    gc.freeze()
@@ -0,0 +1,606 @@
+"""
+Background scrape jobs
+POST /api/scrape queues a job and returns its id straight away; a bounded pool of
+worker threads runs the scrapes, with a separate concurrency limit per site.
+Job status, progress and products live in SQLite, so any server process can
+answer GET /api/jobs/<id> and nothing beyond the standard library is needed.
+
+Finished jobs double as a result cache: a request whose normalized parameters
+match a recent successful job reuses it, a slightly older one is served stale
+while a refresh runs, and a request matching a queued or running job joins it
+instead of starting a second identical crawl.
+
+Limits hold across server processes (e.g. gunicorn workers) sharing the database:
+queue bounds are checked when a job is created, and the pool size and per-site
+limits when one is started, by counting queued/running rows in the same
+BEGIN IMMEDIATE transaction as the write.
+
+Every job records the server process that owns it, and each JobManager keeps
+heartbeating its queued and running jobs. A job whose owner stopped heartbeating
+(the process crashed or was killed) or that has run past job_timeout is failed
+by the next lookup, so identical requests stop coalescing onto it.
+"""
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from hashlib import blake2b
+from urllib.parse import urlsplit, urlunsplit
+
+import metrics
+from config import JOB_CONFIG, SCRAPING_SITES
+from product_store import site_label
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# submit() cache outcomes
+CACHE_HIT = 'hit'
+CACHE_STALE = 'stale'
+CACHE_COALESCED = 'coalesced'
+CACHE_MISS = 'miss'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    url TEXT,
+    max_products INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    pages_fetched INTEGER NOT NULL DEFAULT 0,
+    products_found INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_products (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+"""
+
+# Columns added after the first release of the jobs table
+MIGRATIONS = (
+    ('cache_key', 'TEXT'),
+    ('etag', 'TEXT'),
+    ('last_used_at', 'REAL'),
+    ('owner', 'TEXT'),
+    ('heartbeat_at', 'REAL'),
+    ('slot', 'TEXT'),
+)
+
+
+def cache_key(site, url, max_products):
+    """Normalized request parameters: scheme and host are case-insensitive, trailing slashes ignored"""
+    normalized_url = ''
+    if url:
+        parts = urlsplit(url.strip())
+        normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                                     parts.path.rstrip('/'), parts.query, ''))
+    return f"{site}|{normalized_url}|{int(max_products)}"
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting (answered with 503)"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SiteBusy(QueueFull):
+    """Raised when too many jobs are already waiting for one site (answered with 429)"""
+
+
+class JobStore:
+    """
+    SQLite-backed job and product tables
+    Each call opens its own short-lived connection, so the store is safe to
+    share between threads and between server processes
+    """
+
+    def __init__(self, path, job_timeout=None, heartbeat_timeout=None):
+        """
+        Args:
+            path: SQLite database file
+            job_timeout: Seconds a job may run before it counts as failed
+            heartbeat_timeout: Seconds without an owner heartbeat before a
+                queued or running job counts as orphaned
+        """
+        self.path = path
+        self.job_timeout = job_timeout or JOB_CONFIG['job_timeout']
+        self.heartbeat_timeout = heartbeat_timeout or JOB_CONFIG['heartbeat_timeout']
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column, column_type in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (cache_key, status, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, slot)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the lock up front, so count-then-write cannot race"""
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _insert(self, conn, site, url, max_products, key, owner):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn.execute(
+            'INSERT INTO jobs (id, site, url, max_products, status, created_at, cache_key, owner, heartbeat_at, slot)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (job_id, site, url, max_products, QUEUED, now, key, owner, now, site_label(site, url)),
+        )
+        return job_id
+
+    def create(self, site, url, max_products, key=None, owner=None):
+        with self._connect() as conn:
+            return self._insert(conn, site, url, max_products, key, owner)
+
+    def enqueue(self, site, url, max_products, key, owner, max_queued, max_queued_for_slot):
+        """
+        Create a queued job unless every process together already has max_queued
+        jobs queued, or max_queued_for_slot for the job's slot
+
+        Returns:
+            (job id or None when a limit is reached, queued jobs, queued jobs for the slot)
+        """
+        with self._transaction() as conn:
+            self._fail_orphans(conn)
+            queued, queued_for_slot = conn.execute(
+                'SELECT COUNT(*), COUNT(CASE WHEN slot = ? THEN 1 END) FROM jobs WHERE status = ?',
+                (site_label(site, url), QUEUED)).fetchone()
+            if queued >= max_queued or queued_for_slot >= max_queued_for_slot:
+                return None, queued, queued_for_slot
+            return self._insert(conn, site, url, max_products, key, owner), queued, queued_for_slot
+
+    def claim(self, job_id, max_running, slot_limit):
+        """
+        Start a queued job if fewer than max_running jobs are running across every
+        process, and fewer than slot_limit for its slot
+
+        Returns:
+            The job's status afterwards: RUNNING once claimed, QUEUED while it has to
+            wait, or the status it reached meanwhile (e.g. FAILED)
+        """
+        with self._transaction() as conn:
+            self._fail_orphans(conn)
+            row = conn.execute('SELECT status, slot FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None or row[0] != QUEUED:
+                return row[0] if row else FAILED
+            running, running_for_slot = conn.execute(
+                'SELECT COUNT(*), COUNT(CASE WHEN slot = ? THEN 1 END) FROM jobs WHERE status = ?',
+                (row[1], RUNNING)).fetchone()
+            if running >= max_running or running_for_slot >= slot_limit:
+                return QUEUED
+            now = time.time()
+            conn.execute('UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?',
+                         (RUNNING, now, now, job_id))
+            return RUNNING
+
+    def active_counts(self):
+        """Queued and running jobs of every process per slot, with the oldest queued time"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT slot, status, COUNT(*), MIN(created_at) FROM jobs WHERE status IN (?, ?) GROUP BY slot, status',
+                (QUEUED, RUNNING)).fetchall()
+        counts = {}
+        for slot, status, count, oldest in rows:
+            entry = counts.setdefault(slot, {QUEUED: 0, RUNNING: 0, 'oldest_queued': None})
+            entry[status] = count
+            if status == QUEUED:
+                entry['oldest_queued'] = oldest
+        return counts
+
+    def heartbeat(self, owner):
+        """Mark every queued or running job of an owner as still alive"""
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)',
+                         (time.time(), owner, QUEUED, RUNNING))
+
+    def _fail_orphans(self, conn):
+        """Fail queued/running jobs whose owner stopped heartbeating or that ran past job_timeout"""
+        now = time.time()
+        timed_out = now - self.job_timeout
+        return conn.execute(
+            'UPDATE jobs SET status = ?, finished_at = ?, error = CASE'
+            '  WHEN status = ? AND started_at < ? THEN ?'
+            '  ELSE ? END'
+            ' WHERE status IN (?, ?) AND (COALESCE(heartbeat_at, created_at) < ?'
+            '  OR (status = ? AND started_at < ?))',
+            (FAILED, now,
+             RUNNING, timed_out, f"Timed out after {self.job_timeout}s",
+             "Abandoned: the server process running it stopped",
+             QUEUED, RUNNING, now - self.heartbeat_timeout, RUNNING, timed_out),
+        ).rowcount
+
+    def sweep(self):
+        """Fail orphaned and timed-out jobs now (run at startup); returns how many"""
+        with self._connect() as conn:
+            return self._fail_orphans(conn)
+
+    def update(self, job_id, **fields):
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def finish(self, job_id, status, **fields):
+        """
+        Record a running job's outcome; returns False (and changes nothing) if the job
+        is no longer running, e.g. an orphan sweep or timeout already failed it
+        """
+        assignments = ', '.join(f'{name} = ?' for name in ('status', *fields))
+        with self._connect() as conn:
+            return conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ? AND status = ?',
+                                (status, *fields.values(), job_id, RUNNING)).rowcount == 1
+
+    def add_product(self, job_id, seq, product):
+        """Store one product of a job (seq counts from 1) and bump its count"""
+        with self._connect() as conn:
+            conn.execute('INSERT INTO job_products (job_id, seq, product) VALUES (?, ?, ?)',
+                         (job_id, seq, json.dumps(product, ensure_ascii=False)))
+            conn.execute('UPDATE jobs SET products_found = MAX(products_found, ?) WHERE id = ?', (seq, job_id))
+
+    def get(self, job_id):
+        """Job row as a dict, or None if unknown"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def products(self, job_id, after=0):
+        """Products stored for a job with seq > after, as (seq, product) pairs in order"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT seq, product FROM job_products WHERE job_id = ? AND seq > ? ORDER BY seq',
+                                (job_id, after)).fetchall()
+        return [(seq, json.loads(product)) for seq, product in rows]
+
+    def find(self, key):
+        """
+        Newest succeeded job and newest queued/running job for a cache key (either may be None)
+        Orphaned and timed-out jobs are failed first, so they are never joined
+        """
+        with self._connect() as conn:
+            self._fail_orphans(conn)
+            conn.row_factory = sqlite3.Row
+            done = conn.execute(
+                'SELECT * FROM jobs WHERE cache_key = ? AND status = ? ORDER BY finished_at DESC LIMIT 1',
+                (key, SUCCEEDED)).fetchone()
+            in_flight = conn.execute(
+                'SELECT * FROM jobs WHERE cache_key = ? AND status IN (?, ?) ORDER BY created_at DESC LIMIT 1',
+                (key, QUEUED, RUNNING)).fetchone()
+        return (dict(done) if done else None), (dict(in_flight) if in_flight else None)
+
+    def purge(self, older_than, max_results=None):
+        """
+        Delete jobs that finished before older_than, then the least recently used
+        finished jobs beyond max_results
+        """
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (older_than,))
+            if max_results is not None:
+                conn.execute(
+                    'DELETE FROM jobs WHERE finished_at IS NOT NULL AND id NOT IN ('
+                    ' SELECT id FROM jobs WHERE finished_at IS NOT NULL'
+                    ' ORDER BY COALESCE(last_used_at, finished_at) DESC LIMIT ?)',
+                    (max_results,))
+            conn.execute('DELETE FROM job_products WHERE job_id NOT IN (SELECT id FROM jobs)')
+
+
+class JobManager:
+    """
+    Bounded scrape job scheduler (admission control)
+    Jobs wait in a FIFO queue per site (per host for custom URLs) and are started
+    while the pool has a free worker and their site is below its concurrency limit;
+    sites are served round-robin so one busy site cannot starve the others. The
+    queues are bounded overall and per site, and a job that waits longer than
+    queue_timeout fails instead of running late. The limits count the jobs of
+    every process sharing the store; each process only runs the jobs it queued.
+    """
+
+    def __init__(self, run_job, store=None, max_workers=None, per_site_limit=None,
+                 site_limits=None, max_pending=None, cache_ttl=None, stale_ttl=None,
+                 max_cached_results=None, max_pending_per_site=None, queue_timeout=None):
+        """
+        Args:
+            run_job: Callable(site, url, max_products, progress_callback) returning
+                an iterable of JSON-serializable products; products are stored as
+                they are produced, so a generator makes them visible early
+            store: JobStore (default: JOB_CONFIG['database'])
+        """
+        self.run_job = run_job
+        self.store = store or JobStore(JOB_CONFIG['database'])
+        self.max_workers = max_workers or JOB_CONFIG['max_workers']
+        self.per_site_limit = per_site_limit or JOB_CONFIG['per_site_limit']
+        self.site_limits = JOB_CONFIG['site_limits'] if site_limits is None else site_limits
+        self.max_pending = JOB_CONFIG['max_pending'] if max_pending is None else max_pending
+        self.cache_ttl = JOB_CONFIG['cache_ttl'] if cache_ttl is None else cache_ttl
+        self.stale_ttl = JOB_CONFIG['stale_while_revalidate'] if stale_ttl is None else stale_ttl
+        self.max_cached_results = max_cached_results or JOB_CONFIG['max_cached_results']
+        self.max_pending_per_site = max_pending_per_site or JOB_CONFIG['max_pending_per_site']
+        self.queue_timeout = queue_timeout or JOB_CONFIG['queue_timeout']
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scrape-job')
+        self._lock = threading.Lock()
+        self._pending = {}  # slot -> deque of (job id, site, url, max_products, queued at)
+        self._pending_count = 0
+        self._running = {}  # slot -> running job count
+        self._running_count = 0
+        self._average_run = JOB_CONFIG['estimated_job_seconds']  # moving average of job duration
+        self._average_wait = 0.0  # moving average of queue wait
+
+        # Jobs left queued or running by a process that died are failed before any are joined
+        swept = self.store.sweep()
+        if swept:
+            print(f"Failed {swept} orphaned scrape jobs")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_interval = JOB_CONFIG['heartbeat_interval']
+        self.dispatch_interval = JOB_CONFIG['dispatch_interval']
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat, name='scrape-job-heartbeat', daemon=True).start()
+
+    def site_limit(self, slot, site=None):
+        """Concurrent jobs allowed for a slot (a site key, or a host for custom URLs)"""
+        return self.site_limits.get(slot, self.site_limits.get(site, self.per_site_limit))
+
+    def retry_after(self, jobs_ahead, workers):
+        """Seconds until a slot is likely to free up, from the average job duration"""
+        estimate = math.ceil(self._average_run * (jobs_ahead + 1) / max(workers, 1))
+        return max(1, min(estimate, self.queue_timeout))
+
+    def submit(self, site, url=None, max_products=50, use_cache=True):
+        """
+        Get a job for a scrape request, reusing cached or in-flight work when possible
+
+        Returns:
+            (job id, cache outcome): CACHE_HIT for a fresh finished job, CACHE_STALE for
+            an expired one still inside the stale window (a refresh is started alongside),
+            CACHE_COALESCED for an identical queued/running job, CACHE_MISS for a new job.
+            Raises QueueFull when a new job is needed and the queue is full.
+        """
+        key = cache_key(site, url, max_products)
+        with self._lock:
+            if use_cache:
+                done, in_flight = self.store.find(key)
+                age = time.time() - done['finished_at'] if done else None
+                if done and age <= self.cache_ttl:
+                    self.store.update(done['id'], last_used_at=time.time())
+                    return done['id'], CACHE_HIT
+                if done and age <= self.cache_ttl + self.stale_ttl:
+                    self.store.update(done['id'], last_used_at=time.time())
+                    if in_flight is None:
+                        try:
+                            self._enqueue(site, url, max_products, key)
+                        except QueueFull:
+                            pass  # the stale result is still served
+                    return done['id'], CACHE_STALE
+                if in_flight:
+                    return in_flight['id'], CACHE_COALESCED
+            job_id = self._enqueue(site, url, max_products, key)
+        self.store.purge(time.time() - JOB_CONFIG['retention_seconds'], self.max_cached_results)
+        return job_id, CACHE_MISS
+
+    def _enqueue(self, site, url, max_products, key):
+        """Create and queue a new job (lock held)"""
+        self._expire_pending()
+        slot = site_label(site, url)
+        job_id, queued, queued_for_site = self.store.enqueue(
+            site, url, max_products, key, self.owner, self.max_pending, self.max_pending_per_site)
+        if job_id is None and queued >= self.max_pending:
+            metrics.inc('scrape_rejections_total', (('reason', 'queue_full'),))
+            raise QueueFull(f"{queued} jobs are already queued",
+                            self.retry_after(queued, self.max_workers))
+        if job_id is None:
+            metrics.inc('scrape_rejections_total', (('reason', 'site_busy'),))
+            raise SiteBusy(f"{queued_for_site} jobs are already queued for {slot}",
+                           self.retry_after(queued_for_site, self.site_limit(slot, site)))
+        self._pending.setdefault(slot, deque()).append((job_id, site, url, max_products, time.time()))
+        self._pending_count += 1
+        self._dispatch()
+        return job_id
+
+    def _expire_pending(self):
+        """Fail queued jobs that have waited past the queue deadline (lock held)"""
+        deadline = time.time() - self.queue_timeout
+        for slot in list(self._pending):
+            queue = self._pending[slot]
+            while queue and queue[0][4] < deadline:
+                job_id = queue.popleft()[0]
+                self._pending_count -= 1
+                metrics.inc('scrape_rejections_total', (('reason', 'deadline'),))
+                self.store.update(job_id, status=FAILED, finished_at=time.time(),
+                                  error=f"Timed out after {self.queue_timeout}s waiting for a worker")
+            if not queue:
+                del self._pending[slot]
+        self._publish_gauges()
+
+    def _publish_gauges(self):
+        metrics.set_gauge('scrape_queue_depth', self._pending_count)
+        metrics.set_gauge('scrape_jobs_running', self._running_count)
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire_pending()
+        return self.store.get(job_id)
+
+    def products(self, job_id, after=0):
+        return self.store.products(job_id, after)
+
+    def cache_max_age(self, job):
+        """Seconds a finished job's result stays fresh"""
+        if job['status'] != SUCCEEDED:
+            return 0
+        return max(0, int(job['finished_at'] + self.cache_ttl - time.time()))
+
+    def stats(self):
+        with self._lock:
+            return {'queued': self._pending_count, 'running': self._running_count}
+
+    def queue_stats(self):
+        """Queue depth, running jobs and wait times, overall and per site, across every process"""
+        with self._lock:
+            self._expire_pending()
+        now = time.time()
+        sites = {}
+        for slot, counts in self.store.active_counts().items():
+            oldest = counts['oldest_queued']
+            sites[slot] = {
+                'queued': counts[QUEUED],
+                'running': counts[RUNNING],
+                'oldestWaitSeconds': round(now - oldest, 1) if oldest else 0,
+            }
+        return {
+            'queued': sum(site['queued'] for site in sites.values()),
+            'running': sum(site['running'] for site in sites.values()),
+            'maxWorkers': self.max_workers,
+            'maxPending': self.max_pending,
+            'averageWaitSeconds': round(self._average_wait, 2),
+            'averageRunSeconds': round(self._average_run, 2),
+            'sites': sites,
+        }
+
+    def _dispatch(self):
+        """
+        Start every queued job of this process that fits the pool and its site limit
+        (lock held); the store has the final say, since other processes count too
+        """
+        self._expire_pending()
+        started = True
+        while started and self._running_count < self.max_workers:
+            started = False
+            for slot in list(self._pending):
+                queue = self._pending[slot]
+                job_id, site, url, max_products, queued_at = queue[0]
+                limit = self.site_limit(slot, site)
+                if self._running.get(slot, 0) >= limit:
+                    continue
+                status = self.store.claim(job_id, self.max_workers, limit)
+                if status == QUEUED:
+                    continue
+                queue.popleft()
+                if not queue:
+                    del self._pending[slot]
+                self._pending_count -= 1
+                if status != RUNNING:
+                    continue  # failed meanwhile, e.g. by another process's orphan sweep
+                self._running[slot] = self._running.get(slot, 0) + 1
+                self._running_count += 1
+                wait = time.time() - queued_at
+                self._average_wait = 0.8 * self._average_wait + 0.2 * wait
+                metrics.observe('scrape_queue_wait_seconds', wait)
+                self._executor.submit(self._run, job_id, site, url, max_products, slot)
+                started = True
+                if self._running_count >= self.max_workers:
+                    break
+        self._publish_gauges()
+
+    def _heartbeat(self):
+        """
+        Keep this process's jobs from being reclaimed as orphans while it is alive, and
+        retry its queued jobs: a slot freed by another process sends no signal here
+        """
+        last_beat = time.time()
+        while not self._stopped.wait(self.dispatch_interval):
+            try:
+                with self._lock:
+                    if self._pending_count:
+                        self._dispatch()
+                if time.time() - last_beat >= self.heartbeat_interval:
+                    self.store.heartbeat(self.owner)
+                    # Watchdog: a job stuck past job_timeout fails on time, whatever its thread is doing
+                    self.store.sweep()
+                    last_beat = time.time()
+            except sqlite3.Error as e:
+                print(f"Warning: scrape job heartbeat failed: {e}")
+
+    def _run(self, job_id, site, url, max_products, slot):
+        store = self.store
+        started_at = time.time()  # claim() marked the job running
+
+        def progress(pages_fetched, products_found):
+            store.update(job_id, pages_fetched=pages_fetched)
+
+        try:
+            digest = blake2b(digest_size=16)
+            seq = 0
+            for product in self.run_job(site, url, max_products, progress):
+                if time.time() - started_at > store.job_timeout:
+                    raise TimeoutError(f"Timed out after {store.job_timeout}s")
+                seq += 1
+                store.add_product(job_id, seq, product)
+                digest.update(json.dumps(product, sort_keys=True).encode('utf-8'))
+            if not store.finish(job_id, SUCCEEDED, etag=digest.hexdigest(), finished_at=time.time()):
+                print(f"Scrape job {job_id} finished after it had already failed")
+        except Exception as e:
+            print(f"Scrape job {job_id} failed: {e}")
+            store.finish(job_id, FAILED, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._average_run = 0.8 * self._average_run + 0.2 * (time.time() - started_at)
+                self._running[slot] -= 1
+                if not self._running[slot]:
+                    del self._running[slot]
+                self._running_count -= 1
+                self._dispatch()
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait)
+
+
+def job_to_json(job, products=None):
+    """API representation of a job row, with its products when given"""
+    site = job['site']
+    data = {
+        'jobId': job['id'],
+        'status': job['status'],
+        'site': site,
+        'url': job['url'] if site == 'custom' else SCRAPING_SITES.get(site, {}).get('base_url', ''),
+        'progress': {
+            'pagesFetched': job['pages_fetched'],
+            'productsFound': job['products_found'],
+            'maxProducts': job['max_products'],
+        },
+        'createdAt': job['created_at'],
+        'startedAt': job['started_at'],
+        'finishedAt': job['finished_at'],
+    }
+    if products is not None:
+        data['products'] = products
+        data['count'] = len(products)
+    if job['status'] == FAILED:
+        data['error'] = job['error']
+    return data
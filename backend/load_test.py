@@ -0,0 +1,115 @@
+"""
+Load test for POST /api/process
+Sends batches of synthetic product names from several threads and reports
+throughput. Runs in-process through the Flask test client unless --url is given.
+
+Usage:
+    python load_test.py --names 100000 --threads 4 --requests 8
+    python load_test.py --url http://localhost:5000 --format ndjson
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scraper'))
+
+BRANDS = ['Coca Cola', 'Pepsi', 'Heinz', 'Cadbury', 'Walkers', 'Nestle', 'Kelloggs', 'Lipton']
+ITEMS = ['Cola', 'Max', 'Baked Beans', 'Dairy Milk', 'Crisps', 'Cereal', 'Tea Bags', 'Soup']
+SIZES = ['330ml', '500ml', '1L', '2L', '415g', '200g', '6 x 330ml', '12 Pack']
+
+
+def make_names(count, distinct, seed=0):
+    """Build `count` names drawn from `distinct` variants, like a pasted catalog"""
+    rng = random.Random(seed)
+    pool = [f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} {rng.choice(SIZES)}"
+            for _ in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def encode_body(names, body_format):
+    """Request body and content type for one of the accepted formats"""
+    if body_format == 'ndjson':
+        return '\n'.join(json.dumps(name) for name in names).encode('utf-8'), 'application/x-ndjson'
+    if body_format == 'text':
+        return '\n'.join(names).encode('utf-8'), 'text/plain'
+    return json.dumps({'productNames': names}).encode('utf-8'), 'application/json'
+
+
+def make_sender(url):
+    """Return send(body, content_type) -> (status, response bytes on the wire)"""
+    headers = {'Accept-Encoding': 'gzip, br'}
+    if url:
+        import requests
+        session = requests.Session()
+
+        def send(body, content_type):
+            response = session.post(f"{url.rstrip('/')}/api/process", data=body,
+                                    headers={**headers, 'Content-Type': content_type}, stream=True)
+            size = sum(len(chunk) for chunk in response.raw.stream(65536, decode_content=False))
+            return response.status_code, size
+        return send
+
+    from app import app
+    client = app.test_client()
+
+    def send(body, content_type):
+        response = client.post('/api/process', data=body, content_type=content_type, headers=headers)
+        return response.status_code, len(response.get_data())
+    return send
+
+
+def run_load_test(names=100000, distinct=2000, threads=4, requests_count=8,
+                  body_format='json', url=None):
+    """Send requests_count requests of `names` names each; returns a summary dict"""
+    body, content_type = encode_body(make_names(names, distinct), body_format)
+    send = make_sender(url)
+    latencies = []
+
+    def one_request(_):
+        start = time.perf_counter()
+        status, size = send(body, content_type)
+        latencies.append(time.perf_counter() - start)
+        return status, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one_request, range(requests_count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    failed = sum(1 for status, _ in results if status != 200)
+    return {
+        'requests': requests_count,
+        'failed': failed,
+        'names_per_second': round(names * (requests_count - failed) / elapsed),
+        'request_bytes': len(body),
+        'response_bytes': results[0][1] if results else 0,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1),
+        'elapsed_s': round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test POST /api/process')
+    parser.add_argument('--names', type=int, default=100000, help='Names per request (default: 100000)')
+    parser.add_argument('--distinct', type=int, default=2000, help='Distinct names per request (default: 2000)')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent clients (default: 4)')
+    parser.add_argument('--requests', type=int, default=8, help='Total requests (default: 8)')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'text'], default='json', help='Request body format')
+    parser.add_argument('--url', help='Server base URL (default: in-process test client)')
+    args = parser.parse_args()
+
+    print(f"Sending {args.requests} x {args.names} names ({args.format}) with {args.threads} threads "
+          f"to {args.url or 'in-process app'}...")
+    summary = run_load_test(args.names, args.distinct, args.threads, args.requests, args.format, args.url)
+    for key, value in summary.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
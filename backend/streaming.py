@@ -0,0 +1,182 @@
+"""
+Streaming request and response helpers for high-volume endpoints
+Request bodies are decoded and parsed incrementally under a byte limit, and
+responses can be compressed chunk by chunk with gzip or brotli
+"""
+import codecs
+import json
+import re
+import zlib
+
+try:
+    import brotli  # Optional: brotli response compression
+except ImportError:
+    brotli = None
+
+from data_io import READ_CHUNK_SIZE, iter_json_array, loads
+
+# Matches the start of {"productNames": [...]} so the array can be streamed
+NAMES_OBJECT_PREFIX = re.compile(r'\s*\{\s*"productNames"\s*:\s*(?=\[)')
+
+
+class RequestTooLarge(Exception):
+    """Raised when a request body exceeds a configured limit (answered with 413)"""
+
+
+class RequestText:
+    """
+    Text reader over a binary request stream
+    Decodes UTF-8 incrementally and raises RequestTooLarge past max_bytes
+    """
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.pending = ''
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def unread(self, text):
+        """Push text back so the next read returns it first"""
+        self.pending = text + self.pending
+
+    def read(self, size=READ_CHUNK_SIZE):
+        if self.pending:
+            text, self.pending = self.pending, ''
+            return text
+        while True:
+            data = self.stream.read(size)
+            self.bytes_read += len(data)
+            if self.bytes_read > self.max_bytes:
+                raise RequestTooLarge(f"Request body is larger than {self.max_bytes} bytes")
+            text = self._decoder.decode(data, final=not data)
+            # An incomplete multi-byte character decodes to '' - keep reading
+            if text or not data:
+                return text
+
+
+def iter_lines(reader):
+    """Yield lines from a RequestText without their line endings"""
+    buffer = ''
+    while True:
+        chunk = reader.read()
+        if not chunk:
+            break
+        buffer += chunk
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')
+    if buffer:
+        yield buffer.rstrip('\r')
+
+
+def iter_request_names(reader, content_type):
+    """
+    Stream product names out of a request body
+
+    Accepts {"productNames": [...]} or a bare JSON array (application/json),
+    one JSON string per line (application/x-ndjson), or one raw name per line
+    (text/plain). Blank lines are skipped; blank names in JSON are kept.
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+
+    if content_type == 'text/plain':
+        for line in iter_lines(reader):
+            if line.strip():
+                yield line.strip()
+        return
+
+    if content_type in ('application/x-ndjson', 'application/jsonl'):
+        for line in iter_lines(reader):
+            if line.strip():
+                yield _name(loads(line))
+        return
+
+    head = reader.read()
+    match = NAMES_OBJECT_PREFIX.match(head)
+    if match:
+        reader.unread(head[match.end():])
+        # Anything after the array (closing brace, other keys) is ignored
+        for value in iter_json_array(reader, allow_trailing=True):
+            yield _name(value)
+        return
+
+    if head.lstrip().startswith('['):
+        reader.unread(head)
+        for value in iter_json_array(reader):
+            yield _name(value)
+        return
+
+    # Any other JSON object layout: parse it whole (still bounded by the byte limit)
+    parts = [head]
+    while True:
+        chunk = reader.read()
+        if not chunk:
+            break
+        parts.append(chunk)
+    data = json.loads(''.join(parts) or 'null')
+    if not isinstance(data, dict) or not isinstance(data.get('productNames', []), list):
+        raise ValueError('productNames array is required')
+    for value in data.get('productNames', []):
+        yield _name(value)
+
+
+def _name(value):
+    if not isinstance(value, str):
+        raise ValueError('productNames must contain strings')
+    return value
+
+
+def parse_accept_encoding(accept_encoding):
+    """{coding: q} from an Accept-Encoding header; a malformed q counts as 0"""
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.lower()] = q
+    return weights
+
+
+def choose_encoding(accept_encoding):
+    """
+    Best supported content coding from an Accept-Encoding header, or None
+    Codings with q=0 are refused; '*' stands for any coding not listed. The highest
+    q wins, and brotli wins a tie
+    """
+    weights = parse_accept_encoding(accept_encoding)
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress_chunks(chunks, encoding):
+    """Compress an iterable of byte strings on the fly with gzip or brotli"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,20 @@
+"""
+pytest setup for the backend tests
+Puts the backend and scraper directories first on sys.path, as the app does, so the
+tests import the same modules whether or not scraper/tests ran first in this session
+"""
+import os
+import sys
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+scraper_dir = os.path.join(os.path.dirname(backend_dir), 'scraper')
+
+for path in (scraper_dir, backend_dir):
+    if path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+
+# Collecting scraper/tests imports scraper/ as the `scraper` package, which hides scraper.py
+cached = sys.modules.get('scraper')
+if cached is not None and hasattr(cached, '__path__'):
+    del sys.modules['scraper']
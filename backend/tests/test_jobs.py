@@ -0,0 +1,283 @@
+"""
+Unit tests for background scrape jobs
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add backend and scraper directories to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(backend_dir, '..', 'scraper'))
+sys.path.insert(0, backend_dir)
+
+from jobs import (JobManager, JobStore, QueueFull, SiteBusy, job_to_json, cache_key, SUCCEEDED, FAILED,
+                  QUEUED, RUNNING, CACHE_HIT, CACHE_STALE, CACHE_COALESCED, CACHE_MISS)
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+def test_site_limits():
+    """Test the pool size and per-site limits bound running jobs"""
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+    peak = {}
+
+    def run_job(site, url, max_products, progress):
+        with lock:
+            running.append(site)
+            peak[site] = max(peak.get(site, 0), running.count(site))
+        progress(1, max_products)
+        release.wait(5)
+        with lock:
+            running.remove(site)
+        return [{'name': f'{site} product'}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = JobManager(run_job, JobStore(os.path.join(tmp, 'jobs.db')),
+                             max_workers=2, per_site_limit=1, max_pending=3)
+        ids = [manager.submit('a', None, 5, use_cache=False)[0] for _ in range(3)] + [manager.submit('b', None, 5)[0]]
+        wait_for(lambda: len(running) == 2)
+        assert manager.stats() == {'queued': 2, 'running': 2}
+        assert sorted(running) == ['a', 'b']
+
+        try:
+            manager.submit('c', use_cache=False)
+            manager.submit('c', use_cache=False)
+            assert False, "expected QueueFull"
+        except QueueFull:
+            pass
+
+        release.set()
+        wait_for(lambda: all(manager.get(job_id)['status'] == SUCCEEDED for job_id in ids))
+        assert max(peak.values()) == 1
+
+        products = [product for _, product in manager.products(ids[0])]
+        job = job_to_json(manager.get(ids[0]), products)
+        assert job['progress'] == {'pagesFetched': 1, 'productsFound': 1, 'maxProducts': 5}
+        assert job['products'] == [{'name': 'a product'}]
+        manager.shutdown()
+    print("✅ site limit tests passed")
+
+def test_failed_job():
+    """Test errors are recorded on the job"""
+    def run_job(site, url, max_products, progress):
+        raise ValueError("site unreachable")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = JobManager(run_job, JobStore(os.path.join(tmp, 'jobs.db')), max_workers=1)
+        job_id, _ = manager.submit('a')
+        wait_for(lambda: manager.get(job_id)['status'] == FAILED)
+        assert job_to_json(manager.get(job_id))['error'] == "site unreachable"
+        assert manager.get('missing') is None
+        manager.shutdown()
+    print("✅ failed job tests passed")
+
+def test_result_cache():
+    """Test identical requests share in-flight jobs and reuse fresh or stale results"""
+    release = threading.Event()
+    crawls = []
+
+    def run_job(site, url, max_products, progress):
+        crawls.append(url)
+        release.wait(5)
+        yield {'name': f'crawl {len(crawls)}'}
+
+    assert cache_key('custom', 'HTTPS://Shop.example/drinks/', 5) == cache_key('custom', 'https://shop.example/drinks', 5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = JobManager(run_job, JobStore(os.path.join(tmp, 'jobs.db')), max_workers=2,
+                             cache_ttl=60, stale_ttl=60, max_cached_results=1)
+        first, outcome = manager.submit('custom', 'https://shop.example/drinks', 5)
+        assert outcome == CACHE_MISS
+        assert manager.submit('custom', 'https://SHOP.example/drinks/', 5) == (first, CACHE_COALESCED)
+        release.set()
+        wait_for(lambda: manager.get(first)['status'] == SUCCEEDED)
+        assert manager.submit('custom', 'https://shop.example/drinks', 5) == (first, CACHE_HIT)
+        assert manager.get(first)['etag']
+        assert len(crawls) == 1
+
+        # Past the TTL the old result is served while one refresh job runs
+        release.clear()
+        manager.store.update(first, finished_at=time.time() - 90)
+        assert manager.submit('custom', 'https://shop.example/drinks', 5) == (first, CACHE_STALE)
+        assert manager.submit('custom', 'https://shop.example/drinks', 5) == (first, CACHE_STALE)
+        release.set()
+        wait_for(lambda: len(crawls) == 2 and manager.stats()['running'] == 0)
+        refreshed, outcome = manager.submit('custom', 'https://shop.example/drinks', 5)
+        assert outcome == CACHE_HIT and refreshed != first
+        assert manager.products(refreshed) == [(1, {'name': 'crawl 2'})]
+
+        # Only the most recently used finished job is kept
+        manager.submit('b', None, 5)
+        wait_for(lambda: manager.stats()['running'] == 0 and len(crawls) == 3)
+        manager.store.purge(0, 1)
+        assert manager.get(first) is None and manager.products(first) == []
+        manager.shutdown()
+    print("✅ result cache tests passed")
+
+def test_admission_control():
+    """Test per-host queues are bounded and jobs waiting past the deadline fail"""
+    release = threading.Event()
+
+    def run_job(site, url, max_products, progress):
+        release.wait(5)
+        return []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = JobManager(run_job, JobStore(os.path.join(tmp, 'jobs.db')), max_workers=3,
+                             per_site_limit=1, max_pending_per_site=2, queue_timeout=0.5)
+        # Custom URLs are limited per host
+        first = manager.submit('custom', 'https://a.example/drinks', 5)[0]
+        queued = [manager.submit('custom', f'https://A.example/page{i}', 5)[0] for i in range(2)]
+        other = manager.submit('custom', 'https://b.example/', 5)[0]
+        try:
+            manager.submit('custom', 'https://a.example/more', 5)
+            assert False, "expected SiteBusy"
+        except SiteBusy as e:
+            assert isinstance(e, QueueFull) and e.retry_after >= 1
+
+        stats = manager.queue_stats()
+        assert stats['queued'] == 2 and stats['running'] == 2
+        assert stats['sites']['a.example']['queued'] == 2 and stats['sites']['a.example']['running'] == 1
+        assert stats['sites']['b.example']['running'] == 1
+
+        # Still queued after the deadline: the jobs fail instead of running late
+        time.sleep(0.6)
+        assert all(manager.get(job_id)['status'] == FAILED for job_id in queued)
+        assert 'waiting for a worker' in manager.get(queued[0])['error']
+        assert manager.queue_stats()['queued'] == 0
+
+        release.set()
+        wait_for(lambda: manager.get(first)['status'] == SUCCEEDED and manager.get(other)['status'] == SUCCEEDED)
+        manager.shutdown()
+    print("✅ admission control tests passed")
+
+def test_limits_across_processes():
+    """Test managers sharing a store (like gunicorn workers) share the pool, site limits and queue bounds"""
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+    peaks = []
+
+    def run_job(site, url, max_products, progress):
+        with lock:
+            running.append(site)
+            peaks.append((len(running), running.count(site)))
+        release.wait(5)
+        with lock:
+            running.remove(site)
+        return []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        managers = [JobManager(run_job, JobStore(path), max_workers=2, per_site_limit=1, max_pending=3)
+                    for _ in range(2)]
+        ids = [managers[0].submit('a', None, 5)[0], managers[1].submit('a', None, 6)[0],
+               managers[1].submit('b', None, 5)[0]]
+        wait_for(lambda: len(running) == 2)
+        # Site a is busy in the other process, so the second a job waits
+        assert managers[1].get(ids[1])['status'] == QUEUED
+        # The pool is full across both processes
+        ids.append(managers[0].submit('c', None, 5)[0])
+        assert managers[0].get(ids[3])['status'] == QUEUED
+        stats = managers[1].queue_stats()
+        assert (stats['queued'], stats['running']) == (2, 2) and stats['sites']['a'] == {
+            'queued': 1, 'running': 1, 'oldestWaitSeconds': stats['sites']['a']['oldestWaitSeconds']}
+
+        # max_pending counts the queued jobs of both processes
+        ids.append(managers[1].submit('d', None, 5)[0])
+        try:
+            managers[0].submit('e', None, 5)
+            assert False, "expected QueueFull"
+        except QueueFull:
+            pass
+
+        release.set()
+        wait_for(lambda: all(managers[0].get(job_id)['status'] == SUCCEEDED for job_id in ids), timeout=10)
+        assert max(total for total, _ in peaks) == 2 and max(per_site for _, per_site in peaks) == 1
+        for manager in managers:
+            manager.shutdown()
+    print("✅ cross-process limit tests passed")
+
+def test_orphaned_jobs():
+    """Test jobs left behind by a dead process, or running too long, are failed instead of joined"""
+    def run_job(site, url, max_products, progress):
+        return [{'name': 'fresh crawl'}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(os.path.join(tmp, 'jobs.db'), job_timeout=60, heartbeat_timeout=30)
+        now = time.time()
+        # Owner crashed: no heartbeat for longer than heartbeat_timeout
+        crashed = store.create('a', None, 5, cache_key('a', None, 5), owner='dead-process')
+        store.update(crashed, status=RUNNING, started_at=now - 40, heartbeat_at=now - 40)
+        # Owner alive but the scrape has been running past job_timeout
+        stuck = store.create('b', None, 5, cache_key('b', None, 5), owner='live-process')
+        store.update(stuck, status=RUNNING, started_at=now - 90, heartbeat_at=now)
+
+        # The startup sweep fails both
+        manager = JobManager(run_job, store, max_workers=1)
+        assert manager.get(crashed)['status'] == FAILED and 'Abandoned' in manager.get(crashed)['error']
+        assert manager.get(stuck)['error'] == "Timed out after 60s"
+
+        # find() applies the same rule to jobs orphaned after startup
+        orphan = store.create('c', None, 5, cache_key('c', None, 5), owner='dead-process')
+        store.update(orphan, heartbeat_at=now - 40)
+        job_id, outcome = manager.submit('c', None, 5)
+        assert outcome == CACHE_MISS and job_id != orphan
+        assert manager.get(orphan)['status'] == FAILED
+        wait_for(lambda: manager.get(job_id)['status'] == SUCCEEDED)
+
+        # A live owner's heartbeat keeps its jobs from being reclaimed
+        mine = store.create('d', None, 5, cache_key('d', None, 5), owner=manager.owner)
+        store.update(mine, heartbeat_at=now - 40)
+        store.heartbeat(manager.owner)
+        assert store.sweep() == 0 and store.find(cache_key('d', None, 5))[1]['id'] == mine
+        manager.shutdown()
+    print("✅ orphaned job tests passed")
+
+def test_stuck_job():
+    """Test a job stuck in its scrape fails on time and its late finish cannot undo that"""
+    release = threading.Event()
+
+    def run_job(site, url, max_products, progress):
+        release.wait(5)  # a page that never returns
+        return []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = JobManager(run_job, JobStore(os.path.join(tmp, 'jobs.db'), job_timeout=0.3), max_workers=1)
+        manager.heartbeat_interval = 0  # sweep on every watchdog pass
+        job_id = manager.submit('a', None, 5)[0]
+        wait_for(lambda: manager.get(job_id)['status'] == FAILED)
+        assert manager.get(job_id)['error'] == "Timed out after 0.3s"
+
+        release.set()
+        manager.shutdown()  # waits for the run to finish
+        job = manager.get(job_id)
+        assert job['status'] == FAILED and job['etag'] is None
+    print("✅ stuck job tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Job Tests")
+    print("=" * 50)
+    test_site_limits()
+    test_failed_job()
+    test_result_cache()
+    test_admission_control()
+    test_limits_across_processes()
+    test_orphaned_jobs()
+    test_stuck_job()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
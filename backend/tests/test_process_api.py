@@ -0,0 +1,102 @@
+"""
+Unit tests for the product name processing endpoint
+"""
+import sys
+import os
+import gzip
+import json
+
+# Add backend and scraper directories to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(backend_dir, '..', 'scraper'))
+sys.path.insert(0, backend_dir)
+
+from config import PROCESS_CONFIG
+from app import app
+import streaming
+from streaming import choose_encoding
+
+def test_request_formats():
+    """Test JSON object, bare array, NDJSON and plain text bodies give the same products"""
+    client = app.test_client()
+    names = ['Coca Cola 330ml Can', 'coca cola 330ml can', 'Coca Cola 330ml Can']
+
+    data = client.post('/api/process', json={'productNames': names, 'source': 'paste'}).get_json()
+    assert data['success'] is True
+    assert data['count'] == 3 and data['uniqueCount'] == 2
+    assert data['products'][0]['detectedBrand'] == 'Coca-Cola'
+    assert data['products'][0] == data['products'][2]
+
+    assert client.post('/api/process', json=names).get_json() == data
+    ndjson = '\n'.join(json.dumps(name) for name in names)
+    assert client.post('/api/process', data=ndjson, content_type='application/x-ndjson').get_json() == data
+    assert client.post('/api/process', data='\n'.join(names) + '\n\n', content_type='text/plain').get_json() == data
+    print("✅ request format tests passed")
+
+def test_limits():
+    """Test malformed bodies get 400 and oversized ones 413"""
+    client = app.test_client()
+    assert client.post('/api/process', json={'productNames': []}).status_code == 400
+    assert client.post('/api/process', json={'productNames': [1, 2]}).status_code == 400
+    assert client.post('/api/process', data='{"productNames": [', content_type='application/json').status_code == 400
+
+    long_name = 'x' * (PROCESS_CONFIG['max_name_length'] + 1)
+    assert client.post('/api/process', json={'productNames': [long_name]}).status_code == 413
+    print("✅ limit tests passed")
+
+def test_mid_stream_error():
+    """Test an error after the first chunk still leaves a valid JSON body with an error member"""
+    client = app.test_client()
+    chunk_size = PROCESS_CONFIG['chunk_size']
+    PROCESS_CONFIG['chunk_size'] = 2
+    try:
+        body = '{"productNames": ["Pepsi Max 500ml", "Fanta Orange", "Sprite", 42]}'
+        response = client.post('/api/process', data=body, content_type='application/json')
+        assert response.status_code == 200
+        data = json.loads(response.get_data())
+        assert data['success'] is False and 'strings' in data['error']
+        assert [product['detectedBrand'] for product in data['products']] == ['Pepsi', 'Fanta']
+
+        # The same error inside the first chunk is still a 400
+        PROCESS_CONFIG['chunk_size'] = 10
+        assert client.post('/api/process', data=body, content_type='application/json').status_code == 400
+    finally:
+        PROCESS_CONFIG['chunk_size'] = chunk_size
+    print("✅ mid-stream error tests passed")
+
+def test_compressed_response():
+    """Test large batches are gzip-compressed when the client accepts it"""
+    client = app.test_client()
+    names = ['Pepsi Max 500ml', 'Heinz Baked Beans 415g'] * PROCESS_CONFIG['compress_min_names']
+    response = client.post('/api/process', json={'productNames': names}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    data = json.loads(gzip.decompress(response.get_data()))
+    assert data['count'] == len(names) and data['uniqueCount'] == 2
+
+    plain = client.post('/api/process', json={'productNames': names[:2]}, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+
+    # q=0 refuses a coding
+    refused = client.post('/api/process', json={'productNames': names}, headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in refused.headers and json.loads(refused.get_data())['count'] == len(names)
+    assert choose_encoding('br;q=0, gzip') == 'gzip'
+    assert choose_encoding('*;q=0.5, gzip;q=0') == ('br' if streaming.brotli is not None else None)
+    assert choose_encoding('identity, *;q=0') is None
+    assert choose_encoding('gzip;q=0.2, br;q=0.9') == ('br' if streaming.brotli is not None else 'gzip')
+    print("✅ compressed response tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Process API Tests")
+    print("=" * 50)
+    test_request_formats()
+    test_limits()
+    test_mid_stream_error()
+    test_compressed_response()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,171 @@
+"""
+Unit tests for the streaming scrape endpoint
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add backend and scraper directories to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(backend_dir, '..', 'scraper'))
+sys.path.insert(0, backend_dir)
+
+from config import JOB_CONFIG, STORE_CONFIG
+from app import app
+
+# Keep job state and stored products out of the repository's data directory
+JOB_CONFIG['database'] = os.path.join(tempfile.mkdtemp(), 'jobs.db')
+STORE_CONFIG['database'] = os.path.join(tempfile.mkdtemp(), 'products.db')
+
+def test_ndjson_stream():
+    """Test products stream as NDJSON events between progress and done"""
+    client = app.test_client()
+    response = client.post('/api/scrape/stream', json={'site': 'amazon', 'maxProducts': 3})
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert events[0]['type'] == 'progress'
+    products = [event['product'] for event in events if event['type'] == 'product']
+    assert len(products) == 3 and products[0]['brand'] == 'Coca-Cola'
+    assert events[-1] == {'type': 'done', 'count': 3, 'cached': False}
+    print("✅ NDJSON stream tests passed")
+
+def test_sse_stream():
+    """Test Server-Sent Events framing and input validation"""
+    client = app.test_client()
+    response = client.get('/api/scrape/stream?site=amazon&maxProducts=2&format=sse')
+    assert response.mimetype == 'text/event-stream'
+    messages = response.get_data(as_text=True).strip().split('\n\n')
+    assert any(message.startswith('event: product\ndata: {') for message in messages)
+    assert messages[-1] == 'event: done\ndata: {"type": "done", "count": 2, "cached": false}'
+
+    assert client.post('/api/scrape/stream', json={'site': 'custom'}).status_code == 400
+    assert client.get('/api/scrape/stream?maxProducts=lots').status_code == 400
+    print("✅ SSE stream tests passed")
+
+def test_stream_deadline():
+    """Test a stream gives up on a job that never finishes"""
+    import app as app_module
+    from jobs import cache_key
+    manager = app_module.get_job_manager()
+    # A queued job another (live) process owns, which this stream joins
+    manager.store.create('amazon', None, 7, cache_key('amazon', None, 7), owner='other-process')
+    stream_timeout = app_module.stream_timeout
+    app_module.stream_timeout = lambda manager: 0.3
+    try:
+        response = app.test_client().post('/api/scrape/stream', json={'site': 'amazon', 'maxProducts': 7})
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    finally:
+        app_module.stream_timeout = stream_timeout
+    assert events[-1] == {'type': 'error', 'error': 'Timed out waiting for the scrape job'}
+    print("✅ stream deadline tests passed")
+
+def test_cached_scrape():
+    """Test repeated requests are answered from the cache with ETags"""
+    client = app.test_client()
+    client.post('/api/scrape/stream', json={'site': 'amazon', 'maxProducts': 4}).get_data()
+
+    response = client.post('/api/scrape', json={'site': 'amazon', 'maxProducts': 4})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['cached'] is True and data['count'] == 4
+    etag = response.headers['ETag']
+
+    job = client.get(f"/api/jobs/{data['jobId']}", headers={'If-None-Match': etag})
+    assert job.status_code == 304
+    stream = client.get('/api/scrape/stream?site=amazon&maxProducts=4', headers={'If-None-Match': etag})
+    assert stream.status_code == 304
+
+    fresh = client.post('/api/scrape', json={'site': 'amazon', 'maxProducts': 4, 'refresh': True})
+    assert fresh.status_code == 202
+    print("✅ cached scrape tests passed")
+
+def test_products_endpoint():
+    """Test finished scrapes can be searched and paged through /api/products"""
+    client = app.test_client()
+    client.post('/api/scrape/stream', json={'site': 'amazon', 'maxProducts': 5}).get_data()
+
+    data = client.get('/api/products?q=coca&limit=50').get_json()
+    assert data['success'] is True and data['count'] >= 1
+    assert all(product['brand'] == 'Coca-Cola' and product['site'] == 'amazon' for product in data['products'])
+
+    first = client.get('/api/products?sort=price&limit=2').get_json()
+    assert first['count'] == 2 and first['nextCursor']
+    second = client.get(f"/api/products?sort=price&limit=2&cursor={first['nextCursor']}").get_json()
+    assert not {p['slug'] for p in first['products']} & {p['slug'] for p in second['products']}
+
+    assert client.get('/api/products?sort=size').status_code == 400
+    assert client.get(f"/api/products?sort=name&cursor={first['nextCursor']}").status_code == 400
+    print("✅ products endpoint tests passed")
+
+def test_changes_endpoint():
+    """Test the change feed pages with nextSince and rejects a bad since"""
+    from app import get_product_store
+    client = app.test_client()
+    start = client.get('/api/changes').get_json()
+    assert start['success'] is True
+    get_product_store().record_changes([
+        {'op': 'update', 'key': 'pepsi-max-500ml', 'old_price': '£1.00', 'new_price': '£0.90',
+         'product': {'name': 'Pepsi Max 500ml', 'price': '£0.90'}},
+        {'op': 'delete', 'key': 'tango-orange-330ml', 'old_price': '£0.65'},
+    ], 'amazon')
+
+    data = client.get(f"/api/changes?since={start['nextSince']}&limit=1").get_json()
+    assert data['count'] == 1
+    assert {key: data['changes'][0][key] for key in ('site', 'key', 'op', 'oldPrice', 'newPrice')} == {
+        'site': 'amazon', 'key': 'pepsi-max-500ml', 'op': 'update', 'oldPrice': '£1.00', 'newPrice': '£0.90'}
+    rest = client.get(f"/api/changes?since={data['nextSince']}").get_json()
+    assert [change['op'] for change in rest['changes']] == ['delete']
+    assert client.get('/api/changes?since=last-tuesday').status_code == 400
+    print("✅ changes endpoint tests passed")
+
+def test_queue_endpoint():
+    """Test queue stats and the Retry-After answer for a saturated queue"""
+    from app import queue_full_response
+    from jobs import QueueFull, SiteBusy
+    client = app.test_client()
+    data = client.get('/api/queue').get_json()
+    assert data['success'] is True and data['queued'] >= 0 and 'averageWaitSeconds' in data
+
+    with app.app_context():
+        response = queue_full_response(SiteBusy('10 jobs are already queued for shop.example', 12))
+        assert response.status_code == 429 and response.headers['Retry-After'] == '12'
+        assert queue_full_response(QueueFull('50 jobs are already queued', 3)).status_code == 503
+    print("✅ queue endpoint tests passed")
+
+def test_metrics_endpoint():
+    """Test request latency and pipeline stages are exposed in the Prometheus format"""
+    client = app.test_client()
+    stream = client.post('/api/scrape/stream', json={'site': 'amazon', 'maxProducts': 2, 'refresh': True})
+    stream.get_data()
+    stream.close()
+    client.get('/api/jobs/unknown-job').close()
+
+    response = client.get('/api/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_seconds histogram' in text
+    assert 'http_request_seconds_count{endpoint="/api/jobs/<job_id>",method="GET",status="404"}' in text
+    assert 'scraper_stage_seconds_count{stage="brand"}' in text
+    assert 'scrape_queue_depth 0' in text and 'scrape_queue_wait_seconds_count' in text
+    print("✅ metrics endpoint tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Scrape Stream Tests")
+    print("=" * 50)
+    test_ndjson_stream()
+    test_sse_stream()
+    test_stream_deadline()
+    test_cached_scrape()
+    test_products_endpoint()
+    test_changes_endpoint()
+    test_queue_endpoint()
+    test_metrics_endpoint()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
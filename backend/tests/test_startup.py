@@ -0,0 +1,71 @@
+"""
+Startup tests for the API: what a worker imports and how long importing the app takes
+Each check runs in a fresh interpreter, since this test process has imported everything already
+"""
+import sys
+import os
+import json
+import subprocess
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds that importing the app may add on top of importing Flask itself (about 0.1s
+# today, building the brand and fuzzy indexes included); importing the scraping stack
+# alone would cost more than this
+IMPORT_BUDGET = 0.4
+IMPORT_RUNS = 3
+
+WORKER_SCRIPT = """
+import json, sys
+import app
+client = app.app.test_client()
+assert client.get('/api/health').status_code == 200
+assert client.post('/api/process', json={'productNames': ['Coca Cola 330ml Can']}).status_code == 200
+from brand_detection import loaded_brand_indexes
+indexes = loaded_brand_indexes()
+print(json.dumps({
+    'loaded': [name for name in ('scraper', 'bs4', 'lxml', 'requests') if name in sys.modules],
+    'brand_index': indexes is not None,
+    'fuzzy_index': indexes is not None and indexes[1] is not None,
+}))
+"""
+
+def run_python(code):
+    """Run code in a fresh interpreter from the backend directory and return its stdout"""
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=backend_dir,
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def import_seconds(module):
+    """Fastest of IMPORT_RUNS fresh-interpreter imports of a module"""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    return min(float(run_python(code).strip().splitlines()[-1]) for _ in range(IMPORT_RUNS))
+
+def test_lazy_scraping_stack():
+    """Test serving /api/health and /api/process never imports requests, BeautifulSoup or lxml"""
+    state = json.loads(run_python(WORKER_SCRIPT).strip().splitlines()[-1])
+    assert state['loaded'] == []
+    # Built at import by warm_up(), i.e. in the gunicorn master when preloading
+    assert state['brand_index'] and state['fuzzy_index']
+    print("✅ lazy scraping stack tests passed")
+
+def test_import_time():
+    """Test importing the app stays within IMPORT_BUDGET seconds over Flask alone"""
+    baseline = import_seconds('flask, flask_cors')
+    total = import_seconds('app')
+    print(f"   import flask: {baseline * 1000:.0f}ms, import app: {total * 1000:.0f}ms")
+    assert total - baseline < IMPORT_BUDGET
+    print("✅ import time tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("Running startup tests...\n")
+    test_lazy_scraping_stack()
+    test_import_time()
+    print("\n✅ All tests passed!")
+
+if __name__ == "__main__":
+    run_all_tests()
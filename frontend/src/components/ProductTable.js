@@ -1,10 +1,53 @@
-import React, { useState, useMemo, useEffect } from 'react';
+import React, { useState, useMemo, useEffect, useDeferredValue } from 'react';
 import { cleanProductName } from '../utils/dataCleaning';
 import { detectBrand } from '../utils/brandDetection';
 import { getAvailableSites, getSiteByKey } from '../utils/scrapingSites';
 import './ProductTable.css';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000';
+const JOB_POLL_INTERVAL_MS = 1000;
+// Streamed products are added to the table once per animation frame, or sooner after this many
+const STREAM_FLUSH_SIZE = 200;
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Run callback on the next animation frame (or a timer where there are none); returns a cancel function
+const onNextFrame = (callback) => {
+  if (typeof requestAnimationFrame === 'function') {
+    const id = requestAnimationFrame(callback);
+    return () => cancelAnimationFrame(id);
+  }
+  const id = setTimeout(callback, 16);
+  return () => clearTimeout(id);
+};
+
+const formatScrapedProduct = (p) => ({
+  originalName: p.original_name || p.name || '',
+  cleanedName: p.name || '',
+  detectedBrand: p.brand || 'Unknown',
+  price: p.price || '',
+  volumeWeight: p.volume_weight || ''
+});
+
+// Read an NDJSON response body line by line, calling onEvent for each parsed line
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+    if (done) {
+      if (buffer.trim()) {
+        onEvent(JSON.parse(buffer));
+      }
+      return;
+    }
+  }
+};
 
 function ProductTable() {
   const [products, setProducts] = useState([]);
@@ -17,6 +60,7 @@ function ProductTable() {
   const [showSiteSelector, setShowSiteSelector] = useState(false);
   const [isScraping, setIsScraping] = useState(false);
   const [scrapingError, setScrapingError] = useState(null);
+  const [scrapeProgress, setScrapeProgress] = useState(null);
   const [maxProducts, setMaxProducts] = useState(50);
   const [availableSites, setAvailableSites] = useState([]);
 
@@ -78,6 +122,7 @@ Monster Energy 500ml Can`;
   const handleScrape = async () => {
     setIsScraping(true);
     setScrapingError(null);
+    setScrapeProgress(null);
     setProducts([]);
 
     try {
@@ -89,7 +134,7 @@ Monster Energy 500ml Can`;
         return;
       }
 
-      const response = await fetch(`${API_BASE_URL}/api/scrape`, {
+      const request = {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -99,24 +144,86 @@ Monster Energy 500ml Can`;
           url: url.trim(),
           maxProducts: maxProducts
         })
+      };
+
+      // Stream products as each page is scraped when the browser can read response bodies.
+      // A GET lets the browser cache revalidate recent results with their ETag instead of downloading them again.
+      const streamParams = new URLSearchParams({
+        site: selectedSite,
+        url: url.trim(),
+        maxProducts: String(maxProducts)
       });
+      const streamResponse = typeof TextDecoder !== 'undefined'
+        ? await fetch(`${API_BASE_URL}/api/scrape/stream?${streamParams}`)
+        : null;
 
-      const data = await response.json();
+      if (streamResponse && streamResponse.ok && streamResponse.body) {
+        let count = 0;
+        // Buffer products and append them in batches: one array copy and render per frame, not per product
+        let pending = [];
+        let cancelFlush = null;
+        const flush = () => {
+          if (cancelFlush) {
+            cancelFlush();
+            cancelFlush = null;
+          }
+          if (pending.length > 0) {
+            const batch = pending;
+            pending = [];
+            setProducts(prev => prev.concat(batch));
+          }
+        };
+        try {
+          await readEventStream(streamResponse, (event) => {
+            if (event.type === 'product') {
+              count += 1;
+              pending.push(formatScrapedProduct(event.product));
+              if (pending.length >= STREAM_FLUSH_SIZE) {
+                flush();
+              } else if (!cancelFlush) {
+                cancelFlush = onNextFrame(flush);
+              }
+            } else if (event.type === 'progress') {
+              setScrapeProgress(event);
+            } else if (event.type === 'error') {
+              throw new Error(event.error || 'Scraping failed');
+            }
+          });
+        } finally {
+          // Products received before an error are still shown
+          flush();
+        }
+        if (count === 0) {
+          throw new Error('No products found');
+        }
+        return;
+      }
+
+      // Fall back to a background job and poll until it finishes
+      const response = await fetch(`${API_BASE_URL}/api/scrape`, request);
+      const job = await response.json();
 
       if (!response.ok) {
+        throw new Error(job.error || 'Scraping failed');
+      }
+
+      let data = job;
+      while (data.status === 'queued' || data.status === 'running') {
+        await sleep(JOB_POLL_INTERVAL_MS);
+        const statusResponse = await fetch(`${API_BASE_URL}/api/jobs/${job.jobId}`);
+        data = await statusResponse.json();
+        if (!statusResponse.ok) {
+          throw new Error(data.error || 'Scraping failed');
+        }
+        setScrapeProgress(data.progress);
+      }
+
+      if (data.status === 'failed') {
         throw new Error(data.error || 'Scraping failed');
       }
 
-      if (data.success && data.products) {
-        // Format products for display
-        const formattedProducts = data.products.map(p => ({
-          originalName: p.original_name || p.name || '',
-          cleanedName: p.name || '',
-          detectedBrand: p.brand || 'Unknown',
-          price: p.price || '',
-          volumeWeight: p.volume_weight || ''
-        }));
-        setProducts(formattedProducts);
+      if (data.products && data.products.length > 0) {
+        setProducts(data.products.map(formatScrapedProduct));
         setScrapingError(null);
       } else {
         throw new Error('No products found');
@@ -126,35 +233,39 @@ Monster Energy 500ml Can`;
       setScrapingError(error.message || 'Failed to scrape. Make sure the backend server is running.');
     } finally {
       setIsScraping(false);
+      setScrapeProgress(null);
     }
   };
 
+  // Lower-cased search text is built once per result set, not on every keystroke
+  const searchIndex = useMemo(() => products.map(p =>
+    `${p.originalName}\n${p.cleanedName}\n${p.detectedBrand}`.toLowerCase()
+  ), [products]);
+  
+  // Typing stays responsive while large tables re-filter in the background
+  const deferredSearchTerm = useDeferredValue(searchTerm);
+  
   // Filter and sort products
   const filteredAndSortedProducts = useMemo(() => {
     let filtered = products;
     
     // Apply search filter
-    if (searchTerm) {
-      const term = searchTerm.toLowerCase();
-      filtered = products.filter(p => 
-        p.originalName.toLowerCase().includes(term) ||
-        p.cleanedName.toLowerCase().includes(term) ||
-        p.detectedBrand.toLowerCase().includes(term)
-      );
+    if (deferredSearchTerm) {
+      const term = deferredSearchTerm.toLowerCase();
+      filtered = products.filter((p, index) => searchIndex[index].includes(term));
     }
     
     // Apply sorting
     if (sortField) {
+      const collator = new Intl.Collator(undefined, { sensitivity: 'base' });
       filtered = [...filtered].sort((a, b) => {
-        const aVal = a[sortField].toLowerCase();
-        const bVal = b[sortField].toLowerCase();
-        const comparison = aVal.localeCompare(bVal);
+        const comparison = collator.compare(a[sortField], b[sortField]);
         return sortDirection === 'asc' ? comparison : -comparison;
       });
     }
     
     return filtered;
-  }, [products, searchTerm, sortField, sortDirection]);
+  }, [products, searchIndex, deferredSearchTerm, sortField, sortDirection]);
 
   const handleSort = (field) => {
     if (sortField === field) {
@@ -291,7 +402,11 @@ Monster Energy 500ml Can`;
                 className="btn btn-scrape"
                 disabled={isScraping || (selectedSite === 'custom' && !customUrl.trim())}
               >
-                {isScraping ? 'Scraping...' : 'Scrape Products'}
+                {isScraping
+                  ? (scrapeProgress
+                    ? `Scraping... ${scrapeProgress.productsFound} products, ${scrapeProgress.pagesFetched} pages`
+                    : 'Scraping...')
+                  : 'Scrape Products'}
               </button>
             </div>
             {scrapingError && (
@@ -1,19 +1,19 @@
 /**
  * JavaScript implementation of brand detection
- * Mirrors the Python brand_detection.py functionality
+ * Mirrors the Python brand_detection.py / brand_index.py functionality
  */
 
-// Hardcoded brand list
+// Hardcoded brand list (canonical names)
 const BRANDS = [
-  "Coca-Cola", "Coca Cola", "Coke",
+  "Coca-Cola",
   "Lucozade",
   "Red Bull",
   "Pepsi",
   "Fanta",
   "Sprite",
-  "7UP", "7-Up",
+  "7UP",
   "Tango",
-  "Dr Pepper", "Dr. Pepper",
+  "Dr Pepper",
   "Monster",
   "Rockstar",
   "Relentless",
@@ -29,26 +29,52 @@ const BRANDS = [
   "Highland Spring",
 ];
 
+// Alternative spellings mapped to their canonical brand
+const BRAND_ALIASES = {
+  "Coke": "Coca-Cola",
+  "7 Up": "7UP",
+};
+
+/**
+ * Split text into lowercase word tokens (punctuation and spaces are boundaries)
+ */
+const tokenize = (text) => (text || '').toLowerCase().match(/[\p{L}\p{N}]+/gu) || [];
+
+// Map of "token token" phrase -> canonical brand, built once
+const PHRASES = new Map();
+let MAX_TOKENS = 0;
+
+const addPhrase = (phrase, canonical) => {
+  const tokens = tokenize(phrase);
+  const key = tokens.join(' ');
+  if (tokens.length && !PHRASES.has(key)) {
+    PHRASES.set(key, canonical);
+    MAX_TOKENS = Math.max(MAX_TOKENS, tokens.length);
+  }
+};
+
+BRANDS.forEach(brand => addPhrase(brand, brand));
+Object.entries(BRAND_ALIASES).forEach(([alias, canonical]) => addPhrase(alias, canonical));
+
 /**
  * Detect brand from product name
- * Returns brand name if found, "Unknown" otherwise
+ * Returns the canonical brand name if found, "Unknown" otherwise
+ * Uses longest-leftmost, whole-word matching
  */
 export function detectBrand(name) {
   if (!name) return "Unknown";
-  
-  const nameLower = name.toLowerCase();
-  
-  // Check each brand (case-insensitive)
-  for (const brand of BRANDS) {
-    const brandLower = brand.toLowerCase();
-    
-    // Exact match or brand appears in name
-    if (nameLower.includes(brandLower)) {
-      // Return the original brand name (with proper casing)
-      return brand;
+
+  const tokens = tokenize(name);
+
+  for (let start = 0; start < tokens.length; start++) {
+    const longest = Math.min(MAX_TOKENS, tokens.length - start);
+    for (let length = longest; length > 0; length--) {
+      const brand = PHRASES.get(tokens.slice(start, start + length).join(' '));
+      if (brand) {
+        return brand;
+      }
     }
   }
-  
+
   return "Unknown";
 }
-
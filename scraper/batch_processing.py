@@ -0,0 +1,79 @@
+"""
+Batch processing of product names
+Pasted lists are often highly repetitive, so each distinct name is cleaned once,
+brands are detected once per normalized cleaned name, and the results are fanned
+back out in input order
+"""
+from data_cleaning import clean_product
+from brand_detection import add_brand_to_products
+from metrics import stage_timer
+
+
+def iter_process_chunks(names, chunk_size=None, stats=None):
+    """
+    Clean and brand names in chunks, yielding one list of records per chunk
+
+    Names already seen in an earlier chunk reuse that chunk's ProductRecord, so
+    memory grows with the number of distinct names rather than the input size.
+    Repeated names share one record; treat the results as read-only.
+
+    Args:
+        names: Iterable of raw product names (may be a stream)
+        chunk_size: Names per chunk (default: everything in one chunk)
+        stats: Optional dict filled with 'total', 'unique', 'unique_ratio'
+            and 'brand_lookups' (detections actually run) once names are exhausted
+    """
+    records = {}
+    totals = {'total': 0, 'brand_lookups': 0}
+
+    def process(chunk):
+        new = {}
+        with stage_timer('clean'):
+            for name in chunk:
+                if name not in records and name not in new:
+                    new[name] = clean_product({'name': name, 'original_name': name})
+        if new:
+            brand_stats = {}
+            with stage_timer('brand'):
+                add_brand_to_products(list(new.values()), brand_stats)
+            totals['brand_lookups'] += brand_stats.get('unique', 0)
+            records.update(new)
+        totals['total'] += len(chunk)
+        return [records[name] for name in chunk]
+
+    chunk = []
+    for name in names:
+        chunk.append(name)
+        if chunk_size and len(chunk) >= chunk_size:
+            yield process(chunk)
+            chunk = []
+    if chunk:
+        yield process(chunk)
+
+    if stats is not None:
+        total = totals['total']
+        stats['total'] = total
+        stats['unique'] = len(records)
+        stats['unique_ratio'] = round(len(records) / total, 4) if total else 0
+        stats['brand_lookups'] = totals['brand_lookups']
+
+
+def process_names(names, stats=None):
+    """
+    Clean and brand a list of product names
+
+    Returns exactly what clean_products + add_brand_to_products return for
+    [{'name': n, 'original_name': n}, ...], in input order. Repeated names share
+    one ProductRecord, so treat the results as read-only.
+
+    Args:
+        names: List of raw product names
+        stats: Optional dict filled with 'total', 'unique', 'unique_ratio'
+            and 'brand_lookups' (detections actually run)
+    """
+    results = []
+    for chunk in iter_process_chunks(names, stats=stats):
+        results.extend(chunk)
+    if stats is not None and not names:
+        stats.update(total=0, unique=0, unique_ratio=0, brand_lookups=0)
+    return results
@@ -0,0 +1,78 @@
+"""
+Brand matching benchmark
+Compares the original substring loop against MappedBrandIndex (prebuilt,
+memory-mapped) as the dictionary grows
+
+Usage: python benchmarks/bench_brand_matcher.py [dictionary_size]
+"""
+import sys
+import os
+import time
+import random
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_index import load_brand_dictionary, compile_index, MappedBrandIndex
+from config import BRAND_CONFIG
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'tor', 'qua', 'zel', 'bri', 'nox', 'pel', 'dra', 'sun', 'fi']
+
+def synthetic_brands(count, seed=42):
+    """Deterministic made-up brand names of one to three words"""
+    rng = random.Random(seed)
+    brands = set(load_brand_dictionary(BRAND_CONFIG['dictionary_file'])[0])
+    while len(brands) < count:
+        words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+                 for _ in range(rng.randint(1, 3))]
+        brands.add(' '.join(words))
+    return sorted(brands)
+
+def synthetic_names(brands, count, seed=7):
+    """Product names, roughly half of which contain a dictionary brand"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        brand = rng.choice(brands) if i % 2 == 0 else 'Generic'
+        names.append(f"{brand} Original Taste {rng.choice([250, 330, 500])}ml Can")
+    return names
+
+def legacy_detect(name, brands):
+    """The original O(brands) substring loop"""
+    name_lower = name.lower()
+    for brand in brands:
+        if brand.lower() in name_lower:
+            return brand
+    return "Unknown"
+
+def time_per_name(func, names):
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+def main(max_size=50000):
+    print(f"{'brands':>8} {'legacy us/name':>16} {'mmap us/name':>14} {'build ms':>10}")
+    print("-" * 51)
+    tmp = tempfile.TemporaryDirectory()
+    sizes = [size for size in (100, 1000, 10000) if size < max_size] + [max_size]
+    for size in sizes:
+        brands = synthetic_brands(size)
+        names = synthetic_names(brands, 2000)
+
+        legacy_names = names[:max(50, 200000 // size)]
+        legacy = time_per_name(lambda n: legacy_detect(n, brands), legacy_names)
+
+        dictionary_path = os.path.join(tmp.name, f'brands_{size}.json')
+        with open(dictionary_path, 'w', encoding='utf-8') as f:
+            json.dump({brand: [] for brand in brands}, f)
+        start = time.perf_counter()
+        compile_index(dictionary_path, dictionary_path + '.idx')
+        build_ms = (time.perf_counter() - start) * 1000
+        mapped = time_per_name(MappedBrandIndex(dictionary_path + '.idx').match, names)
+        print(f"{size:>8} {legacy:>16.1f} {mapped:>14.2f} {build_ms:>10.1f}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,72 @@
+"""
+Memory benchmark: bytes per product for cleaned + branded products
+Compares the legacy dict-copy pipeline against ProductRecord
+
+Usage: python benchmarks/bench_memory.py [count]
+"""
+import sys
+import os
+import gc
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_cleaning import (
+    clean_product_name,
+    clean_price,
+    standardize_units,
+    detect_multipack,
+    generate_slug,
+    iter_clean_products,
+)
+from brand_detection import detect_brand, iter_brand_products
+from scraper import generate_sample_products
+
+def legacy_clean_product(product):
+    """The original dict-copy implementation of clean_product"""
+    cleaned = product.copy()
+    original_name = cleaned.get('name', '')
+    cleaned['original_name'] = original_name
+    cleaned['name'] = clean_product_name(original_name)
+    cleaned['price'] = clean_price(cleaned.get('price', ''))
+    cleaned['volume_weight'] = standardize_units(cleaned.get('volume_weight', ''))
+    cleaned['multipack'] = detect_multipack(original_name)
+    cleaned['slug'] = generate_slug(cleaned['name'])
+    return cleaned
+
+def legacy_pipeline(raw):
+    products = [legacy_clean_product(p) for p in raw]
+    for product in products:
+        product['brand'] = detect_brand(product.get('name', ''))
+    return products
+
+def record_pipeline(raw):
+    return list(iter_brand_products(iter_clean_products(raw)))
+
+def measure(pipeline, raw_dicts):
+    """Return bytes per product retained by the pipeline's output"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = pipeline(raw_dicts)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    count = len(result)
+    del result
+    return (after - before) / count
+
+def main(count=100000):
+    raw = [p.to_dict() for p in generate_sample_products(count)]
+
+    print(f"Memory per product ({count} products)")
+    print("-" * 50)
+    legacy = measure(legacy_pipeline, [dict(p) for p in raw])
+    records = measure(record_pipeline, [dict(p) for p in raw])
+    print(f"  dict copies:    {legacy:8.1f} bytes/product")
+    print(f"  ProductRecord:  {records:8.1f} bytes/product")
+    print(f"  Saving:         {(1 - records / legacy) * 100:8.1f}%")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
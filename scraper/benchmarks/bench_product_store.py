@@ -0,0 +1,136 @@
+"""
+Product store query benchmark
+Builds a synthetic store (1M rows by default, reused when the database already
+exists) and times a page of every query shape /api/products serves: free text,
+exact filters, price/quantity ranges under each sort, relevance and deep cursors.
+Exits with status 1 when any query's median is over the target.
+
+Usage:
+    python benchmarks/bench_product_store.py                        # 1M rows in a temp directory
+    python benchmarks/bench_product_store.py --rows 200000 --db /tmp/store.db
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_index import load_brand_dictionary
+from config import BRAND_CONFIG
+from product_store import ProductStore
+
+from bench_suite import ITEMS, SIZES
+
+TARGET_MS = 50
+REPEAT = 5
+SITES = ['wegetanystock', 'books_toscrape', 'shop.example', 'amazon']
+
+
+def synthetic_store_products(count, seed=0):
+    """Cleaned-looking products with a brand, price and size, spread over SITES"""
+    rng = random.Random(seed)
+    brands = load_brand_dictionary(BRAND_CONFIG['dictionary_file'])[0] + ['Unknown'] * 20
+    for i in range(count):
+        brand = rng.choice(brands)
+        size = rng.choice(SIZES)
+        name = f"{'' if brand == 'Unknown' else brand + ' '}{rng.choice(ITEMS)} {size} {i}"
+        yield rng.choice(SITES), {
+            'name': name,
+            'brand': brand,
+            'price': f"£{rng.randint(0, 20)}.{rng.randint(0, 99):02d}",
+            'volume_weight': size,
+            'slug': f"p-{i}",
+        }
+
+
+def build_store(path, rows):
+    store = ProductStore(path)
+    if store.count() >= rows:
+        return store
+    start = time.perf_counter()
+    by_site = {site: [] for site in SITES}
+    for site, product in synthetic_store_products(rows):
+        by_site[site].append(product)
+    for site, products in by_site.items():
+        store.upsert_products(products, site)
+    store.analyze()
+    print(f"Built {store.count()} rows in {time.perf_counter() - start:.0f}s")
+    return store
+
+
+QUERIES = {
+    'browse by name': {},
+    'browse by price desc': {'sort': 'price', 'order': 'desc'},
+    'brand': {'brand': 'Coca-Cola'},
+    'brand by price': {'brand': 'Coca-Cola', 'sort': 'price'},
+    'site by updated': {'site': 'amazon', 'sort': 'updated', 'order': 'desc'},
+    'text': {'q': 'cola zero'},
+    'one-letter text': {'q': 'c'},
+    'two-letter prefix': {'q': 'co'},
+    'text + brand': {'q': 'orange', 'brand': 'Fanta'},
+    'text by price': {'q': 'energy drink', 'sort': 'price'},
+    'common text by name': {'q': 'original', 'sort': 'name'},
+    'wide price range': {'min_price': 1, 'max_price': 15},
+    'narrow price range': {'min_price': 3.10, 'max_price': 3.12},
+    'narrow price by name': {'min_price': 3.10, 'max_price': 3.12, 'sort': 'name'},
+    'narrow price by updated': {'min_price': 3.10, 'max_price': 3.12, 'sort': 'updated'},
+    'narrow price + brand': {'min_price': 3.10, 'max_price': 3.50, 'brand': 'Pepsi', 'sort': 'name'},
+    'quantity range': {'unit': 'ml', 'min_quantity': 300, 'max_quantity': 600, 'sort': 'quantity'},
+    'narrow quantity by price': {'unit': 'g', 'min_quantity': 415, 'max_quantity': 415, 'sort': 'price'},
+    'rare text by relevance': {'q': 'wholemeal bread 415g'},
+}
+
+
+def time_query(store, params, pages=1):
+    """Median and worst milliseconds to fetch `pages` consecutive pages"""
+    timings = []
+    for _ in range(REPEAT):
+        cursor = None
+        start = time.perf_counter()
+        for _ in range(pages):
+            page = store.search(limit=50, cursor=cursor, **params)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        timings.append((time.perf_counter() - start) * 1000 / pages)
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Product store query benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows in the synthetic store')
+    parser.add_argument('--db', help='Store database (kept between runs; default: a temporary file)')
+    parser.add_argument('--target-ms', type=float, default=TARGET_MS, help='Median page latency target')
+    args = parser.parse_args()
+
+    tmp = None
+    path = args.db
+    if path is None:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, 'products.db')
+    store = build_store(path, args.rows)
+
+    print(f"{'query':28} {'median ms':>10} {'max ms':>8}")
+    print("-" * 48)
+    slow = []
+    for name, params in QUERIES.items():
+        median, worst = time_query(store, params)
+        flag = '' if median <= args.target_ms else '  <-- over target'
+        print(f"{name:28} {median:>10.1f} {worst:>8.1f}{flag}")
+        if flag:
+            slow.append(name)
+    median, worst = time_query(store, {'sort': 'price'}, pages=20)
+    print(f"{'20 pages deep by price':28} {median:>10.1f} {worst:>8.1f}")
+    if slow:
+        print(f"\n{len(slow)} queries over {args.target_ms}ms: {', '.join(slow)}")
+        sys.exit(1)
+    print(f"\nAll queries within {args.target_ms}ms")
+
+
+if __name__ == '__main__':
+    main()
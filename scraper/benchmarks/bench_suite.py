@@ -0,0 +1,323 @@
+"""
+Benchmark suite with regression thresholds
+Times the cleaning, brand detection, validation and HTML extraction hot paths on
+deterministic synthetic catalogs (1k to 1M names) and saved HTML fixtures, and
+compares throughput against the JSON baselines in baselines.json. Exits with
+status 1 when any benchmark is slower than its baseline by more than the tolerance.
+
+Usage:
+    python benchmarks/bench_suite.py                      # 1k and 10k, compare to baselines
+    python benchmarks/bench_suite.py --sizes 1k,100k,1m   # larger catalogs
+    python benchmarks/bench_suite.py --only detect_brand,clean_product
+    python benchmarks/bench_suite.py --update             # record new baselines
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_index import load_brand_dictionary
+from config import BRAND_CONFIG
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baselines.json')
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, 'fixtures')
+FIXTURES = ('product_grid.html', 'product_list.html')
+FIXTURE_BASE_URL = 'http://fixtures.test/'
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_TOLERANCE = 0.25  # fail when throughput drops more than 25% below baseline
+DEFAULT_REPEAT = 3
+
+# HTML benchmarks parse whole pages, so they stop growing at this many product elements
+HTML_MAX_ITEMS = 2000
+
+ITEMS = ['Original', 'Zero Sugar', 'Baked Beans', 'Dairy Milk', 'Ready Salted Crisps', 'Corn Flakes',
+         'Tea Bags', 'Tomato Soup', 'Energy Drink', 'Orange', 'Still Water', 'Wholemeal Bread']
+SIZES = ['330ml', '500ml', '1L', '2L', '415g', '200g', '6 x 330ml', '12 x 25g', '800g', '250 ML', '4pk', '12 Pack']
+DESCRIPTORS = ['', '', ' Can', ' Bottle', ' Pack', ' Bar']
+PRICES = ['£{}', 'PMP £{}', '£ {}', '{}']
+
+BENCHMARKS = {}  # name -> setup(size) returning run() -> items processed
+
+
+def benchmark(name):
+    """
+    Register a benchmark: the decorated setup(size) builds the inputs and returns
+    run(), which returns the item count. run() is timed several times on the same
+    inputs, so it must not depend on earlier runs
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def synthetic_names(count, seed=0):
+    """
+    Deterministic product names: dictionary brands (about 1 in 20 with a typo),
+    unbranded names, sizes, multipacks and packaging descriptors
+    """
+    rng = random.Random(seed)
+    brands = load_brand_dictionary(BRAND_CONFIG['dictionary_file'])[0]
+    names = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            brand = 'Generic'
+        else:
+            brand = rng.choice(brands)
+            if roll < 0.15 and len(brand) > 4:
+                position = rng.randrange(1, len(brand) - 1)
+                brand = brand[:position] + brand[position + 1:]
+        names.append(f"{brand} {rng.choice(ITEMS)} {rng.choice(SIZES)}{rng.choice(DESCRIPTORS)} #{i}")
+    return names
+
+
+def synthetic_products(count, seed=0):
+    """Raw product dicts (name, price, volume_weight, image_url) built on synthetic_names"""
+    rng = random.Random(seed + 1)
+    products = []
+    for name in synthetic_names(count, seed):
+        price = f"{rng.randint(0, 9)}.{rng.randint(0, 99):02d}"
+        products.append({
+            'name': name,
+            'price': rng.choice(PRICES).format(price),
+            'volume_weight': rng.choice(SIZES),
+            'image_url': '' if rng.random() < 0.2 else f"https://cdn.test/{rng.randint(1, 10 ** 6)}.jpg",
+        })
+    return products
+
+
+def cleaned_products(count):
+    from data_cleaning import clean_products
+    return clean_products(synthetic_products(count))
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FixtureResponse:
+    """The parts of requests.Response the scraper uses"""
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class FixtureSession:
+    """Session serving saved fixture pages instead of the network"""
+
+    def __init__(self):
+        self.pages = {FIXTURE_BASE_URL + name: FixtureResponse(load_fixture(name)) for name in FIXTURES}
+
+    def get(self, url, timeout=None):
+        return self.pages[url]
+
+
+@benchmark('clean_product')
+def bench_clean_product(size):
+    from data_cleaning import clean_product
+    products = synthetic_products(size)
+
+    def run():
+        for product in products:
+            clean_product(product)
+        return len(products)
+    return run
+
+
+@benchmark('clean_products')
+def bench_clean_products(size):
+    from data_cleaning import clean_products
+    products = synthetic_products(size)
+    return lambda: len(clean_products(products))
+
+
+@benchmark('detect_brand')
+def bench_detect_brand(size):
+    from data_cleaning import clean_product_name
+    from brand_detection import detect_brand
+    names = [clean_product_name(name) for name in synthetic_names(size)]
+
+    def run():
+        for name in names:
+            detect_brand(name)
+        return len(names)
+    return run
+
+
+@benchmark('add_brand_to_products')
+def bench_add_brand_to_products(size):
+    from brand_detection import add_brand_to_products
+    products = cleaned_products(size)
+    return lambda: len(add_brand_to_products(products))
+
+
+@benchmark('validate_products')
+def bench_validate_products(size):
+    from brand_detection import add_brand_to_products
+    from data_validation import validate_products
+    products = add_brand_to_products(cleaned_products(size))
+    return lambda: validate_products(products, keep_results=False)['total_products']
+
+
+@benchmark('extract_product_data')
+def bench_extract_product_data(size):
+    from bs4 import BeautifulSoup
+    from scraper import extract_product_data
+    elements = []
+    for name in FIXTURES:
+        soup = BeautifulSoup(load_fixture(name), 'html.parser')
+        elements += soup.select('div.product-card, article.product_pod')
+    elements = (elements * (min(size, HTML_MAX_ITEMS) // len(elements) + 1))[:min(size, HTML_MAX_ITEMS)]
+
+    def run():
+        for element in elements:
+            extract_product_data(element, FIXTURE_BASE_URL)
+        return len(elements)
+    return run
+
+
+@benchmark('scrape_products_from_page')
+def bench_scrape_products_from_page(size):
+    from scraper import scrape_products_from_page
+    session = FixtureSession()
+    urls = list(session.pages)
+
+    def run():
+        # Products found, one fixture page after another, until the size cap
+        found = 0
+        while found < min(size, HTML_MAX_ITEMS):
+            for url in urls:
+                found += len(scrape_products_from_page(session, url, [], None, FIXTURE_BASE_URL))
+        return found
+    return run
+
+
+def run_benchmark(name, size, repeat=DEFAULT_REPEAT):
+    """Best of `repeat` timed runs; setup (input generation) is not timed"""
+    run = BENCHMARKS[name](size)
+    best = None
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'items': items, 'seconds': round(best, 6), 'items_per_second': round(items / max(best, 1e-9), 1)}
+
+
+def run_suite(names=None, sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, report=print):
+    """Run benchmarks and return {"name@size": result}"""
+    results = {}
+    for name in names or BENCHMARKS:
+        for size in sizes:
+            result = run_benchmark(name, size, repeat)
+            results[f'{name}@{size}'] = result
+            if report:
+                report(f"  {name + '@' + str(size):<36}{result['items_per_second']:>14,.0f} items/s"
+                       f"{result['seconds'] * 1000:>12.1f} ms")
+    return results
+
+
+def compare(results, baselines, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions in results against baseline results
+    Returns [(key, baseline items/s, current items/s, relative change)] for every
+    benchmark more than `tolerance` below its baseline; keys without a baseline are skipped
+    """
+    regressions = []
+    for key, result in results.items():
+        baseline = baselines.get(key)
+        if not baseline:
+            continue
+        change = result['items_per_second'] / baseline['items_per_second'] - 1
+        if change < -tolerance:
+            regressions.append((key, baseline['items_per_second'], result['items_per_second'], round(change, 4)))
+    return regressions
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine()}
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def save_baselines(results, path=BASELINE_FILE):
+    """Merge results into the baseline file"""
+    merged = dict(load_baselines(path), **results)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'machine': machine_info(), 'results': dict(sorted(merged.items()))}, f, indent=2)
+        f.write('\n')
+
+
+def parse_size(text):
+    """'1000', '10k' or '1m' -> int"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run benchmarks and compare against baselines')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated catalog sizes, e.g. 1k,100k,1m')
+    parser.add_argument('--only', help=f"Comma-separated benchmarks ({', '.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timed runs per benchmark (best is kept)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed throughput drop below baseline (0.25 = 25%%)')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline JSON file')
+    parser.add_argument('--update', action='store_true', help='Save these results as the new baselines')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+
+    print(f"Running {len(names)} benchmarks at sizes {sizes} (best of {args.repeat})")
+    results = run_suite(names, sizes, args.repeat)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine_info(), 'results': results}, f, indent=2)
+
+    if args.update:
+        save_baselines(results, args.baseline)
+        print(f"\nSaved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    baselines = load_baselines(args.baseline)
+    regressions = compare(results, baselines, args.tolerance)
+    compared = sum(1 for key in results if key in baselines)
+    print(f"\nCompared {compared} of {len(results)} results with {args.baseline} (tolerance {args.tolerance:.0%})")
+    for key, before, after, change in regressions:
+        print(f"  REGRESSION {key}: {before:,.0f} -> {after:,.0f} items/s ({change:+.1%})")
+    if regressions:
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,67 +1,166 @@
 """
 Brand detection module
-Detects brands from product names using a hardcoded brand list
+Detects brands from product names using the external brand dictionary (brands.json)
 
 Product Data Processing Tool - Developer Test Assignment
 Developed by Sanchit Kathpalia
 LinkedIn: https://www.linkedin.com/in/sanchit-kathpalia-a841b5252/
 """
-import re
-
-# Hardcoded brand list
-BRANDS = [
-    "Coca-Cola", "Coca Cola", "Coke",
-    "Lucozade",
-    "Red Bull",
-    "Pepsi",
-    "Fanta",
-    "Sprite",
-    "7UP", "7-Up",
-    "Tango",
-    "Dr Pepper", "Dr. Pepper",
-    "Monster",
-    "Rockstar",
-    "Relentless",
-    "Powerade",
-    "Gatorade",
-    "Ribena",
-    "Robinsons",
-    "Innocent",
-    "Tropicana",
-    "Ocean Spray",
-    "Volvic",
-    "Evian",
-    "Highland Spring",
-]
+from collections import namedtuple
+
+from brand_index import BrandIndexHolder, tokenize
+from config import BRAND_CONFIG
+
+BrandMatch = namedtuple('BrandMatch', ['brand', 'confidence', 'method'])
+UNKNOWN_MATCH = BrandMatch("Unknown", 0.0, 'none')
+
+# Normalized names remembered by the batch/streaming paths before the cache is reset
+BATCH_CACHE_SIZE = 100000
+
+_holder = None
+
+def _build_fuzzy_index(index):
+    """Fuzzy candidate index for a brand index, or None when the fuzzy tier is off"""
+    if not BRAND_CONFIG.get('fuzzy_enabled', True):
+        return None
+    from brand_fuzzy import FuzzyBrandIndex
+    return FuzzyBrandIndex(index.phrases())
+
+def get_brand_indexes():
+    """
+    Return the current (brand index, fuzzy index or None) pair
+    The brand index is memory-mapped and hot-reloaded when the dictionary file in
+    BRAND_CONFIG changes; the fuzzy index is rebuilt with it, off the request path
+    """
+    global _holder
+    if _holder is None:
+        _holder = BrandIndexHolder(
+            BRAND_CONFIG['dictionary_file'],
+            BRAND_CONFIG.get('index_file'),
+            BRAND_CONFIG.get('reload_interval', 5),
+            derive=_build_fuzzy_index,
+        )
+    return _holder.get_with_derived()
+
+def loaded_brand_indexes():
+    """The (brand index, fuzzy index or None) pair if already loaded, else None; never loads them"""
+    return _holder.loaded() if _holder is not None else None
+
+def get_brand_index():
+    """Return the current brand index (see get_brand_indexes)"""
+    return get_brand_indexes()[0]
+
+def warm_up():
+    """Open the brand index and build its fuzzy index now rather than on the first lookup"""
+    get_brand_indexes()
+
+def match_brand(name):
+    """
+    Detect brand from product name with a confidence score
+    Returns BrandMatch(brand, confidence, method) where method is
+    'exact', 'fuzzy' or 'none'
+    """
+    if not name:
+        return UNKNOWN_MATCH
+    
+    return _match_tokens(tokenize(name))
+
+def _match_tokens(tokens):
+    """Brand match for an already tokenized name"""
+    if not tokens:
+        return UNKNOWN_MATCH
+    
+    index, fuzzy_index = get_brand_indexes()
+    found = index.find_tokens(tokens)
+    if found:
+        return BrandMatch(found[0], 1.0, 'exact')
+    
+    # Typo-tolerant tier, only tried when the exact matcher misses
+    if fuzzy_index is not None:
+        fuzzy = fuzzy_index.search(tokens, max_work=BRAND_CONFIG.get('fuzzy_max_work', 2000))
+        if fuzzy and fuzzy[1] >= BRAND_CONFIG.get('fuzzy_min_confidence', 0.8):
+            return BrandMatch(fuzzy[0], fuzzy[1], 'fuzzy')
+    
+    return UNKNOWN_MATCH
 
 def detect_brand(name):
     """
     Detect brand from product name
-    Returns brand name if found, "Unknown" otherwise
+    Returns the canonical brand name if found, "Unknown" otherwise
+    Uses longest-leftmost, whole-word matching, so "Coca-Cola" wins over "Coke"
+    regardless of list order and "Tango" does not match "Tangos"; typos such as
+    "Luczade" are caught by the fuzzy tier
     """
-    if not name:
-        return "Unknown"
+    return match_brand(name).brand
+
+def match_brands(names, stats=None, cache_size=BATCH_CACHE_SIZE):
+    """
+    Detect brands for many names, running detection once per normalized name
+    (names with the same lowercase word tokens always get the same result)
     
-    name_lower = name.lower()
+    Args:
+        names: Iterable of product names
+        stats: Optional dict filled with 'total', 'unique' and 'unique_ratio'
+        cache_size: Normalized names remembered at once (bounds memory on huge streams)
+    
+    Returns:
+        Generator of BrandMatch in input order
+    """
+    cache = {}
+    total = 0
+    unique = 0
+    for name in names:
+        tokens = tokenize(name)
+        key = ' '.join(tokens)
+        match = cache.get(key)
+        if match is None:
+            if len(cache) >= cache_size:
+                cache.clear()
+            match = cache[key] = _match_tokens(tokens)
+            unique += 1
+        total += 1
+        if stats is not None:
+            stats.update(total=total, unique=unique, unique_ratio=round(unique / total, 4))
+        yield match
+
+def _product_name(product):
+    return product.get('name', '') or product.get('original_name', '')
+
+def _apply_match(product, match):
+    product['brand'] = match.brand
+    product['brand_confidence'] = match.confidence
+    return product
+
+def add_brand(product):
+    """
+    Add brand detection (brand and brand_confidence) to a single product in place and return it
+    """
+    return _apply_match(product, match_brand(_product_name(product)))
+
+def iter_brand_products(products, stats=None):
+    """
+    Add brand detection to products one at a time from any iterable
+    Repeated names are only detected once (see match_brands)
+    """
+    current = []
     
-    # Check each brand (case-insensitive)
-    for brand in BRANDS:
-        brand_lower = brand.lower()
-        
-        # Exact match or brand appears in name
-        if brand_lower in name_lower:
-            # Return the original brand name (with proper casing)
-            return brand
+    def names():
+        for product in products:
+            current.append(product)
+            yield _product_name(product)
     
-    return "Unknown"
+    for match in match_brands(names(), stats):
+        yield _apply_match(current.pop(), match)
 
-def add_brand_to_products(products):
+def add_brand_to_products(products, stats=None):
     """
     Add brand detection to a list of products
+    Detection runs once per unique normalized name; pass a dict as stats to get
+    the unique-to-total ratio
     """
-    for product in products:
-        product_name = product.get('name', '') or product.get('original_name', '')
-        product['brand'] = detect_brand(product_name)
+    matches = match_brands((_product_name(p) for p in products), stats)
+    for product, match in zip(products, matches):
+        _apply_match(product, match)
     
     return products
 
@@ -75,13 +174,14 @@ def main():
         "Some Unknown Product 200ml",
         "Fanta Orange 330ml",
         "Sprite Lemon Lime",
+        "Luczade Sport 500ml",
     ]
     
     print("Brand Detection Test:")
-    print("-" * 50)
+    print("-" * 60)
     for name in test_names:
-        brand = detect_brand(name)
-        print(f"{name:40} -> {brand}")
+        match = match_brand(name)
+        print(f"{name:40} -> {match.brand} ({match.method}, {match.confidence:.2f})")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,207 @@
+"""
+Fuzzy brand matching
+Second tier used only when the exact matcher misses. Brand phrases are compacted
+("Coca Cola" -> "cocacola") and indexed by character trigram and key length; a
+product name's token windows only get compared against brands of similar length
+sharing enough trigrams, then the candidates are verified with a bounded edit
+distance. Each search has a work budget so a pathological name cannot stall a request;
+it counts work rather than time, so the same name always gets the same answer however
+busy the machine is.
+"""
+from brand_index import tokenize
+
+# Keys shorter than this are never fuzzy-matched (too many false positives: "Tango" vs "Tangos")
+MIN_KEY_LENGTH = 6
+
+# Candidates verified per window, best trigram overlap first
+MAX_CANDIDATES = 20
+
+# Trigrams shared by more brands than this are too common to be useful and are skipped
+MAX_POSTING_LENGTH = 1000
+
+# Largest edit distance ever allowed (see max_distance)
+MAX_EDITS = 2
+
+
+def max_distance(length):
+    """Edit distance allowed for a brand key of the given length"""
+    if length < MIN_KEY_LENGTH:
+        return 0
+    if length < 10:
+        return 1
+    return 2
+
+
+def trigrams(text):
+    """Character trigrams of text, padded so short words still produce grams"""
+    padded = f"^{text}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class WorkBudget:
+    """Units of search work left: window characters, trigram postings read and distance cells"""
+
+    def __init__(self, units):
+        self.remaining = units
+
+    def spend(self, units):
+        """Take units from the budget; False once it is exhausted"""
+        self.remaining -= units
+        return self.remaining >= 0
+
+
+def bounded_distance(a, b, limit, budget=None):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+    Returns None as soon as the distance is known to exceed limit, or once the
+    WorkBudget runs out (one unit per table cell)
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        if budget is not None and not budget.spend(len(b)):
+            return None
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if (before_previous is not None and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return None
+        before_previous, previous = previous, current
+
+    distance = previous[-1]
+    return distance if distance <= limit else None
+
+
+class FuzzyBrandIndex:
+    """
+    Trigram candidate index over compacted brand phrases
+
+    Example:
+        index = FuzzyBrandIndex([("Lucozade", "Lucozade")])
+        index.search(tokenize("Luczade Energy"))  # -> ("Lucozade", 0.88)
+    """
+
+    def __init__(self, phrases):
+        """
+        Args:
+            phrases: Iterable of (phrase, canonical brand) pairs
+        """
+        self._keys = []
+        self._brands = []
+        self._postings = {}
+        self.max_tokens = 0
+        self.max_key_length = 0
+
+        seen = set()
+        for phrase, canonical in phrases:
+            tokens = tokenize(phrase)
+            key = ''.join(tokens)
+            if len(key) < MIN_KEY_LENGTH or key in seen:
+                continue
+            seen.add(key)
+            entry = len(self._keys)
+            self._keys.append(key)
+            self._brands.append(canonical)
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, {}).setdefault(len(key), []).append(entry)
+            self.max_tokens = max(self.max_tokens, len(tokens))
+            self.max_key_length = max(self.max_key_length, len(key))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, tokens, max_work=None):
+        """
+        Find the closest brand to any window of consecutive tokens
+
+        Args:
+            tokens: Lowercase name tokens (see brand_index.tokenize)
+            max_work: Work units allowed for the search (see WorkBudget); the best
+                match found so far is returned when they run out
+
+        Returns:
+            (canonical brand, confidence 0-1) or None
+        """
+        budget = WorkBudget(max_work) if max_work else None
+        # A brand may be split into one more token than in the dictionary ("Luco Zade")
+        window_tokens = self.max_tokens + 1
+        best = None
+
+        for start in range(len(tokens)):
+            window = ''
+            for end in range(start, min(len(tokens), start + window_tokens)):
+                window += tokens[end]
+                if len(window) > self.max_key_length + 2:
+                    break
+                if len(window) < MIN_KEY_LENGTH - 1:
+                    continue
+                candidates = self._candidates(window, budget)
+                if candidates is None:
+                    return self._result(best)
+
+                for entry in candidates:
+                    key = self._keys[entry]
+                    distance = bounded_distance(window, key, max_distance(len(key)), budget)
+                    if budget is not None and budget.remaining < 0:
+                        return self._result(best)
+                    if distance is None:
+                        continue
+                    rank = (distance, -len(key), start)
+                    if best is None or rank < best[0]:
+                        best = (rank, entry, window)
+
+        return self._result(best)
+
+    def _candidates(self, window, budget=None):
+        """
+        Entries of similar length sharing enough trigrams with window to possibly
+        be within MAX_EDITS edits; None if the budget ran out while collecting
+        """
+        if budget is not None and not budget.spend(len(window)):
+            return None
+        grams = trigrams(window)
+        lengths = range(len(window) - MAX_EDITS, len(window) + MAX_EDITS + 1)
+        # Each edit destroys at most 3 trigrams; skipped common grams lower the bar too
+        threshold = len(grams) - 3 * MAX_EDITS
+        counts = {}
+        for gram in grams:
+            by_length = self._postings.get(gram)
+            if not by_length:
+                continue
+            postings = [by_length[length] for length in lengths if length in by_length]
+            size = sum(len(posting) for posting in postings)
+            if size > MAX_POSTING_LENGTH:
+                threshold -= 1
+                continue
+            if budget is not None and not budget.spend(size):
+                return None
+            for posting in postings:
+                for entry in posting:
+                    counts[entry] = counts.get(entry, 0) + 1
+        threshold = max(1, threshold)
+        candidates = [entry for entry, count in counts.items() if count >= threshold]
+        candidates.sort(key=lambda entry: -counts[entry])
+        return candidates[:MAX_CANDIDATES]
+
+    def _result(self, best):
+        if best is None:
+            return None
+        (distance, _, _), entry, window = best
+        key = self._keys[entry]
+        confidence = 1 - distance / max(len(key), len(window))
+        return self._brands[entry], round(confidence, 2)
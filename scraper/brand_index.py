@@ -0,0 +1,350 @@
+"""
+Prebuilt brand index
+Compiles the external brand dictionary (canonical brand -> aliases) into a binary
+hash table that is memory-mapped read-only, so every worker process shares the same
+pages instead of building its own matcher. BrandIndexHolder swaps in a rebuilt index
+when the dictionary file changes, without blocking readers.
+
+Index file layout (little endian):
+    header  magic, version, max_tokens, slot_count, name_count,
+            dictionary mtime_ns, dictionary size, dictionary digest
+    slots   slot_count x (phrase offset + 1, canonical name id or PREFIX_ONLY); offset 0 = empty
+    names   name_count x canonical name offset
+    blob    length-prefixed UTF-8 strings (phrases and canonical names)
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import re
+import zlib
+
+MAGIC = b'BRANDIX1'
+INDEX_VERSION = 2
+HEADER = struct.Struct('<8sIIIIQQ16s')
+SLOT = struct.Struct('<II')
+OFFSET = struct.Struct('<I')
+LENGTH = struct.Struct('<H')
+
+# Name id stored for phrase prefixes that are not brands themselves,
+# letting lookups walk the hash table like a trie and stop at the first miss
+PREFIX_ONLY = 0xFFFFFFFF
+
+# Words are runs of letters/digits; punctuation and spaces are boundaries,
+# so "Coca-Cola", "coca cola" and "COCA COLA" all tokenize the same way
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def load_brand_dictionary(path):
+    """
+    Load a brand dictionary file
+    Format: JSON object of {"Canonical Brand": ["Alias", ...], ...}
+    Returns (brands, aliases) where aliases is {alias: canonical}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object of brand -> aliases")
+
+    brands = list(data)
+    aliases = {}
+    for canonical, alias_list in data.items():
+        for alias in alias_list or []:
+            aliases.setdefault(alias, canonical)
+    return brands, aliases
+
+
+def _dictionary_stat(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+
+def compile_index(dictionary_path, index_path):
+    """
+    Compile a brand dictionary into an index file
+    Writes to a temporary file and renames it, so readers never see a partial index
+    """
+    mtime_ns, size = _dictionary_stat(dictionary_path)
+    digest = _digest(dictionary_path)
+    brands, aliases = load_brand_dictionary(dictionary_path)
+
+    # Phrase -> canonical name id; the first mapping for a phrase wins (brands before aliases)
+    names = []
+    name_ids = {}
+    phrases = {}
+    max_tokens = 0
+    for phrase, canonical in [(b, b) for b in brands] + list(aliases.items()):
+        tokens = tokenize(phrase)
+        if not tokens:
+            continue
+        key = ' '.join(tokens)
+        if key in phrases:
+            continue
+        if canonical not in name_ids:
+            name_ids[canonical] = len(names)
+            names.append(canonical)
+        phrases[key] = name_ids[canonical]
+        max_tokens = max(max_tokens, len(tokens))
+
+    # Add every proper prefix of a multi-word phrase so lookups can stop early
+    for key in list(phrases):
+        tokens = key.split(' ')
+        for length in range(1, len(tokens)):
+            phrases.setdefault(' '.join(tokens[:length]), PREFIX_ONLY)
+
+    slot_count = 8
+    while slot_count < len(phrases) * 2:
+        slot_count *= 2
+
+    blob = bytearray()
+
+    def add_string(text):
+        data = text.encode('utf-8')
+        offset = len(blob)
+        blob.extend(LENGTH.pack(len(data)))
+        blob.extend(data)
+        return offset
+
+    slots = bytearray(slot_count * SLOT.size)
+    mask = slot_count - 1
+    for key, name_id in phrases.items():
+        data = key.encode('utf-8')
+        position = zlib.crc32(data) & mask
+        while SLOT.unpack_from(slots, position * SLOT.size)[0]:
+            position = (position + 1) & mask
+        SLOT.pack_into(slots, position * SLOT.size, add_string(key) + 1, name_id)
+
+    name_offsets = bytearray()
+    for name in names:
+        name_offsets.extend(OFFSET.pack(add_string(name)))
+
+    header = HEADER.pack(MAGIC, INDEX_VERSION, max_tokens, slot_count, len(names), mtime_ns, size, digest)
+
+    directory = os.path.dirname(index_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(slots)
+        f.write(name_offsets)
+        f.write(blob)
+    os.replace(tmp_path, index_path)
+
+
+class MappedBrandIndex:
+    """
+    Read-only, memory-mapped brand index
+    match() finds the longest-leftmost brand phrase on whole-word boundaries,
+    in O(name tokens x longest brand in tokens) independent of dictionary size
+    """
+
+    def __init__(self, index_path):
+        self.path = index_path
+        with open(index_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.max_tokens, self._slot_count, self.name_count,
+         self.source_mtime_ns, self.source_size, self.digest) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{index_path} is not a brand index (version {INDEX_VERSION})")
+
+        self._slots_start = HEADER.size
+        self._names_start = self._slots_start + self._slot_count * SLOT.size
+        self._blob_start = self._names_start + self.name_count * OFFSET.size
+        self._name_cache = {}
+
+    @property
+    def fingerprint(self):
+        """Hex digest of the dictionary this index was built from"""
+        return self.digest.hex()
+
+    def is_stale(self, dictionary_path):
+        """True if the dictionary file changed since this index was built"""
+        try:
+            return _dictionary_stat(dictionary_path) != (self.source_mtime_ns, self.source_size)
+        except OSError:
+            return False
+
+    def _string(self, offset):
+        position = self._blob_start + offset
+        (length,) = LENGTH.unpack_from(self._mm, position)
+        return self._mm[position + LENGTH.size:position + LENGTH.size + length]
+
+    def _name(self, name_id):
+        name = self._name_cache.get(name_id)
+        if name is None:
+            (offset,) = OFFSET.unpack_from(self._mm, self._names_start + name_id * OFFSET.size)
+            name = self._string(offset).decode('utf-8')
+            self._name_cache[name_id] = name
+        return name
+
+    def _lookup_id(self, phrase):
+        """Return the name id (or PREFIX_ONLY) stored for a normalized phrase, or None"""
+        data = phrase.encode('utf-8')
+        mask = self._slot_count - 1
+        position = zlib.crc32(data) & mask
+        while True:
+            offset_plus_one, name_id = SLOT.unpack_from(self._mm, self._slots_start + position * SLOT.size)
+            if not offset_plus_one:
+                return None
+            if self._string(offset_plus_one - 1) == data:
+                return name_id
+            position = (position + 1) & mask
+
+    def lookup(self, phrase):
+        """Return the canonical brand for an exact normalized phrase, or None"""
+        name_id = self._lookup_id(phrase)
+        if name_id is None or name_id == PREFIX_ONLY:
+            return None
+        return self._name(name_id)
+
+    def find_tokens(self, tokens):
+        """
+        Find the longest-leftmost match in a token list
+        Returns (canonical, start, end) token positions or None
+        """
+        count = len(tokens)
+        for start in range(count):
+            phrase = tokens[start]
+            end = start + 1
+            best = None
+            while True:
+                name_id = self._lookup_id(phrase)
+                if name_id is None:
+                    break
+                if name_id != PREFIX_ONLY:
+                    best = (name_id, start, end)
+                if end == count:
+                    break
+                phrase = phrase + ' ' + tokens[end]
+                end += 1
+            if best is not None:
+                return self._name(best[0]), best[1], best[2]
+        return None
+
+    def match(self, name):
+        """Return the canonical brand found in name, or None"""
+        found = self.find_tokens(tokenize(name))
+        return found[0] if found else None
+
+    def brands(self):
+        """All canonical brand names in the index"""
+        return [self._name(name_id) for name_id in range(self.name_count)]
+
+    def phrases(self):
+        """Yield every (normalized phrase, canonical brand) pair in the index"""
+        for position in range(self._slot_count):
+            offset_plus_one, name_id = SLOT.unpack_from(self._mm, self._slots_start + position * SLOT.size)
+            if offset_plus_one and name_id != PREFIX_ONLY:
+                yield self._string(offset_plus_one - 1).decode('utf-8'), self._name(name_id)
+
+
+def open_index(dictionary_path, index_path):
+    """Open the index for a dictionary, (re)compiling it first if missing or stale"""
+    try:
+        index = MappedBrandIndex(index_path)
+        if not index.is_stale(dictionary_path):
+            return index
+    except (OSError, ValueError):
+        pass
+    compile_index(dictionary_path, index_path)
+    return MappedBrandIndex(index_path)
+
+
+class BrandIndexHolder:
+    """
+    Holds the current brand index and hot-reloads it when the dictionary changes
+
+    get() never waits on a rebuild: when the dictionary is found to be stale, one
+    background thread recompiles the index (and rebuilds the derived structure,
+    e.g. the fuzzy index) while every caller keeps using the current one. Swapping
+    is a single reference assignment of the (index, derived) pair, so in-flight
+    callers holding the old index are unaffected.
+    """
+
+    def __init__(self, dictionary_path, index_path=None, reload_interval=5.0, derive=None):
+        """
+        Args:
+            dictionary_path: Brand dictionary JSON file
+            index_path: Compiled index file (default dictionary_path + '.idx')
+            reload_interval: Seconds between staleness checks
+            derive: Optional function building a structure from each index;
+                it runs under the reload lock, off the request path after the first load
+        """
+        self.dictionary_path = dictionary_path
+        self.index_path = index_path or dictionary_path + '.idx'
+        self.reload_interval = reload_interval
+        self.derive = derive
+        self._current = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._reload_thread = None
+
+    def get(self):
+        """Return the current index, loading it on first use"""
+        return self.get_with_derived()[0]
+
+    def get_with_derived(self):
+        """Return the current (index, derived structure or None) pair, loading it on first use"""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = self._load()
+                    self._next_check = time.monotonic() + self.reload_interval
+                return self._current
+
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            reloading = False
+            try:
+                self._next_check = now + self.reload_interval
+                if current[0].is_stale(self.dictionary_path):
+                    # The reload thread releases the lock once the new pair is swapped in
+                    thread = threading.Thread(target=self._reload, name='brand-index-reload', daemon=True)
+                    thread.start()
+                    self._reload_thread = thread
+                    reloading = True
+            finally:
+                if not reloading:
+                    self._lock.release()
+        return current
+
+    def loaded(self):
+        """Return the current (index, derived) pair, or None before the first load; never loads or reloads"""
+        return self._current
+
+    def wait_for_reload(self, timeout=None):
+        """Block until a background reload in progress (if any) has finished"""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _load(self):
+        index = open_index(self.dictionary_path, self.index_path)
+        return index, self.derive(index) if self.derive else None
+
+    def _reload(self):
+        try:
+            self._current = self._load()
+            print(f"Reloaded brand dictionary from {self.dictionary_path}")
+        except (OSError, ValueError) as e:
+            print(f"Warning: keeping previous brand index, reload failed: {e}")
+        finally:
+            self._lock.release()
@@ -0,0 +1,208 @@
+"""
+Columnar product files: Parquet and Arrow IPC
+Products are written with a typed schema in row groups (one group per
+OUTPUT_CONFIG['row_group_size'] products, so memory stays bounded) with zstd
+compression, optionally into hive-style partitions such as
+products_final.parquet/site=books_toscrape/run_date=2026-01-31/part-0.parquet.
+Readers stream row groups back and only decode the requested columns.
+
+Requires the optional pyarrow package.
+"""
+import bisect
+import json
+import os
+from urllib.parse import quote, unquote
+
+try:
+    import pyarrow as pa  # Optional: Parquet / Arrow IPC output
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from config import OUTPUT_CONFIG
+from product_record import FIELDS, to_dict
+
+COLUMNAR_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Column types; every other key of a product is kept as JSON text in 'extra'
+COLUMN_TYPES = {'brand_confidence': 'float64', 'cluster_id': 'int64'}
+EXTRA_COLUMN = 'extra'
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet/Arrow output needs pyarrow: pip install pyarrow")
+
+
+def product_schema():
+    """Typed Arrow schema for products (nullable columns: unset fields are null)"""
+    require_pyarrow()
+    columns = [(field, getattr(pa, COLUMN_TYPES.get(field, 'string'))()) for field in FIELDS]
+    return pa.schema(columns + [(EXTRA_COLUMN, pa.string())])
+
+
+def partition_dirs(partition):
+    """['site=...', 'run_date=...'] for the partition keys in OUTPUT_CONFIG['partition_by']"""
+    return [f"{key}={quote(str(partition[key]), safe='')}"
+            for key in OUTPUT_CONFIG.get('partition_by', ()) if partition.get(key) is not None]
+
+
+def partition_path(root, partition, fmt):
+    """File for one partition of the dataset at root"""
+    return os.path.join(root, *partition_dirs(partition), 'part-0' + COLUMNAR_EXTENSIONS[fmt])
+
+
+def _columns_table(columns, schema):
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def _empty_columns(schema):
+    return {name: [] for name in schema.names}
+
+
+def write_columnar(path, products, fmt):
+    """
+    Stream products into a Parquet or Arrow IPC file, one row group at a time
+    Returns how many were written; the caller handles the temporary file
+    """
+    require_pyarrow()
+    schema = product_schema()
+    row_group_size = OUTPUT_CONFIG.get('row_group_size', 65536)
+    compression = OUTPUT_CONFIG.get('compression', 'zstd')
+    level = OUTPUT_CONFIG.get('compression_level')
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression=compression, compression_level=level)
+        write = writer.write_table
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=pa.Codec(compression, level) if compression else None)
+        writer = pa.ipc.new_file(path, schema, options=options)
+        write = writer.write_table
+
+    count = 0
+    columns = _empty_columns(schema)
+    try:
+        for product in products:
+            data = dict(to_dict(product))
+            for field in FIELDS:
+                columns[field].append(data.pop(field, None))
+            columns[EXTRA_COLUMN].append(json.dumps(data, ensure_ascii=False) if data else None)
+            count += 1
+            if count % row_group_size == 0:
+                write(_columns_table(columns, schema))
+                columns = _empty_columns(schema)
+        if columns[EXTRA_COLUMN] or count == 0:
+            write(_columns_table(columns, schema))
+    finally:
+        writer.close()
+    return count
+
+
+def _dataset_files(root, fmt, partition_filter):
+    """(path, {partition key: value}) for every file under a partitioned dataset, in sorted order"""
+    extension = COLUMNAR_EXTENSIONS[fmt]
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        relative = os.path.relpath(directory, root)
+        values = {}
+        for part in ([] if relative == '.' else relative.split(os.sep)):
+            key, _, value = part.partition('=')
+            values[key] = unquote(value)
+        if any(key in values and values[key] != str(wanted) for key, wanted in (partition_filter or {}).items()):
+            continue
+        for name in sorted(files):
+            if name.endswith(extension):
+                yield os.path.join(directory, name), values
+
+
+def _record_batches(path, fmt, columns):
+    if fmt == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        names = parquet_file.schema_arrow.names
+        selected = None if columns is None else [name for name in names if name in columns or name == EXTRA_COLUMN]
+        yield from parquet_file.iter_batches(columns=selected)
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        names = reader.schema.names
+        selected = None if columns is None else [name for name in names if name in columns or name == EXTRA_COLUMN]
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            yield batch if selected is None else pa.Table.from_batches([batch]).select(selected)
+
+
+def read_columnar(path, fmt, columns=None, partition_filter=None):
+    """
+    Stream products from a Parquet/Arrow file or partitioned dataset directory
+    columns limits the fields decoded (partition keys count as fields);
+    partition_filter skips partitions, e.g. {'site': 'books_toscrape'}
+    """
+    require_pyarrow()
+    wanted = None if columns is None else set(columns)
+    if os.path.isdir(path):
+        files = _dataset_files(path, fmt, partition_filter)
+    else:
+        files = [(path, {})]
+    for file_path, partition in files:
+        partition = {key: value for key, value in partition.items() if wanted is None or key in wanted}
+        for batch in _record_batches(file_path, fmt, wanted):
+            for row in batch.to_pylist():
+                product = _row_product(row, wanted)
+                product.update(partition)
+                yield product
+
+
+def _row_product(row, wanted=None):
+    """Product dict for one row: null columns dropped, 'extra' JSON merged back in"""
+    extra = row.pop(EXTRA_COLUMN, None)
+    product = {key: value for key, value in row.items() if value is not None}
+    if extra:
+        product.update((key, value) for key, value in json.loads(extra).items()
+                       if wanted is None or key in wanted)
+    return product
+
+
+class ColumnarRowReader:
+    """
+    Read single rows of one Parquet/Arrow file by row number
+    Only the row group holding the last requested row is kept decoded,
+    so lookups in roughly file order stay cheap
+    """
+
+    def __init__(self, path, fmt):
+        require_pyarrow()
+        self._map = None
+        if fmt == 'parquet':
+            self._source = pq.ParquetFile(path)
+            sizes = [self._source.metadata.row_group(i).num_rows for i in range(self._source.num_row_groups)]
+            self._read_group = self._source.read_row_group
+        else:
+            self._map = pa.memory_map(path)
+            self._source = pa.ipc.open_file(self._map)
+            sizes = [self._source.get_batch(i).num_rows for i in range(self._source.num_record_batches)]
+            self._read_group = self._source.get_batch
+        self._starts = []
+        start = 0
+        for size in sizes:
+            self._starts.append(start)
+            start += size
+        self.num_rows = start
+        self._group = None
+        self._group_index = None
+
+    def row(self, number):
+        """Product at row number (0-based)"""
+        if not 0 <= number < self.num_rows:
+            raise IndexError(f"row {number} out of range")
+        index = bisect.bisect_right(self._starts, number) - 1
+        if index != self._group_index:
+            self._group = self._read_group(index)
+            self._group_index = index
+        return _row_product(self._group.slice(number - self._starts[index], 1).to_pylist()[0])
+
+    def close(self):
+        self._group = None
+        if self._map is not None:
+            self._map.close()
+        else:
+            self._source.close()
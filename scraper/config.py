@@ -54,6 +54,18 @@ SCRAPING_SITES = {
         ],
         'enabled': False,  # Requires JavaScript
     },
+    'synthetic': {
+        'name': 'Synthetic Storefront (local)',
+        # Start it with: python synthetic_site.py (see SYNTHETIC_SITE_CONFIG)
+        'base_url': os.environ.get('SYNTHETIC_SITE_URL', 'http://127.0.0.1:8765/'),
+        'category_paths': [],  # found from the home page navigation
+        'product_selectors': [
+            {'tag': 'div', 'class': 'product-card'},
+        ],
+        'max_pages': 1000,  # listing pages per category
+        'delay_between_requests': 0,  # local server: no politeness delay
+        'enabled': True,
+    },
     'custom': {
         'name': 'Custom URL',
         'base_url': '',  # Will be provided by user
@@ -67,6 +79,18 @@ SCRAPING_SITES = {
     }
 }
 
+# Local synthetic storefront (synthetic_site.py), served for the 'synthetic' site above
+SYNTHETIC_SITE_CONFIG = {
+    'host': '127.0.0.1',
+    'port': int(os.environ.get('SYNTHETIC_SITE_PORT', 8765)),
+    'products': 100000,  # catalog size; pages are rendered on request, so 1M+ is fine
+    'page_size': 48,  # products per category listing page
+    'seed': 0,  # same seed, same catalog
+    'latency_ms': 0,  # added to every response
+    'jitter_ms': 0,  # random +/- spread on the latency
+    'error_rate': 0.0,  # fraction of requests answered with 500/503
+}
+
 # Default scraper settings
 SCRAPER_CONFIG = {
     'default_site': 'wegetanystock',  # Default site to scrape
@@ -77,37 +101,103 @@ SCRAPER_CONFIG = {
     'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
 }
 
+# Background scrape jobs (backend/jobs.py)
+JOB_CONFIG = {
+    'database': os.environ.get('JOBS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'jobs.db')),
+    # Limits count the jobs of every server process sharing the database
+    'max_workers': int(os.environ.get('JOB_WORKERS', 4)),  # scrapes running at once
+    'per_site_limit': 1,  # scrapes running at once against the same site (custom URLs: per host)
+    'site_limits': {},  # per-site or per-host overrides, e.g. {'custom': 2, 'shop.example': 3}
+    'max_pending': 50,  # queued jobs beyond this are rejected (503)
+    'max_pending_per_site': 10,  # queued jobs per site beyond this are rejected (429)
+    'queue_timeout': 120,  # seconds a job may wait for a worker before it fails
+    'job_timeout': 600,  # seconds a scrape may run before it fails
+    'heartbeat_interval': 10,  # seconds between a server process's heartbeats on its jobs
+    'heartbeat_timeout': 60,  # queued/running jobs without a heartbeat this long are failed as orphaned
+    'dispatch_interval': 1.0,  # seconds between retries of queued jobs waiting on another process's slots
+    'estimated_job_seconds': 30,  # starting guess of scrape duration for Retry-After
+    'retention_seconds': 3600,  # finished jobs (and their results) are kept this long
+    # Finished jobs are reused as a result cache for identical site/url/maxProducts requests
+    'cache_ttl': 300,  # seconds a result is served as fresh
+    'stale_while_revalidate': 600,  # further seconds it is served stale while a refresh runs
+    'max_cached_results': 100,  # least recently used finished jobs beyond this are evicted
+}
+
+# Indexed product store (scraper/product_store.py, served at /api/products)
+STORE_CONFIG = {
+    'database': os.environ.get('PRODUCTS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'products.db')),
+    'batch_size': 1000,  # products per upsert transaction
+    'cache_kb': 65536,  # SQLite page cache for bulk upserts (index pages stay in memory)
+    'page_size': 50,  # default /api/products page size
+    'max_page_size': 200,
+    'relevance_window': 1000,  # matches ranked together; broader queries rank newest matches first
+}
+
+# /api/process limits and batching (backend/app.py)
+PROCESS_CONFIG = {
+    'max_body_bytes': 20 * 1024 * 1024,  # larger request bodies get 413
+    'max_names': 200000,  # more names than this get 413
+    'max_name_length': 1000,  # any longer name gets 413
+    'chunk_size': 5000,  # names cleaned and branded per batch
+    'compress_min_names': 1000,  # gzip/brotli responses with at least this many names
+}
+
+# Runtime metrics (scraper/metrics.py, served at /api/metrics)
+METRICS_CONFIG = {
+    'enabled': os.environ.get('METRICS_ENABLED', '1') != '0',  # METRICS_ENABLED=0 turns every timer into a no-op
+    # Histogram bucket upper bounds in seconds
+    'buckets': [0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30],
+}
+
 # Data cleaning settings
 CLEANING_CONFIG = {
     'descriptors_to_remove': ['Can', 'Bottle', 'Bar', 'Pack', 'Pk', 'Pkt', 'Packet'],
     'case_style': 'title',  # 'title', 'upper', 'lower', 'original'
 }
 
-# Brand list (can be extended)
-BRANDS = [
-    "Coca-Cola", "Coca Cola", "Coke",
-    "Lucozade",
-    "Red Bull",
-    "Pepsi",
-    "Fanta",
-    "Sprite",
-    "7UP", "7-Up",
-    "Tango",
-    "Dr Pepper", "Dr. Pepper",
-    "Monster",
-    "Rockstar",
-    "Relentless",
-    "Powerade",
-    "Gatorade",
-    "Ribena",
-    "Robinsons",
-    "Innocent",
-    "Tropicana",
-    "Ocean Spray",
-    "Volvic",
-    "Evian",
-    "Highland Spring",
-]
+# Brand dictionary settings
+# The dictionary is a JSON object of {"Canonical Brand": ["Alias", ...]} and is compiled
+# into a memory-mapped index, rebuilt automatically when the dictionary file changes
+BRAND_CONFIG = {
+    'dictionary_file': os.environ.get('BRAND_DICTIONARY', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'brands.json')),
+    'index_file': os.environ.get('BRAND_INDEX'),  # defaults to <dictionary_file>.idx
+    'reload_interval': 5,  # seconds between dictionary change checks
+    'fuzzy_enabled': True,  # try typo-tolerant matching when no exact brand is found
+    'fuzzy_min_confidence': 0.8,  # fuzzy matches below this are reported as "Unknown"
+    'fuzzy_max_work': 2000,  # fuzzy search work per name (see brand_fuzzy.WorkBudget); counted, not timed, so results never vary with load
+}
+
+# Near-duplicate detection (process_data.py --dedup)
+# Products join a cluster when their name similarity (Jaccard over character
+# shingles) reaches the threshold and brand and canonical quantity agree.
+# num_perm must be a multiple of bands; more bands find more candidate pairs.
+DEDUP_CONFIG = {
+    'threshold': 0.65,
+    'num_perm': 48,
+    'bands': 16,
+    'shingle_size': 3,
+}
+
+# Staged pipeline (process_data.py, scraper/pipeline.py)
+# Stages run concurrently, connected by bounded queues of queue_size items
+PIPELINE_CONFIG = {
+    'queue_size': 256,
+    'workers': {'clean': 2, 'brand': 2, 'process': 2},  # threads per map stage
+    'validate_batch_size': 100,  # products per columnar validation batch
+}
+
+# Distributed crawl workers (crawl_queue.py): a shared SQLite queue of listing pages
+CRAWL_CONFIG = {
+    'database': os.environ.get('CRAWL_QUEUE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'crawl_queue.db')),
+    'batch_size': 1,  # pages leased per round trip (more saves queue writes, but can starve other workers)
+    'lease_seconds': 60,  # a page not finished or heartbeated within this is handed to another worker
+    'heartbeat_interval': 15,
+    'page_lookahead': 8,  # listing pages queued ahead of the last one with products
+    'max_attempts': 3,  # fetch attempts before a page is marked failed
+    'retry_delay': 5,  # seconds before a failed page is retried (times the attempt number)
+    'poll_interval': 1.0,  # idle wait while other workers hold the remaining leases
+    'processes': 4,  # worker processes started by: crawl_queue.py work
+}
 
 # Output settings
 OUTPUT_CONFIG = {
@@ -115,8 +205,18 @@ OUTPUT_CONFIG = {
     'raw_file': 'products_raw.json',
     'cleaned_file': 'products_cleaned.json',
     'final_file': 'products_final.json',
+    'profile_file': 'profile.prof',  # process_data.py --profile
+    'trace_file': 'trace.json',  # process_data.py --trace (Chrome trace / Perfetto)
+    'delta_file': 'products_delta.jsonl',  # process_data.py --delta: changes since the previous run
+    'delta_index_file': 'products_delta.index.json',  # slug -> content hash and price, per site
+    'format': 'json',  # 'json' (pretty-printed array), 'jsonl' (one product per line), 'parquet' or 'arrow'
     'indent': 2,
     'ensure_ascii': False,
+    # Parquet / Arrow IPC output (needs pyarrow)
+    'partition_by': ['site', 'run_date'],  # hive-style directories: site=.../run_date=.../part-0.parquet
+    'row_group_size': 65536,  # products buffered per row group
+    'compression': 'zstd',
+    'compression_level': 3,
 }
 
 # Multipack patterns
@@ -0,0 +1,454 @@
+"""
+Distributed crawl workers
+A crawl is seeded into a shared SQLite queue of listing pages; any number of
+worker processes, on this machine or others sharing the file, lease pages in
+batches, fetch them and write their products to a common sink table.
+
+- Leases: a leased page belongs to one worker until its lease expires. Workers
+  heartbeat to extend their leases; pages of a worker that dies are handed out
+  again once the lease runs out, up to CRAWL_CONFIG['max_attempts'] times.
+- Politeness: each host has one shared "next fetch at" slot, so the site's
+  delay_between_requests holds across all workers, not per worker.
+- Exactly once: a page's products, the pages queued after it and its 'done'
+  mark are committed in one transaction, and only while the worker still holds the
+  lease, so a page re-leased after a timeout never adds its products twice.
+
+Usage:
+    python crawl_queue.py seed --site synthetic --max 5000      # prints the crawl id
+    python crawl_queue.py work --crawl ID --processes 8         # on every machine
+    python crawl_queue.py status --crawl ID
+    python crawl_queue.py export --crawl ID                     # products_raw file for data_cleaning.py
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from config import CRAWL_CONFIG, SCRAPING_SITES, SCRAPER_CONFIG
+from product_record import to_dict
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'  # past the end of its category, or the crawl already has max_products
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    base_url TEXT NOT NULL,
+    max_products INTEGER NOT NULL,
+    max_pages INTEGER NOT NULL,
+    delay REAL NOT NULL,
+    products INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    crawl_id TEXT NOT NULL,
+    category INTEGER NOT NULL,
+    category_url TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    UNIQUE (crawl_id, category, page)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (crawl_id, status, available_at, id);
+CREATE INDEX IF NOT EXISTS tasks_owner ON tasks (owner, status);
+CREATE TABLE IF NOT EXISTS crawl_products (
+    task_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    PRIMARY KEY (task_id, seq)
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    next_fetch_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    crawl_id TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    pages INTEGER NOT NULL DEFAULT 0,
+    products INTEGER NOT NULL DEFAULT 0,
+    stopped_at REAL
+);
+"""
+
+
+def page_url(category_url, page):
+    """Listing page URL, paginated the same way as iter_scrape_products"""
+    return f"{category_url}?page={page}" if '?' not in category_url else f"{category_url}&page={page}"
+
+
+class CrawlQueue:
+    """
+    SQLite crawl queue, product sink and per-host politeness slots
+    Each call opens its own short-lived connection, like JobStore, so one file can
+    be shared by threads, processes and (on a filesystem with working locks) machines
+    """
+
+    def __init__(self, path=None):
+        self.path = path or CRAWL_CONFIG['database']
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the lock up front, so read-then-update cannot race"""
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def create_crawl(self, site, base_url, category_urls, max_products, max_pages, delay, crawl_id=None):
+        """Register a crawl and queue page 1 of every category; seeding an existing id again is a no-op"""
+        crawl_id = crawl_id or uuid.uuid4().hex[:12]
+        with self._transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO crawls (id, site, base_url, max_products, max_pages, delay, created_at)'
+                         ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (crawl_id, site, base_url, max_products, max_pages, delay, time.time()))
+            conn.executemany('INSERT OR IGNORE INTO tasks (crawl_id, category, category_url, page, status)'
+                             ' VALUES (?, ?, ?, 1, ?)',
+                             [(crawl_id, index, url, PENDING) for index, url in enumerate(category_urls)])
+        return crawl_id
+
+    def get_crawl(self, crawl_id):
+        """Crawl row as a dict, or None if unknown"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM crawls WHERE id = ?', (crawl_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def lease(self, crawl_id, worker_id, batch_size=None, lease_seconds=None):
+        """
+        Lease up to batch_size pending pages (oldest first) to a worker
+        Expired leases are returned to the queue first. Returns task dicts
+        with id, category, category_url and page
+        """
+        batch_size = batch_size or CRAWL_CONFIG['batch_size']
+        lease_seconds = lease_seconds or CRAWL_CONFIG['lease_seconds']
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,'
+                         ' owner = NULL, lease_expires = NULL, error = ifnull(error, ?)'
+                         ' WHERE crawl_id = ? AND status = ? AND lease_expires < ?',
+                         (CRAWL_CONFIG['max_attempts'], FAILED, PENDING, 'lease expired', crawl_id, LEASED, now))
+            rows = conn.execute('SELECT id, category, category_url, page FROM tasks'
+                                ' WHERE crawl_id = ? AND status = ? AND available_at <= ? ORDER BY id LIMIT ?',
+                                (crawl_id, PENDING, now, batch_size)).fetchall()
+            conn.executemany('UPDATE tasks SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1'
+                             ' WHERE id = ?', [(LEASED, worker_id, now + lease_seconds, row[0]) for row in rows])
+        return [dict(zip(('id', 'category', 'category_url', 'page'), row)) for row in rows]
+
+    def heartbeat(self, worker_id, lease_seconds=None):
+        """Extend every lease the worker holds; returns how many it still holds"""
+        lease_seconds = lease_seconds or CRAWL_CONFIG['lease_seconds']
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('UPDATE workers SET heartbeat_at = ? WHERE id = ?', (now, worker_id))
+            return conn.execute('UPDATE tasks SET lease_expires = ? WHERE owner = ? AND status = ?',
+                                (now + lease_seconds, worker_id, LEASED)).rowcount
+
+    def complete(self, task, worker_id, products):
+        """
+        Store a page's products and queue the pages after it, in one transaction
+        Returns False (and stores nothing) if the worker lost the lease, because
+        then the page belongs to another worker
+        """
+        with self._transaction() as conn:
+            updated = conn.execute('UPDATE tasks SET status = ?, owner = NULL, lease_expires = NULL, error = NULL'
+                                   ' WHERE id = ? AND owner = ? AND status = ?',
+                                   (DONE, task['id'], worker_id, LEASED)).rowcount
+            if not updated:
+                return False
+            crawl_id, = conn.execute('SELECT crawl_id FROM tasks WHERE id = ?', (task['id'],)).fetchone()
+            conn.executemany('INSERT OR IGNORE INTO crawl_products (task_id, seq, product) VALUES (?, ?, ?)',
+                             [(task['id'], seq, json.dumps(to_dict(product), ensure_ascii=False))
+                              for seq, product in enumerate(products)])
+            conn.execute('UPDATE crawls SET products = products + ? WHERE id = ?', (len(products), crawl_id))
+            conn.execute('UPDATE workers SET pages = pages + 1, products = products + ? WHERE id = ?',
+                         (len(products), worker_id))
+            total, max_products, max_pages = conn.execute(
+                'SELECT products, max_products, max_pages FROM crawls WHERE id = ?', (crawl_id,)).fetchone()
+            if total >= max_products:
+                conn.execute('UPDATE tasks SET status = ? WHERE crawl_id = ? AND status = ?',
+                             (CANCELLED, crawl_id, PENDING))
+            elif products:
+                # Queue a few pages ahead, so several workers can share one category
+                last_page = min(task['page'] + CRAWL_CONFIG['page_lookahead'], max_pages)
+                conn.executemany('INSERT OR IGNORE INTO tasks (crawl_id, category, category_url, page, status)'
+                                 ' VALUES (?, ?, ?, ?, ?)',
+                                 [(crawl_id, task['category'], task['category_url'], page, PENDING)
+                                  for page in range(task['page'] + 1, last_page + 1)])
+            else:
+                # An empty page ends its category, like in iter_scrape_products
+                conn.execute('UPDATE tasks SET status = ? WHERE crawl_id = ? AND category = ? AND page > ?'
+                             ' AND status = ?', (CANCELLED, crawl_id, task['category'], task['page'], PENDING))
+        return True
+
+    def fail(self, task, worker_id, error):
+        """Give a page back for a later retry, or mark it failed after max_attempts"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute('UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,'
+                         ' owner = NULL, lease_expires = NULL, error = ?, available_at = ? + ? * attempts'
+                         ' WHERE id = ? AND owner = ? AND status = ?',
+                         (CRAWL_CONFIG['max_attempts'], FAILED, PENDING, str(error)[:500],
+                          now, CRAWL_CONFIG['retry_delay'], task['id'], worker_id, LEASED))
+
+    def reserve_host(self, host, delay):
+        """
+        Claim the next fetch slot for a host and return how long to wait for it
+        Slots are delay seconds apart for all workers sharing the queue
+        """
+        if delay <= 0:
+            return 0.0
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT next_fetch_at FROM hosts WHERE host = ?', (host,)).fetchone()
+            slot = max(now, row[0] if row else 0.0)
+            conn.execute('INSERT INTO hosts (host, next_fetch_at) VALUES (?, ?)'
+                         ' ON CONFLICT (host) DO UPDATE SET next_fetch_at = excluded.next_fetch_at',
+                         (host, slot + delay))
+        return slot - now
+
+    def in_flight(self, crawl_id):
+        """Pages still pending or leased (the crawl is over when this is 0)"""
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM tasks WHERE crawl_id = ? AND status IN (?, ?)',
+                                (crawl_id, PENDING, LEASED)).fetchone()[0]
+
+    def register_worker(self, worker_id, crawl_id):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO workers (id, crawl_id, hostname, pid, started_at, heartbeat_at)'
+                         ' VALUES (?, ?, ?, ?, ?, ?)', (worker_id, crawl_id, socket.gethostname(), os.getpid(), now, now))
+
+    def stop_worker(self, worker_id):
+        with self._connect() as conn:
+            conn.execute('UPDATE workers SET stopped_at = ? WHERE id = ?', (time.time(), worker_id))
+
+    def status(self, crawl_id):
+        """Page counts by status, products stored, and the crawl's workers"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            tasks = dict(conn.execute('SELECT status, COUNT(*) FROM tasks WHERE crawl_id = ? GROUP BY status',
+                                      (crawl_id,)).fetchall())
+            products = conn.execute('SELECT COUNT(*) FROM crawl_products p JOIN tasks t ON t.id = p.task_id'
+                                    ' WHERE t.crawl_id = ?', (crawl_id,)).fetchone()[0]
+            workers = [dict(row) for row in conn.execute('SELECT * FROM workers WHERE crawl_id = ? ORDER BY started_at',
+                                                         (crawl_id,))]
+        return {'tasks': tasks, 'products': products, 'workers': workers}
+
+    def iter_products(self, crawl_id, limit=None):
+        """
+        Stream a crawl's products in category, page, position order (the order a
+        single sequential scrape would produce), capped at the crawl's max_products
+        """
+        if limit is None:
+            crawl = self.get_crawl(crawl_id)
+            limit = crawl['max_products'] if crawl else 0
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT p.product FROM crawl_products p JOIN tasks t ON t.id = p.task_id'
+                                ' WHERE t.crawl_id = ? ORDER BY t.category, t.page, p.seq LIMIT ?',
+                                (crawl_id, limit))
+            for product, in rows:
+                yield json.loads(product)
+        finally:
+            conn.close()
+
+
+def resolve_site(site_key, custom_url=None):
+    """(site key, site config) as iter_scrape_products picks them"""
+    if site_key not in SCRAPING_SITES:
+        site_key = SCRAPER_CONFIG.get('default_site', 'wegetanystock')
+    site_config = SCRAPING_SITES[site_key].copy()
+    if site_key == 'custom' and custom_url:
+        site_config['base_url'] = custom_url if custom_url.endswith('/') else custom_url + '/'
+    return site_key, site_config
+
+
+def seed_crawl(queue, site_key, max_products=100, custom_url=None, crawl_id=None):
+    """Find the site's categories (one fetch) and queue their first pages; returns the crawl id"""
+    from scraper import get_session, find_category_urls
+    site_key, site_config = resolve_site(site_key, custom_url)
+    if not site_config.get('base_url'):
+        raise ValueError("Custom URL required when site_key is 'custom'")
+    if not site_config.get('enabled', False):
+        raise ValueError(f"Site '{site_key}' is disabled")
+    base_url = site_config['base_url']
+    category_urls = find_category_urls(get_session(), base_url, site_config,
+                                       custom_url if site_key == 'custom' else None)
+    delay = site_config.get('delay_between_requests', SCRAPER_CONFIG.get('delay_between_requests', 1))
+    return queue.create_crawl(site_key, base_url, category_urls, max_products,
+                              site_config.get('max_pages', 9), delay, crawl_id)
+
+
+def _heartbeat_loop(queue, worker_id, stop):
+    while not stop.wait(CRAWL_CONFIG['heartbeat_interval']):
+        try:
+            queue.heartbeat(worker_id)
+        except sqlite3.Error as e:
+            print(f"[{worker_id}] Heartbeat failed: {e}")
+
+
+def run_worker(queue, crawl_id, worker_id=None, batch_size=None):
+    """
+    Lease and scrape pages of a crawl until none are left
+    Returns {'pages', 'products', 'failed', 'lost'} for this worker ('lost' counts
+    pages whose lease expired before they were stored)
+    """
+    from scraper import MISSING_PAGE_STATUSES, get_session, scrape_products_from_page
+    crawl = queue.get_crawl(crawl_id)
+    if crawl is None:
+        raise ValueError(f"Unknown crawl: {crawl_id}")
+    site_config = resolve_site(crawl['site'])[1]
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    session = get_session()
+    stats = {'pages': 0, 'products': 0, 'failed': 0, 'lost': 0}
+
+    queue.register_worker(worker_id, crawl_id)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(queue, worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        while True:
+            tasks = queue.lease(crawl_id, worker_id, batch_size)
+            if not tasks:
+                if not queue.in_flight(crawl_id):
+                    break
+                time.sleep(CRAWL_CONFIG['poll_interval'])  # retries pending or leased elsewhere
+                continue
+            for task in tasks:
+                url = page_url(task['category_url'], task['page'])
+                wait = queue.reserve_host(urlparse(url).netloc, crawl['delay'])
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    products = scrape_products_from_page(session, url, [], site_config, crawl['base_url'],
+                                                         raise_errors=True)
+                except Exception as e:
+                    if getattr(getattr(e, 'response', None), 'status_code', None) in MISSING_PAGE_STATUSES:
+                        products = []  # past the last page: ends the category instead of retrying
+                    else:
+                        print(f"[{worker_id}] Error scraping page {url}: {e}")
+                        queue.fail(task, worker_id, e)
+                        stats['failed'] += 1
+                        continue
+                if queue.complete(task, worker_id, products):
+                    stats['pages'] += 1
+                    stats['products'] += len(products)
+                else:
+                    stats['lost'] += 1
+    finally:
+        stop.set()
+        heartbeat.join()
+        queue.stop_worker(worker_id)
+    return stats
+
+
+def _worker_process(path, crawl_id, batch_size):
+    stats = run_worker(CrawlQueue(path), crawl_id, batch_size=batch_size)
+    print(f"Worker {os.getpid()}: {stats['pages']} pages, {stats['products']} products, "
+          f"{stats['failed']} failed, {stats['lost']} lost leases")
+
+
+def run_workers(path, crawl_id, processes=None, batch_size=None):
+    """Run worker processes on this machine until the crawl is finished"""
+    import multiprocessing
+    workers = [multiprocessing.Process(target=_worker_process, args=(path, crawl_id, batch_size))
+               for _ in range(processes or CRAWL_CONFIG['processes'])]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def print_status(queue, crawl_id):
+    status = queue.status(crawl_id)
+    crawl = queue.get_crawl(crawl_id)
+    print(f"Crawl {crawl_id}: {crawl['site']} ({crawl['base_url']}), max {crawl['max_products']} products")
+    print("Pages: " + ', '.join(f"{count} {name}" for name, count in sorted(status['tasks'].items())))
+    print(f"Products stored: {status['products']}")
+    now = time.time()
+    for worker in status['workers']:
+        if worker['stopped_at']:
+            state = 'stopped'
+        elif now - worker['heartbeat_at'] > CRAWL_CONFIG['lease_seconds']:
+            state = 'missing'
+        else:
+            state = 'running'
+        print(f"  {worker['id']:40} {state:8} {worker['pages']:>6} pages {worker['products']:>8} products")
+
+
+def main():
+    import argparse
+    from data_io import write_products, get_output_path
+
+    parser = argparse.ArgumentParser(description='Distributed crawl workers sharing a leased work queue')
+    parser.add_argument('command', choices=['seed', 'work', 'status', 'export'])
+    parser.add_argument('--queue', default=CRAWL_CONFIG['database'], help='Queue database shared by all workers')
+    parser.add_argument('--crawl', '-c', help='Crawl id (seed: optional, printed when omitted)')
+    parser.add_argument('--site', '-s', default=SCRAPER_CONFIG.get('default_site'), help='Site key to crawl')
+    parser.add_argument('--url', '-u', help='Custom URL to crawl (use with --site custom)')
+    parser.add_argument('--max', '-m', type=int, default=100, help='Maximum number of products')
+    parser.add_argument('--processes', '-p', type=int, help='Worker processes on this machine')
+    parser.add_argument('--batch-size', type=int, help='Pages leased at a time')
+    parser.add_argument('--output', '-o', help='Export file (default: the raw products file)')
+    args = parser.parse_args()
+
+    queue = CrawlQueue(args.queue)
+    if args.command == 'seed':
+        crawl_id = seed_crawl(queue, args.site, args.max, args.url, args.crawl)
+        print(f"Seeded crawl {crawl_id} ({queue.status(crawl_id)['tasks'].get(PENDING, 0)} category pages)")
+        print(f"Start workers with: python crawl_queue.py work --crawl {crawl_id} --queue {queue.path}")
+        return
+    if not args.crawl:
+        parser.error('--crawl is required')
+    if queue.get_crawl(args.crawl) is None:
+        parser.error(f"Unknown crawl: {args.crawl}")
+    if args.command == 'work':
+        start = time.time()
+        run_workers(queue.path, args.crawl, args.processes, args.batch_size)
+        print(f"Workers finished in {time.time() - start:.1f}s")
+        print_status(queue, args.crawl)
+    elif args.command == 'status':
+        print_status(queue, args.crawl)
+    else:
+        output_file = args.output or get_output_path('raw')
+        count = write_products(output_file, queue.iter_products(args.crawl))
+        print(f"Exported {count} products to {output_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,11 @@ Developed by Sanchit Kathpalia
 LinkedIn: https://www.linkedin.com/in/sanchit-kathpalia-a841b5252/
 """
 import re
-import json
 import os
 
+from product_record import ProductRecord
+from data_io import read_products, write_products, get_output_path, resolve_input_path
+
 def standardize_units(volume_weight):
     """
     Standardize units: convert "Grams", "G", "g", "ml", "Milliliters" to standard format
@@ -127,65 +129,78 @@ def generate_slug(name):
     
     return slug
 
-def clean_product(product):
+def clean_record(record):
     """
-    Clean a single product dictionary
+    Clean a ProductRecord in place and return it
     """
-    cleaned = product.copy()
-    
     # Clean name
-    original_name = cleaned.get('name', '')
-    cleaned['original_name'] = original_name
-    cleaned['name'] = clean_product_name(original_name)
+    original_name = record.get('name', '')
+    record.original_name = original_name
+    record.name = clean_product_name(original_name)
     
     # Clean price
-    cleaned['price'] = clean_price(cleaned.get('price', ''))
+    record.price = clean_price(record.get('price', ''))
     
     # Standardize volume/weight
-    cleaned['volume_weight'] = standardize_units(cleaned.get('volume_weight', ''))
+    record.volume_weight = standardize_units(record.get('volume_weight', ''))
     
     # Detect multipack
-    cleaned['multipack'] = detect_multipack(original_name)
+    record.multipack = detect_multipack(original_name)
     
     # Generate slug
-    cleaned['slug'] = generate_slug(cleaned['name'])
+    record.slug = generate_slug(record.name)
     
-    return cleaned
+    return record.intern_fields()
+
+def clean_product(product):
+    """
+    Clean a single product (dict or ProductRecord) without modifying it
+    Returns a new ProductRecord
+    """
+    return clean_record(ProductRecord.from_dict(product))
+
+def iter_clean_products(products):
+    """
+    Clean products one at a time from any iterable
+    Yields new records; the caller's dicts and records are left unchanged
+    """
+    for product in products:
+        yield clean_product(product)
 
 def clean_products(products):
     """
     Clean a list of products
     """
-    return [clean_product(p) for p in products]
+    return list(iter_clean_products(products))
 
 def main():
     """Main function to clean scraped data"""
-    # Load raw products
-    input_file = '../data/products_raw.json'
+    # Load raw products (JSON array or JSON Lines)
+    input_file = resolve_input_path('raw')
     
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found. Please run scraper.py first.")
         return
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        products = json.load(f)
+    print(f"Cleaning products from {input_file}...")
     
-    print(f"Cleaning {len(products)} products...")
+    # Stream products through cleaning, keeping only a small sample for display
+    sample = []
     
-    # Clean products
-    cleaned_products = clean_products(products)
+    def keep_sample(products):
+        for product in products:
+            if len(sample) < 5:
+                sample.append(product)
+            yield product
     
-    # Save cleaned products
-    output_file = '../data/products_cleaned.json'
-    os.makedirs('../data', exist_ok=True)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_products, f, indent=2, ensure_ascii=False)
+    output_file = get_output_path('cleaned')
+    count = write_products(output_file, keep_sample(iter_clean_products(read_products(input_file))))
     
-    print(f"Saved {len(cleaned_products)} cleaned products to {output_file}")
+    print(f"Saved {count} cleaned products to {output_file}")
     
     # Print sample
     print("\nSample cleaned products:")
-    for i, product in enumerate(cleaned_products[:5]):
+    for i, product in enumerate(sample):
         print(f"\n{i+1}. Original: {product.get('original_name', 'N/A')}")
         print(f"   Cleaned: {product.get('name', 'N/A')}")
         print(f"   Price: {product.get('price', 'N/A')}")
@@ -195,4 +210,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,303 @@
+"""
+Product file input/output
+Streams products to and from JSON array files and JSON Lines (NDJSON) files
+one record at a time, so no stage has to hold the whole catalog in memory.
+Parquet and Arrow IPC files are handled by columnar_io (needs pyarrow).
+"""
+import codecs
+import json
+import os
+
+try:
+    import orjson  # Optional fast serializer
+except ImportError:
+    orjson = None
+
+from config import OUTPUT_CONFIG
+from product_record import to_dict
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+FORMAT_EXTENSIONS = {'json': '.json', 'jsonl': '.jsonl', 'parquet': '.parquet', 'arrow': '.arrow'}
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+READ_CHUNK_SIZE = 64 * 1024
+PRODUCT_READ_SIZE = 4 * 1024
+
+
+def detect_format(path):
+    """Return 'jsonl' for .jsonl/.ndjson paths, 'parquet'/'arrow' for columnar ones, 'json' otherwise"""
+    path = path.lower().rstrip('/' + os.sep)
+    if path.endswith(JSONL_EXTENSIONS):
+        return 'jsonl'
+    for fmt in COLUMNAR_FORMATS:
+        if path.endswith(FORMAT_EXTENSIONS[fmt]):
+            return fmt
+    return 'json'
+
+
+def dumps(obj):
+    """Serialize one object to a compact JSON string (uses orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=OUTPUT_CONFIG.get('ensure_ascii', False), separators=(',', ':'))
+
+
+def loads(text):
+    """Parse one JSON document (uses orjson when installed)"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def get_output_path(kind, fmt=None, partition=None):
+    """
+    Build the configured path for a pipeline file
+    kind is 'raw', 'cleaned' or 'final'; fmt defaults to OUTPUT_CONFIG['format'].
+    For parquet/arrow the path is a dataset directory; with a partition such as
+    {'site': ..., 'run_date': ...} it is that partition's file inside the dataset
+    """
+    fmt = fmt or OUTPUT_CONFIG.get('format', 'json')
+    base_name = os.path.splitext(OUTPUT_CONFIG[f'{kind}_file'])[0]
+    path = os.path.join(OUTPUT_CONFIG['data_dir'], base_name + FORMAT_EXTENSIONS[fmt])
+    if partition and fmt in COLUMNAR_FORMATS:
+        from columnar_io import partition_path
+        path = partition_path(path, partition, fmt)
+    return path
+
+
+def resolve_input_path(kind):
+    """
+    Find an existing pipeline file, preferring the configured format
+    Falls back to the other format so legacy .json files keep working
+    """
+    preferred = get_output_path(kind)
+    if os.path.exists(preferred):
+        return preferred
+    for fmt in FORMAT_EXTENSIONS:
+        candidate = get_output_path(kind, fmt)
+        if os.path.exists(candidate):
+            return candidate
+    return preferred
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK_SIZE, allow_trailing=False):
+    """
+    Incrementally parse a JSON array from a text file object
+    Yields one element at a time while only buffering roughly one element.
+    With allow_trailing, stops at the closing bracket and ignores what follows
+    (for arrays embedded in a larger document).
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    state = 'start'
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+
+        if pos >= len(buf):
+            if eof:
+                if state != 'end':
+                    raise ValueError("Unexpected end of JSON array")
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        char = buf[pos]
+        if state == 'start':
+            if char != '[':
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            state = 'first'
+        elif state in ('first', 'value'):
+            if char == ']' and state == 'first':
+                pos += 1
+                state = 'end'
+                if allow_trailing:
+                    return
+                continue
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # A value touching the end of the buffer may be truncated: read more first
+            if end is None or (end == len(buf) and not eof):
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield obj
+            pos = end
+            state = 'sep'
+        elif state == 'sep':
+            if char == ',':
+                state = 'value'
+            elif char == ']':
+                state = 'end'
+                if allow_trailing:
+                    return
+            else:
+                raise ValueError(f"Unexpected character in JSON array: {char!r}")
+            pos += 1
+        else:
+            raise ValueError("Trailing data after JSON array")
+
+
+def iter_json_lines(f):
+    """Yield one object per non-empty line of a JSON Lines file object"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield loads(line)
+
+
+def read_products(path, columns=None, partition_filter=None):
+    """
+    Stream products from a JSON array, JSON Lines, Parquet or Arrow file
+    JSON formats are sniffed from the content, so legacy arrays are always accepted.
+    columns keeps only those fields (columnar files skip decoding the rest);
+    partition_filter selects partitions of a columnar dataset, e.g. {'site': 'books_toscrape'}
+    """
+    fmt = detect_format(path)
+    if fmt in COLUMNAR_FORMATS:
+        from columnar_io import read_columnar
+        yield from read_columnar(path, fmt, columns, partition_filter)
+        return
+    if columns is None:
+        yield from _read_json_products(path)
+        return
+    columns = set(columns)
+    for product in _read_json_products(path):
+        yield {key: value for key, value in product.items() if key in columns}
+
+
+def _read_json_products(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        first = ''
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                first = char
+                break
+        f.seek(0)
+        if first == '[':
+            yield from iter_json_array(f)
+        else:
+            yield from iter_json_lines(f)
+
+
+def write_products(path, products, fmt=None, positions=None):
+    """
+    Stream products (dicts or ProductRecords) to a file and return how many were written
+    Writes to a temporary file first and renames it, so readers never see a partial file.
+    positions, when given, receives where each product was written: its byte offset
+    in a JSON file or its row number in a Parquet/Arrow file (see ProductFileReader)
+    """
+    fmt = fmt or detect_format(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + '.tmp'
+    count = 0
+    try:
+        if fmt in COLUMNAR_FORMATS:
+            from columnar_io import write_columnar
+            count = write_columnar(tmp_path, products, fmt)
+            if positions is not None:
+                positions.extend(range(count))
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                count = _write_json_products(f, products, fmt, positions)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def _write_json_products(f, products, fmt, positions=None):
+    if fmt != 'jsonl':
+        return _write_json_array(f, products, positions)
+    count = 0
+    offset = 0
+    for product in products:
+        line = dumps(to_dict(product)) + '\n'
+        f.write(line)
+        if positions is not None:
+            positions.append(offset)
+            offset += len(line.encode('utf-8'))
+        count += 1
+    return count
+
+
+def _write_json_array(f, products, positions=None):
+    """Write a pretty-printed JSON array item by item (same layout as json.dump)"""
+    indent = OUTPUT_CONFIG.get('indent', 2)
+    ensure_ascii = OUTPUT_CONFIG.get('ensure_ascii', False)
+    padding = ' ' * indent if indent else ''
+    separator = ',\n' if indent else ', '
+    count = 0
+    offset = 0
+
+    for product in products:
+        text = json.dumps(to_dict(product), indent=indent, ensure_ascii=ensure_ascii)
+        if indent:
+            text = padding + text.replace('\n', '\n' + padding)
+        prefix = ('[\n' if indent else '[') if count == 0 else separator
+        f.write(prefix)
+        f.write(text)
+        if positions is not None:
+            offset += len(prefix)
+            positions.append(offset)
+            offset += len(text.encode('utf-8'))
+        count += 1
+
+    f.write(('\n]' if indent else ']') if count else '[]')
+    return count
+
+
+class ProductFileReader:
+    """
+    Random access to single products of a file by the positions write_products recorded
+    The file is opened once, so it can still be read after a new run replaces it
+    """
+
+    def __init__(self, path, fmt=None):
+        self.fmt = fmt or detect_format(path)
+        if self.fmt in COLUMNAR_FORMATS:
+            from columnar_io import ColumnarRowReader
+            self._rows = ColumnarRowReader(path, self.fmt)
+            self._file = None
+        else:
+            self._rows = None
+            self._file = open(path, 'rb')
+
+    def read_at(self, position):
+        """The product written at position"""
+        if self._rows is not None:
+            return self._rows.row(position)
+        self._file.seek(position)
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder('utf-8')()
+        buf = ''
+        while True:
+            chunk = self._file.read(PRODUCT_READ_SIZE)
+            buf += text_decoder.decode(chunk, final=not chunk)
+            try:
+                return decoder.raw_decode(buf.lstrip())[0]
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self._rows is not None:
+            self._rows.close()
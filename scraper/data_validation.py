@@ -1,102 +1,144 @@
 """
 Data validation and quality metrics
 """
-import json
 import os
-from typing import Dict, List, Any
+from typing import Dict, Any, Iterable, Optional, Callable
 
-def validate_product(product: Dict[str, Any]) -> Dict[str, Any]:
+from data_io import read_products, resolve_input_path, dumps
+from validation_rules import COMPLETENESS_FIELDS, ValidationPlan, compile_plan, iter_batches
+
+# Products per columnar batch in validate_products
+BATCH_SIZE = 1000
+
+# Plan with every registered rule, used by validate_product
+DEFAULT_PLAN = compile_plan()
+
+def validate_product(product: Dict[str, Any], plan: Optional[ValidationPlan] = None) -> Dict[str, Any]:
     """
     Validate a single product and return validation results
     """
-    issues = []
-    warnings = []
-    
-    # Required fields
-    required_fields = ['name', 'price', 'volume_weight']
-    for field in required_fields:
-        if not product.get(field):
-            issues.append(f"Missing required field: {field}")
-    
-    # Name validation
-    name = product.get('name', '')
-    if name:
-        if len(name) < 3:
-            warnings.append("Product name is very short")
-        if len(name) > 200:
-            warnings.append("Product name is very long")
-    
-    # Price validation
-    price = product.get('price', '')
-    if price:
-        import re
-        if not re.search(r'[£$€]\s*\d+', price):
-            warnings.append("Price format may be incorrect")
-    
-    # Volume/Weight validation
-    volume_weight = product.get('volume_weight', '')
-    if volume_weight:
-        import re
-        if not re.search(r'\d+\s*(ml|g|l|kg)', volume_weight, re.I):
-            warnings.append("Volume/weight format may be incorrect")
-    
-    # Brand validation
-    brand = product.get('brand', '')
-    if brand == 'Unknown':
-        warnings.append("Brand not detected")
-    
-    return {
-        'valid': len(issues) == 0,
-        'issues': issues,
-        'warnings': warnings,
-        'completeness_score': calculate_completeness(product)
-    }
+    return (plan or DEFAULT_PLAN).run([product])[0]
 
 def calculate_completeness(product: Dict[str, Any]) -> float:
     """
     Calculate completeness score (0-1) for a product
     """
-    fields = ['name', 'price', 'volume_weight', 'image_url', 'brand', 'slug']
-    present_fields = sum(1 for field in fields if product.get(field))
-    return present_fields / len(fields)
+    present_fields = sum(1 for field in COMPLETENESS_FIELDS if product.get(field))
+    return present_fields / len(COMPLETENESS_FIELDS)
 
-def validate_products(products: List[Dict[str, Any]]) -> Dict[str, Any]:
+class QualityAggregator:
     """
-    Validate a list of products and return quality metrics
+    Single-pass quality metrics
+    Keeps running totals only (plus the brand histogram), so any number of
+    products can be validated in O(1) memory. Products validated without the
+    completeness rule have no score and are left out of the average
     """
-    validation_results = [validate_product(p) for p in products]
     
-    total = len(products)
-    valid_count = sum(1 for r in validation_results if r['valid'])
-    invalid_count = total - valid_count
+    def __init__(self):
+        self.total = 0
+        self.valid = 0
+        self.completeness_sum = 0.0
+        self.scored = 0
+        self.issues = 0
+        self.warnings = 0
+        self.brands = {}
     
-    avg_completeness = sum(r['completeness_score'] for r in validation_results) / total if total > 0 else 0
+    def add(self, product: Dict[str, Any], result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Fold one product into the totals and return its result
+        Validates the product unless a precomputed result is given
+        """
+        if result is None:
+            result = validate_product(product)
+        self.total += 1
+        if result['valid']:
+            self.valid += 1
+        if result['completeness_score'] is not None:
+            self.completeness_sum += result['completeness_score']
+            self.scored += 1
+        self.issues += len(result['issues'])
+        self.warnings += len(result['warnings'])
+        
+        brand = product.get('brand', 'Unknown')
+        self.brands[brand] = self.brands.get(brand, 0) + 1
+        return result
     
-    total_issues = sum(len(r['issues']) for r in validation_results)
-    total_warnings = sum(len(r['warnings']) for r in validation_results)
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Quality metrics for everything added so far
+        average_completeness is None when products were validated without the completeness rule
+        """
+        total = self.total
+        if self.scored:
+            avg_completeness = round(self.completeness_sum / self.scored * 100, 2)
+        else:
+            avg_completeness = None if total > 0 else 0
+        unknown_brand_count = self.brands.get('Unknown', 0)
+        known_brand_percentage = ((total - unknown_brand_count) / total * 100) if total > 0 else 0
+        
+        return {
+            'total_products': total,
+            'valid_products': self.valid,
+            'invalid_products': total - self.valid,
+            'validity_percentage': (self.valid / total * 100) if total > 0 else 0,
+            'average_completeness': avg_completeness,
+            'total_issues': self.issues,
+            'total_warnings': self.warnings,
+            'brand_distribution': self.brands,
+            'known_brand_percentage': round(known_brand_percentage, 2),
+            'unknown_brand_count': unknown_brand_count,
+        }
+
+def validate_products(products: Iterable[Dict[str, Any]],
+                      keep_results: bool = True,
+                      on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                      plan: Optional[ValidationPlan] = None,
+                      processes: Optional[int] = None,
+                      batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Validate products in a single pass and return quality metrics
     
-    # Brand distribution
-    brands = {}
-    for product in products:
-        brand = product.get('brand', 'Unknown')
-        brands[brand] = brands.get(brand, 0) + 1
+    Args:
+        products: Any iterable of products (list, generator, file stream)
+        keep_results: Include the per-product 'validation_results' list in the
+            metrics; pass False to validate catalogs larger than memory
+        on_result: Optional callback(product, result) receiving each
+            per-product result as a side stream
+        plan: Compiled rules to run (default: a fresh plan with every rule)
+        processes: Validate column batches in this many worker processes
+        batch_size: Products per columnar batch
+    """
+    plan = plan or compile_plan()
+    aggregator = QualityAggregator()
+    results = [] if keep_results else None
     
-    unknown_brand_count = brands.get('Unknown', 0)
-    known_brand_percentage = ((total - unknown_brand_count) / total * 100) if total > 0 else 0
+    for batch, batch_results in plan.run_batches(iter_batches(products, batch_size), processes):
+        for product, result in zip(batch, batch_results):
+            aggregator.add(product, result)
+            if results is not None:
+                results.append(result)
+            if on_result is not None:
+                on_result(product, result)
     
-    return {
-        'total_products': total,
-        'valid_products': valid_count,
-        'invalid_products': invalid_count,
-        'validity_percentage': (valid_count / total * 100) if total > 0 else 0,
-        'average_completeness': round(avg_completeness * 100, 2),
-        'total_issues': total_issues,
-        'total_warnings': total_warnings,
-        'brand_distribution': brands,
-        'known_brand_percentage': round(known_brand_percentage, 2),
-        'unknown_brand_count': unknown_brand_count,
-        'validation_results': validation_results
-    }
+    metrics = aggregator.metrics()
+    metrics['rule_timings_ms'] = plan.timing_report()
+    if results is not None:
+        metrics['validation_results'] = results
+    return metrics
+
+def iter_validated(products: Iterable[Dict[str, Any]],
+                   aggregator: QualityAggregator,
+                   plan: Optional[ValidationPlan] = None,
+                   batch_size: int = BATCH_SIZE) -> Iterable[Dict[str, Any]]:
+    """
+    Pass products through unchanged, folding each one's validation result into aggregator
+    Products are validated in columnar batches, so each leaves with its batch
+    """
+    plan = plan or DEFAULT_PLAN
+    for batch, batch_results in plan.run_batches(iter_batches(products, batch_size)):
+        for product, result in zip(batch, batch_results):
+            aggregator.add(product, result)
+            yield product
 
 def print_quality_report(metrics: Dict[str, Any]):
     """
@@ -108,7 +150,10 @@ def print_quality_report(metrics: Dict[str, Any]):
     print(f"Total Products: {metrics['total_products']}")
     print(f"Valid Products: {metrics['valid_products']} ({metrics['validity_percentage']:.1f}%)")
     print(f"Invalid Products: {metrics['invalid_products']}")
-    print(f"Average Completeness: {metrics['average_completeness']}%")
+    if metrics['average_completeness'] is None:
+        print("Average Completeness: unavailable (completeness rule skipped)")
+    else:
+        print(f"Average Completeness: {metrics['average_completeness']}%")
     print(f"Total Issues: {metrics['total_issues']}")
     print(f"Total Warnings: {metrics['total_warnings']}")
     print(f"\nBrand Detection:")
@@ -118,22 +163,57 @@ def print_quality_report(metrics: Dict[str, Any]):
     sorted_brands = sorted(metrics['brand_distribution'].items(), key=lambda x: x[1], reverse=True)
     for brand, count in sorted_brands[:10]:
         print(f"  {brand}: {count}")
+    if metrics.get('rule_timings_ms'):
+        print("\nRule Timings (ms):")
+        for rule_name, ms in metrics['rule_timings_ms'].items():
+            print(f"  {rule_name}: {ms}")
     print("=" * 60)
 
-def main():
-    """Test validation on sample data"""
-    input_file = '../data/products_final.json'
+def main(results_file=None, skip_rules=None, processes=None):
+    """
+    Validate the final products file in one streaming pass
+    
+    Args:
+        results_file: Optional JSON Lines file receiving per-product results
+        skip_rules: Rule names to leave out of the plan
+        processes: Worker processes for validation (default: in-process)
+    """
+    input_file = resolve_input_path('final')
     
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return
     
-    with open(input_file, 'r', encoding='utf-8') as f:
-        products = json.load(f)
+    plan = compile_plan(exclude=skip_rules)
+    # Only the fields the rules, brand histogram and results need (columnar files skip the rest)
+    products = read_products(input_file, columns=list(plan.fields) + ['name', 'brand'])
+    
+    if results_file:
+        with open(results_file, 'w', encoding='utf-8') as f:
+            def write_result(product, result):
+                f.write(dumps(dict(result, name=product.get('name', ''))))
+                f.write('\n')
+            
+            metrics = validate_products(products, keep_results=False, on_result=write_result,
+                                        plan=plan, processes=processes)
+        print(f"Saved per-product results to {results_file}")
+    else:
+        metrics = validate_products(products, keep_results=False, plan=plan, processes=processes)
     
-    metrics = validate_products(products)
     print_quality_report(metrics)
 
 if __name__ == '__main__':
-    main()
-
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Validate final product data')
+    parser.add_argument('--results', '-r', type=str, help='Write per-product results to this JSON Lines file')
+    parser.add_argument('--skip-rules', type=str, help='Comma-separated rule names to skip')
+    parser.add_argument('--processes', '-p', type=int, help='Validate in this many worker processes')
+    
+    args = parser.parse_args()
+    skip_rules = args.skip_rules.split(',') if args.skip_rules else None
+    try:
+        compile_plan(exclude=skip_rules)  # reject a misspelled rule before reading anything
+    except ValueError as e:
+        parser.error(str(e))
+    main(results_file=args.results, skip_rules=skip_rules, processes=args.processes)
@@ -0,0 +1,199 @@
+"""
+Near-duplicate product detection
+Names are reduced to MinHash signatures over character shingles. Signatures are
+split into LSH bands, and each band is bucketed together with the product's brand
+and canonical quantity, so a new product is only compared against the few
+representatives sharing a bucket with it. Candidates are confirmed with the exact
+Jaccard similarity of their shingles. Clusters are assigned online in a single
+pass: a product joins the first cluster it is confirmed against, or starts a new one.
+"""
+import re
+from hashlib import blake2b
+
+from brand_index import tokenize
+from config import DEDUP_CONFIG
+
+# Representatives kept per bucket; caps the comparisons per product
+MAX_BUCKET_SIZE = 4
+
+# Added per step when an empty signature bin borrows a neighbour's value
+DENSIFY_OFFSET = 1 << 64
+
+QUANTITY_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(ml|cl|l|kg|g)\b', re.I)
+MULTIPACK_COUNT_PATTERN = re.compile(r'(\d+)\s*(?:x|pk\b|pack\b)', re.I)
+
+# unit -> (base unit, factor)
+UNIT_SCALE = {
+    'ml': ('ml', 1),
+    'cl': ('ml', 10),
+    'l': ('ml', 1000),
+    'g': ('g', 1),
+    'kg': ('g', 1000),
+}
+
+
+def canonical_quantity(product):
+    """
+    Pack count and size in base units, e.g. (6, 330, 'ml') for "6x330ml"
+    Read from volume_weight, falling back to the name; None if no size is found
+    """
+    match = None
+    for field in ('volume_weight', 'name'):
+        match = QUANTITY_PATTERN.search(product.get(field) or '')
+        if match:
+            break
+    if not match:
+        return None
+
+    unit, factor = UNIT_SCALE[match.group(2).lower()]
+    amount = round(float(match.group(1)) * factor, 3)
+    if amount == int(amount):
+        amount = int(amount)
+
+    count = 1
+    count_match = MULTIPACK_COUNT_PATTERN.search(product.get('multipack') or '')
+    if count_match:
+        count = int(count_match.group(1))
+    return count, amount, unit
+
+
+def shingles(name, size=3):
+    """Character shingles of the normalized name ("Coca-Cola" and "coca cola" agree)"""
+    text = ' '.join(tokenize(name or ''))
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def shingle_hashes(shingle_set):
+    """64-bit hashes of the shingles (stable across runs, unlike hash())"""
+    return frozenset(
+        int.from_bytes(blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        for shingle in shingle_set
+    )
+
+
+def minhash_signature(hashes, num_perm):
+    """
+    One-permutation MinHash
+    Each hash lands in bin h % num_perm and every bin keeps its minimum, so a signature
+    costs one pass over the shingles instead of one pass per permutation. Empty bins
+    borrow the next filled bin to the right, offset by the distance (rotation densification).
+    """
+    if not hashes:
+        return [0] * num_perm
+
+    signature = [None] * num_perm
+    for h in hashes:
+        bin_index = h % num_perm
+        value = h // num_perm
+        current = signature[bin_index]
+        if current is None or value < current:
+            signature[bin_index] = value
+
+    densified = list(signature)
+    for i, value in enumerate(signature):
+        if value is None:
+            distance = 1
+            while signature[(i + distance) % num_perm] is None:
+                distance += 1
+            densified[i] = signature[(i + distance) % num_perm] + distance * DENSIFY_OFFSET
+    return densified
+
+
+def jaccard(hashes_a, hashes_b):
+    """Exact Jaccard similarity of two shingle hash sets"""
+    if not hashes_a and not hashes_b:
+        return 1.0
+    intersection = len(hashes_a & hashes_b)
+    return intersection / (len(hashes_a) + len(hashes_b) - intersection)
+
+
+class NearDuplicateIndex:
+    """
+    Online MinHash/LSH clustering
+
+    Example:
+        index = NearDuplicateIndex(threshold=0.65)
+        index.add({"name": "Coca Cola Original Taste 330ml", "brand": "Coca-Cola"})  # -> 0
+        index.add({"name": "Coca-Cola Original 330ml", "brand": "Coca-Cola"})  # -> 0
+    """
+
+    def __init__(self, threshold=None, num_perm=None, bands=None, shingle_size=None):
+        self.threshold = DEDUP_CONFIG['threshold'] if threshold is None else threshold
+        self.num_perm = num_perm or DEDUP_CONFIG['num_perm']
+        self.bands = bands or DEDUP_CONFIG['bands']
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be a multiple of bands ({self.bands})")
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = shingle_size or DEDUP_CONFIG['shingle_size']
+
+        # bucket key -> [(shingle hashes, cluster id), ...]
+        self._buckets = {}
+        self.count = 0
+        self.clusters = 0
+
+    def add(self, product):
+        """Assign product to a cluster and return the cluster id"""
+        hashes = shingle_hashes(shingles(product.get('name', ''), self.shingle_size))
+        signature = minhash_signature(hashes, self.num_perm)
+        block = (product.get('brand', 'Unknown'), canonical_quantity(product))
+        self.count += 1
+
+        rows = self.rows
+        keys = [
+            hash((band, tuple(signature[band * rows:(band + 1) * rows]), block))
+            for band in range(self.bands)
+        ]
+
+        cluster_id = None
+        checked = set()
+        for key in keys:
+            for representative, candidate_cluster in self._buckets.get(key, ()):
+                if candidate_cluster in checked:
+                    continue
+                checked.add(candidate_cluster)
+                if jaccard(hashes, representative) >= self.threshold:
+                    cluster_id = candidate_cluster
+                    break
+            if cluster_id is not None:
+                break
+
+        if cluster_id is None:
+            cluster_id = self.clusters
+            self.clusters += 1
+
+        for key in keys:
+            bucket = self._buckets.setdefault(key, [])
+            if len(bucket) < MAX_BUCKET_SIZE and all(entry[1] != cluster_id for entry in bucket):
+                bucket.append((hashes, cluster_id))
+        return cluster_id
+
+
+def iter_dedup_products(products, stats=None, threshold=None):
+    """
+    Set 'cluster_id' on each product as it streams past
+    Products in the same cluster are near-duplicates of each other
+
+    Args:
+        products: Iterable of cleaned, branded products
+        stats: Optional dict filled with 'total', 'clusters' and 'duplicates'
+            once the products are exhausted
+        threshold: Minimum name similarity (default DEDUP_CONFIG['threshold'])
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    for product in products:
+        product['cluster_id'] = index.add(product)
+        yield product
+
+    if stats is not None:
+        stats['total'] = index.count
+        stats['clusters'] = index.clusters
+        stats['duplicates'] = index.count - index.clusters
+
+
+def dedup_products(products, stats=None, threshold=None):
+    """
+    Assign cluster ids to a list of products
+    """
+    return list(iter_dedup_products(products, stats, threshold))
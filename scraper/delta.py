@@ -0,0 +1,129 @@
+"""
+Delta export
+Compares each run's final products with a persisted index of
+{site: {key: [content hash, price]}} (key is the product slug) and emits only
+what changed: inserts, updates with the old and new price, and deletions of
+keys the run no longer produced. Only a complete run (one that read the whole
+site) deletes; a capped or partial run keeps the keys it did not see. Consumers
+ingest the delta file (or the /api/changes feed) instead of the whole catalog.
+"""
+import hashlib
+import json
+import os
+
+from config import OUTPUT_CONFIG
+from data_cleaning import generate_slug
+from data_io import write_products
+from product_record import to_dict
+
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+
+# Fields whose change is an update; run-dependent ones (cluster_id, brand_confidence, ...) are left out
+HASH_FIELDS = ('name', 'price', 'volume_weight', 'brand', 'image_url')
+
+
+def get_delta_paths():
+    """(delta file, index file) in the data directory"""
+    data_dir = OUTPUT_CONFIG['data_dir']
+    return (os.path.join(data_dir, OUTPUT_CONFIG['delta_file']),
+            os.path.join(data_dir, OUTPUT_CONFIG['delta_index_file']))
+
+
+def product_key(product):
+    """Slug of a product (from its name when it has none), as used by the product store"""
+    return product.get('slug') or generate_slug(product.get('name') or '')
+
+
+def content_hash(product):
+    """Stable hash of the HASH_FIELDS of a final product"""
+    text = json.dumps([product.get(field) for field in HASH_FIELDS], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def load_index(path):
+    """{site: {key: [hash, price]}} from the previous runs, or {} when there is none"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('sites', {})
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read {path}: {e}; treating every product as new")
+        return {}
+
+
+def save_index(path, index):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'sites': index}, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class ChangeDetector:
+    """
+    Diff one site's products against its previous index entries
+    Only changed products are kept in memory; when a key appears twice in a
+    run the last product wins, as in the product store
+    """
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.current = {}
+        self.changed = {}
+
+    def observe(self, product):
+        product = to_dict(product)
+        key = product_key(product)
+        if not key:
+            return
+        digest = content_hash(product)
+        price = product.get('price')
+        self.current[key] = [digest, price]
+        self.changed.pop(key, None)
+        before = self.previous.get(key)
+        if before is None:
+            self.changed[key] = {'op': INSERT, 'key': key, 'price': price, 'product': product}
+        elif before[0] != digest:
+            self.changed[key] = {'op': UPDATE, 'key': key, 'old_price': before[1], 'new_price': price,
+                                 'product': product}
+
+    def changes(self, complete=True):
+        """
+        Inserts and updates in product order, then deletions by key
+        Deletions are only emitted for a complete run: keys a capped or partial run
+        did not produce may still be on the site
+        """
+        if not complete:
+            return list(self.changed.values())
+        deleted = [{'op': DELETE, 'key': key, 'old_price': self.previous[key][1]}
+                   for key in sorted(self.previous) if key not in self.current]
+        return list(self.changed.values()) + deleted
+
+    def index(self, complete=True):
+        """Index entries for the next run; an incomplete run keeps the previous keys it did not see"""
+        if complete:
+            return self.current
+        return {**self.previous, **self.current}
+
+    def summary(self, changes=None):
+        """{'insert': n, 'update': n, 'delete': n, 'price_changes': n}"""
+        counts = {INSERT: 0, UPDATE: 0, DELETE: 0, 'price_changes': 0}
+        for change in self.changes() if changes is None else changes:
+            counts[change['op']] += 1
+            if change['op'] == UPDATE and change['old_price'] != change['new_price']:
+                counts['price_changes'] += 1
+        return counts
+
+
+def iter_detect_changes(products, detector):
+    """Pass products through unchanged, recording each one in the detector"""
+    for product in products:
+        detector.observe(product)
+        yield product
+
+
+def write_delta(path, changes, site, run_at):
+    """Write changes as JSON Lines, one change per line tagged with site and run time"""
+    return write_products(path, (dict(change, site=site, run_at=run_at) for change in changes), fmt='jsonl')
@@ -0,0 +1,194 @@
+"""
+Incremental processing
+Reuses cleaned and branded output from the previous run for raw records that
+have not changed, keyed by a hash of the raw record
+"""
+import hashlib
+import json
+import os
+
+from config import CLEANING_CONFIG, BRAND_CONFIG, DEDUP_CONFIG
+from data_io import ProductFileReader
+from product_record import ProductRecord
+import brand_detection
+
+# Bump when cleaning or brand detection logic changes, so old output is not reused
+PIPELINE_VERSION = 5
+
+# Raw fields that determine the cleaned and branded output
+HASH_FIELDS = ('name', 'price', 'volume_weight', 'image_url')
+
+
+def record_hash(product):
+    """Stable hash of the raw fields of a product"""
+    text = '\x1f'.join(str(product.get(field) or '') for field in HASH_FIELDS)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def pipeline_fingerprint(dedup=False, dedup_threshold=None):
+    """
+    Fingerprint of the settings that affect output; a change invalidates the index
+    dedup and dedup_threshold are the run's near-duplicate options, since reused
+    products carry the cluster_id of the run that produced them
+    """
+    settings = {
+        'version': PIPELINE_VERSION,
+        'cleaning': CLEANING_CONFIG,
+        'fuzzy': [BRAND_CONFIG.get('fuzzy_enabled'), BRAND_CONFIG.get('fuzzy_min_confidence')],
+        'brands': brand_detection.get_brand_index().fingerprint,
+        'dedup': (dict(DEDUP_CONFIG, threshold=DEDUP_CONFIG['threshold'] if dedup_threshold is None else dedup_threshold)
+                  if dedup else None),
+    }
+    text = json.dumps(settings, sort_keys=True)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def get_index_path(final_path):
+    """Index file stored next to the final output, e.g. products_final.json.index.json"""
+    return final_path.rstrip('/' + os.sep) + '.index.json'
+
+
+def previous_output_path(final_path):
+    """
+    Output of the previous run for a run writing final_path
+    Columnar output is partitioned by run date (.../site=x/run_date=2026-01-31/part-0.parquet),
+    so this is the newest partition of the same site, up to and including final_path's,
+    that has an index; other outputs are overwritten in place and are their own previous run
+    """
+    partition_dir = os.path.dirname(final_path)
+    partition = os.path.basename(partition_dir)
+    if not partition.startswith('run_date='):
+        return final_path
+    site_dir = os.path.dirname(partition_dir)
+    name = os.path.basename(final_path)
+    runs = sorted((entry for entry in os.listdir(site_dir) if entry.startswith('run_date=') and entry <= partition),
+                  reverse=True) if os.path.isdir(site_dir) else []
+    for run in runs:
+        candidate = os.path.join(site_dir, run, name)
+        if os.path.exists(get_index_path(candidate)):
+            return candidate
+    return final_path
+
+
+class PreviousOutput:
+    """
+    {raw hash: final product} view of the previous run's output
+    Only the hashes and file positions are held in memory; products are read
+    from the previous output file when they are looked up
+    """
+
+    def __init__(self, final_path=None, hashes=(), positions=()):
+        self.positions = dict(zip(hashes, positions))
+        self._reader = ProductFileReader(final_path) if self.positions else None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def get(self, record_key, default=None):
+        position = self.positions.get(record_key)
+        if position is None:
+            return default
+        return self._reader.read_at(position)
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+def load_previous(final_path, dedup=False, dedup_threshold=None):
+    """
+    Open the previous run's output and index as a PreviousOutput
+    final_path is this run's output (see previous_output_path). Returns an empty
+    one when there is no usable previous run; close it once the new output has
+    been written
+    """
+    final_path = previous_output_path(final_path)
+    index_path = get_index_path(final_path)
+    if not os.path.isfile(final_path) or not os.path.exists(index_path):
+        return PreviousOutput()
+
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read {index_path}: {e}")
+        return PreviousOutput()
+
+    if index.get('fingerprint') != pipeline_fingerprint(dedup, dedup_threshold):
+        print("Pipeline settings changed since the previous run; reprocessing everything")
+        return PreviousOutput()
+
+    hashes = index.get('hashes', [])
+    positions = index.get('positions', [])
+    if len(positions) != len(hashes) or index.get('size') != os.path.getsize(final_path):
+        print(f"Warning: {index_path} does not match {final_path}; reprocessing everything")
+        return PreviousOutput()
+
+    return PreviousOutput(final_path, hashes, positions)
+
+
+def save_index(final_path, hashes, positions, dedup=False, dedup_threshold=None):
+    """
+    Write the raw hashes of the products in final_path, in output order, with
+    the positions write_products recorded for them
+    """
+    index_path = get_index_path(final_path)
+    tmp_path = index_path + '.tmp'
+    index = {
+        'fingerprint': pipeline_fingerprint(dedup, dedup_threshold),
+        'size': os.path.getsize(final_path),
+        'hashes': hashes,
+        'positions': positions,
+    }
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def iter_hashed(products, hashes):
+    """Yield raw products unchanged, appending each one's hash to hashes"""
+    for product in products:
+        hashes.append(record_hash(product))
+        yield product
+
+
+def iter_lookup(products, previous, hashes, stats):
+    """
+    Yield (raw product, previous final ProductRecord or None) pairs
+
+    Args:
+        products: Iterable of raw products
+        previous: PreviousOutput from load_previous() (or a {raw hash: final product} dict)
+        hashes: List that receives the raw hash of every yielded product
+        stats: Dict updated with 'reused' and 'recomputed' counts
+    """
+    stats.setdefault('reused', 0)
+    stats.setdefault('recomputed', 0)
+
+    for product in products:
+        # Hash before processing: cleaning modifies records in place
+        record_key = record_hash(product)
+        hashes.append(record_key)
+        prior = previous.get(record_key)
+        if prior is not None:
+            stats['reused'] += 1
+            yield product, ProductRecord.from_dict(prior)
+        else:
+            stats['recomputed'] += 1
+            yield product, None
+
+
+def iter_incremental(products, previous, process, hashes, stats):
+    """
+    Yield final products, reusing previous output for unchanged raw records
+
+    Args:
+        products: Iterable of raw products
+        previous: PreviousOutput from load_previous() (or a {raw hash: final product} dict)
+        process: Function turning one raw product into a final product
+        hashes: List that receives the raw hash of every yielded product
+        stats: Dict updated with 'reused' and 'recomputed' counts
+    """
+    for product, prior in iter_lookup(products, previous, hashes, stats):
+        yield prior if prior is not None else process(product)
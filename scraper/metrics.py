@@ -0,0 +1,184 @@
+"""
+Runtime metrics in the Prometheus text exposition format
+Counters, gauges and latency histograms are kept in memory per process. When
+METRICS_CONFIG['enabled'] is off, timers are a shared no-op object and every
+record call returns after one dict lookup.
+"""
+import bisect
+import threading
+import time
+from urllib.parse import urlparse
+
+from config import METRICS_CONFIG
+
+# name -> (type, help text)
+METRICS = {
+    'scraper_stage_seconds': ('histogram', 'Time spent per pipeline stage (fetch, parse, extract, clean, brand, validate)'),
+    'scraper_fetch_seconds': ('histogram', 'HTTP fetch latency per host'),
+    'scraper_fetch_requests_total': ('counter', 'HTTP fetches per host and status code'),
+    'scraper_fetch_bytes_total': ('counter', 'Response bytes fetched per host'),
+    'http_request_seconds': ('histogram', 'API request latency per endpoint, method and status'),
+    'scrape_queue_depth': ('gauge', 'Scrape jobs waiting for a worker'),
+    'scrape_jobs_running': ('gauge', 'Scrape jobs running'),
+    'scrape_queue_wait_seconds': ('histogram', 'Time scrape jobs waited for a worker'),
+    'scrape_rejections_total': ('counter', 'Scrape requests rejected or timed out in the queue, per reason'),
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value (counters and gauges)
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_tracer = None  # profiling.Tracer also receiving stage spans and fetches while a run is traced
+
+
+class _Timer:
+    """Context manager observing elapsed seconds into a histogram"""
+    __slots__ = ('name', 'labels', 'start')
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def set_tracer(tracer):
+    """Send stage spans and fetches to a profiling.Tracer as well (None to stop)"""
+    global _tracer
+    _tracer = tracer
+
+
+def enabled():
+    return METRICS_CONFIG['enabled']
+
+
+def inc(name, labels=(), amount=1):
+    """Add to a counter; labels is a tuple of (label, value) pairs"""
+    if not METRICS_CONFIG['enabled']:
+        return
+    key = (name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, labels=()):
+    """Set a gauge to its current value"""
+    if not METRICS_CONFIG['enabled']:
+        return
+    with _lock:
+        _counters[(name, labels)] = value
+
+
+def observe(name, value, labels=()):
+    """Record one observation in a histogram"""
+    if not METRICS_CONFIG['enabled']:
+        return
+    buckets = METRICS_CONFIG['buckets']
+    key = (name, labels)
+    with _lock:
+        counts = _histograms.get(key)
+        if counts is None:
+            counts = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+
+def stage_timer(stage):
+    """Time a block as one pipeline stage: with stage_timer('parse'): ..."""
+    tracer = _tracer
+    if tracer is not None:
+        return tracer.span(stage)
+    if not METRICS_CONFIG['enabled']:
+        return NULL_TIMER
+    return _Timer('scraper_stage_seconds', (('stage', stage),))
+
+
+def observe_stage(stage, seconds):
+    """Record a stage duration measured elsewhere (e.g. in a worker process)"""
+    observe('scraper_stage_seconds', seconds, (('stage', stage),))
+
+
+def record_fetch(url, status, size, seconds, cpu_seconds=0.0):
+    """Record one HTTP fetch: latency, status code and response bytes per host"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.add_fetch(url, status, size, seconds, cpu_seconds)
+    if not METRICS_CONFIG['enabled']:
+        return
+    host = urlparse(url).netloc or 'unknown'
+    observe('scraper_fetch_seconds', seconds, (('host', host),))
+    inc('scraper_fetch_requests_total', (('host', host), ('status', str(status))))
+    if size:
+        inc('scraper_fetch_bytes_total', (('host', host),), size)
+
+
+def reset():
+    """Drop every recorded value (tests)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{label}="{_escape(value)}"' for label, value in pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render():
+    """All metrics in the Prometheus text format (version 0.0.4)"""
+    buckets = METRICS_CONFIG['buckets']
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(counts)) for key, counts in _histograms.items())
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind in ('counter', 'gauge'):
+            for (metric, labels), value in counters:
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            continue
+        for (metric, labels), counts in histograms:
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, (("le", bound),))} {cumulative}')
+            total = cumulative + counts[len(buckets)]
+            lines.append(f'{name}_bucket{_format_labels(labels, (("le", "+Inf"),))} {total}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(counts[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {total}')
+    return '\n'.join(lines) + '\n'
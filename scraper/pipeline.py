@@ -0,0 +1,318 @@
+"""
+Staged pipeline runner
+Stages run concurrently in threads and hand items to each other through bounded
+queues. A slow stage fills its input queue and blocks the stages before it
+(backpressure), so work never piles up in memory. Items leave every stage in
+input order. Per-stage stats show which stage is the bottleneck.
+
+Threads share the GIL, so most of the gain comes from overlapping network-bound
+scraping with cleaning, branding, validation and writing. Extra workers on a
+pure-Python stage help mainly when it waits on I/O.
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from profiling import thread_target
+
+# kind is 'map' (func(item) -> item, run by `workers` threads) or 'stream'
+# (func(items) -> iterable of items in one thread, for stages that need every
+# earlier item, such as dedup)
+Stage = namedtuple('Stage', ['name', 'func', 'workers', 'kind'])
+
+# Seconds between abort checks while waiting on a queue
+POLL_INTERVAL = 0.1
+
+_END = object()
+
+
+def map_stage(name, func, workers=1):
+    """Stage applying func to each item, in `workers` threads"""
+    return Stage(name, func, max(1, int(workers)), 'map')
+
+
+def stream_stage(name, func):
+    """Stage transforming the whole item stream in one thread"""
+    return Stage(name, func, 1, 'stream')
+
+
+class PipelineAborted(Exception):
+    """Raised in stage threads once another stage has failed or the consumer stopped"""
+
+
+class StageStats:
+    """
+    Counters for one stage, summed over its workers
+    busy is time spent working, starved is time waiting for input and blocked is
+    time waiting for room in the next queue
+    """
+
+    def __init__(self, name, workers, capacity):
+        self.name = name
+        self.workers = workers
+        self.capacity = capacity  # input queue size (0 for the source)
+        self.items = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.occupancy_sum = 0
+        self.occupancy_samples = 0
+        self.occupancy_max = 0
+        self._lock = threading.Lock()
+
+    def sample(self, occupancy):
+        with self._lock:
+            self.occupancy_sum += occupancy
+            self.occupancy_samples += 1
+            if occupancy > self.occupancy_max:
+                self.occupancy_max = occupancy
+
+    def add(self, items=0, busy=0.0, starved=0.0, blocked=0.0):
+        with self._lock:
+            self.items += items
+            self.busy += busy
+            self.starved += starved
+            self.blocked += blocked
+
+    def to_dict(self, wall_seconds):
+        """Summary: throughput the stage could sustain and how loaded it was"""
+        busy = max(self.busy, 1e-9)
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': round(self.busy, 4),
+            'starved_seconds': round(self.starved, 4),
+            'blocked_seconds': round(self.blocked, 4),
+            'items_per_second': round(self.items * self.workers / busy, 1),
+            'utilization': round(self.busy / (self.workers * wall_seconds), 3) if wall_seconds else 0.0,
+            'queue_capacity': self.capacity,
+            'queue_avg': round(self.occupancy_sum / self.occupancy_samples, 1) if self.occupancy_samples else 0.0,
+            'queue_max': self.occupancy_max,
+        }
+
+
+class _Channel:
+    """Bounded queue between two stages; waits give up once the pipeline aborts"""
+
+    def __init__(self, capacity, abort):
+        self.queue = queue.Queue(capacity)
+        self.abort = abort
+
+    def put(self, entry):
+        start = time.perf_counter()
+        while True:
+            if self.abort.is_set():
+                raise PipelineAborted()
+            try:
+                self.queue.put(entry, timeout=POLL_INTERVAL)
+                return time.perf_counter() - start
+            except queue.Full:
+                pass
+
+    def get(self, stats):
+        stats.sample(self.queue.qsize())
+        start = time.perf_counter()
+        while True:
+            if self.abort.is_set():
+                raise PipelineAborted()
+            try:
+                entry = self.queue.get(timeout=POLL_INTERVAL)
+                return entry, time.perf_counter() - start
+            except queue.Empty:
+                pass
+
+
+def _run_source(source, output, stats):
+    sequence = 0
+    started = time.perf_counter()
+    blocked = 0.0
+    for item in source:
+        blocked += output.put((sequence, item))
+        sequence += 1
+    blocked += output.put((sequence, _END))
+    stats.add(sequence, time.perf_counter() - started - blocked, 0.0, blocked)
+
+
+def _run_stream(stage, source, output, stats):
+    started = time.perf_counter()
+    waits = {'starved': 0.0, 'blocked': 0.0}
+
+    def items():
+        while True:
+            (_, item), waited = source.get(stats)
+            waits['starved'] += waited
+            if item is _END:
+                return
+            yield item
+
+    sequence = 0
+    for item in stage.func(items()):
+        waits['blocked'] += output.put((sequence, item))
+        sequence += 1
+    waits['blocked'] += output.put((sequence, _END))
+    elapsed = time.perf_counter() - started
+    stats.add(sequence, elapsed - waits['starved'] - waits['blocked'], waits['starved'], waits['blocked'])
+
+
+class _MapStage:
+    """
+    Workers of one map stage
+    Results are released in input order; a worker takes a new item only while
+    fewer than `window` items are between input and output, which bounds the
+    reorder buffer when one item is slow
+    """
+
+    def __init__(self, stage, source, output, stats, window):
+        self.stage = stage
+        self.source = source
+        self.output = output
+        self.stats = stats
+        self.slots = threading.Semaphore(window)
+        self.ready = {}
+        self.next_sequence = 0
+        self.lock = threading.Lock()
+        self.running = stage.workers
+
+    def _acquire_slot(self):
+        while not self.slots.acquire(timeout=POLL_INTERVAL):
+            if self.source.abort.is_set():
+                raise PipelineAborted()
+
+    def _deliver(self, sequence, item):
+        """Queue a result and pass on every result that is now in order"""
+        blocked = 0.0
+        with self.lock:
+            self.ready[sequence] = item
+            while self.next_sequence in self.ready:
+                blocked += self.output.put((self.next_sequence, self.ready.pop(self.next_sequence)))
+                self.next_sequence += 1
+                self.slots.release()
+        return blocked
+
+    def work(self):
+        started = time.perf_counter()
+        items = 0
+        starved = blocked = 0.0
+        func = self.stage.func
+        try:
+            while True:
+                self._acquire_slot()
+                (sequence, item), waited = self.source.get(self.stats)
+                starved += waited
+                if item is _END:
+                    # Leave the marker for the other workers
+                    self.source.queue.put((sequence, _END))
+                    self.slots.release()
+                    break
+                blocked += self._deliver(sequence, func(item))
+                items += 1
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.add(items, elapsed - starved - blocked, starved, blocked)
+        with self.lock:
+            self.running -= 1
+            last = self.running == 0
+        if last:
+            # Every worker delivers before taking another item, so all results are out
+            self.output.put((self.next_sequence, _END))
+
+
+def run_pipeline(source, stages, queue_size=100, stats=None, source_name='source', sink_name='sink'):
+    """
+    Run stages concurrently, yielding the last stage's output in input order
+
+    The caller's loop over the results is the final (sink) stage: the time it
+    spends between items is reported under sink_name. Closing the generator
+    early or an exception in any stage stops every stage; a stage's exception
+    is re-raised here.
+
+    Args:
+        source: Iterable of input items, consumed in its own thread
+        stages: Stages from map_stage() / stream_stage(), in order
+        queue_size: Capacity of each queue between stages
+        stats: Optional dict filled with {stage name: summary dict} (see
+            StageStats.to_dict) plus 'wall_seconds' once the run ends
+    """
+    abort = threading.Event()
+    errors = []
+    stage_stats = [StageStats(source_name, 1, 0)]
+    channels = [_Channel(queue_size, abort)]
+    threads = []
+
+    def guarded(target, *args):
+        @thread_target
+        def run():
+            try:
+                target(*args)
+            except PipelineAborted:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                abort.set()
+        return run
+
+    threads.append(threading.Thread(target=guarded(_run_source, source, channels[0], stage_stats[0]),
+                                    name=f'pipeline-{source_name}', daemon=True))
+    for stage in stages:
+        source_channel = channels[-1]
+        output = _Channel(queue_size, abort)
+        channels.append(output)
+        stats_entry = StageStats(stage.name, stage.workers, queue_size)
+        stage_stats.append(stats_entry)
+        if stage.kind == 'stream':
+            threads.append(threading.Thread(target=guarded(_run_stream, stage, source_channel, output, stats_entry),
+                                             name=f'pipeline-{stage.name}', daemon=True))
+            continue
+        workers = _MapStage(stage, source_channel, output, stats_entry, queue_size + stage.workers)
+        for number in range(stage.workers):
+            threads.append(threading.Thread(target=guarded(workers.work),
+                                             name=f'pipeline-{stage.name}-{number}', daemon=True))
+
+    sink_stats = StageStats(sink_name, 1, queue_size)
+    stage_stats.append(sink_stats)
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            (_, item), waited = channels[-1].get(sink_stats)
+            if item is _END:
+                break
+            resumed = time.perf_counter()
+            yield item
+            sink_stats.add(1, time.perf_counter() - resumed, waited)
+    except PipelineAborted:
+        pass  # A stage failed; its exception is raised below
+    finally:
+        # Stops the stages if the consumer left early or a stage failed
+        abort.set()
+        for thread in threads:
+            thread.join()
+        if stats is not None:
+            wall = time.perf_counter() - started
+            stats.update({entry.name: entry.to_dict(wall) for entry in stage_stats})
+            stats['wall_seconds'] = round(wall, 4)
+    if errors:
+        raise errors[0]
+
+
+def bottleneck(stats):
+    """Name of the busiest stage (highest utilization) in a run_pipeline stats dict"""
+    stages = {name: entry for name, entry in stats.items() if isinstance(entry, dict)}
+    if not stages:
+        return None
+    return max(stages, key=lambda name: stages[name]['utilization'])
+
+
+def print_stage_report(stats):
+    """Print per-stage throughput and queue occupancy from a run_pipeline stats dict"""
+    print(f"\n{'Stage':<12}{'Workers':>8}{'Items':>8}{'Busy s':>9}{'Items/s':>10}{'Util':>7}{'Queue avg/max':>20}")
+    for name, entry in stats.items():
+        if not isinstance(entry, dict):
+            continue
+        queue_text = f"{entry['queue_avg']}/{entry['queue_max']} of {entry['queue_capacity']}" if entry['queue_capacity'] else '-'
+        print(f"{name:<12}{entry['workers']:>8}{entry['items']:>8}{entry['busy_seconds']:>9.3f}"
+              f"{entry['items_per_second']:>10}{entry['utilization'] * 100:>6.0f}%{queue_text:>20}")
+    print(f"Wall time: {stats.get('wall_seconds', 0):.3f}s, bottleneck: {bottleneck(stats)}")
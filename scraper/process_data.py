@@ -5,19 +5,31 @@ Product Data Processing Tool - Developer Test Assignment
 Developed by Sanchit Kathpalia
 LinkedIn: https://www.linkedin.com/in/sanchit-kathpalia-a841b5252/
 """
-import json
 import os
 import sys
+import time
+from datetime import date
+from functools import partial
 
 # Add current directory to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
 # Import from local modules
-from scraper import scrape_products
-from data_cleaning import clean_products
-from brand_detection import add_brand_to_products
-from config import SCRAPING_SITES, SCRAPER_CONFIG
+from scraper import iter_scrape_products
+from data_cleaning import clean_record
+from brand_detection import add_brand
+from data_io import write_products, get_output_path, read_products, detect_format, COLUMNAR_FORMATS
+from incremental import load_previous, save_index, iter_hashed, iter_lookup
+from dedup import iter_dedup_products
+from delta import ChangeDetector, iter_detect_changes, get_delta_paths, load_index, save_index as save_delta_index, write_delta
+from data_validation import QualityAggregator, iter_validated
+from pipeline import run_pipeline, map_stage, stream_stage, print_stage_report
+from product_store import ProductStore, site_label
+from product_record import ProductRecord
+from metrics import stage_timer
+from profiling import run_profiled
+from config import SCRAPING_SITES, SCRAPER_CONFIG, PIPELINE_CONFIG, OUTPUT_CONFIG
 
 def list_available_sites():
     """List all available scraping sites"""
@@ -30,7 +42,27 @@ def list_available_sites():
             print(f"    URL: {site['base_url']}")
     print("-" * 60)
 
-def main(site_key=None, custom_url=None, max_products=100):
+def clean_product_record(product):
+    """Clean a single raw product into a ProductRecord"""
+    with stage_timer('clean'):
+        return clean_record(ProductRecord.coerce(product))
+
+def brand_product_record(record):
+    """Detect the brand of a cleaned record"""
+    with stage_timer('brand'):
+        return add_brand(record)
+
+def process_product(product):
+    """Clean and brand a single raw product"""
+    return brand_product_record(clean_product_record(product))
+
+def process_lookup(pair):
+    """Final product for a (raw product, previous result or None) pair from iter_lookup"""
+    product, prior = pair
+    return prior if prior is not None else process_product(product)
+
+def main(site_key=None, custom_url=None, max_products=100, output_format=None, incremental=False,
+         dedup=False, dedup_threshold=None, store=False, workers=None, queue_size=None, delta=False):
     """
     Main processing pipeline
     
@@ -38,6 +70,16 @@ def main(site_key=None, custom_url=None, max_products=100):
         site_key: Key from SCRAPING_SITES config (e.g., 'wegetanystock')
         custom_url: Custom URL to scrape (if site_key is 'custom')
         max_products: Maximum number of products to scrape
+        output_format: 'json', 'jsonl', 'parquet' or 'arrow' (defaults to OUTPUT_CONFIG['format']);
+            columnar formats write today's site=.../run_date=... partition
+        incremental: Reuse the previous run's output for unchanged raw products
+        dedup: Tag near-duplicate products with a shared 'cluster_id'
+        dedup_threshold: Name similarity needed to join a cluster (default DEDUP_CONFIG)
+        store: Also upsert the final products into the indexed product store
+        workers: {stage name: threads} overriding PIPELINE_CONFIG['workers']
+        queue_size: Capacity of the queues between stages (default PIPELINE_CONFIG)
+        delta: Also write only the inserts, updates and deletions since the previous
+            delta run of this site (with store, they also feed /api/changes)
     """
     print("=" * 60)
     print("Product Data Processing Pipeline")
@@ -49,41 +91,138 @@ def main(site_key=None, custom_url=None, max_products=100):
         print(f"\nUsing default site: {SCRAPER_CONFIG.get('default_site', 'wegetanystock')}")
         site_key = SCRAPER_CONFIG.get('default_site', 'wegetanystock')
     
-    # Step 1: Scrape products
+    # Every step below is a pipeline stage: scraping, cleaning, branding, validation
+    # and writing run concurrently, connected by bounded queues
     print(f"\n[Step 1] Scraping products from: {SCRAPING_SITES.get(site_key, {}).get('name', site_key)}...")
-    products = scrape_products(max_products=max_products, site_key=site_key, custom_url=custom_url)
+    scrape_status = {}
+    products = iter_scrape_products(max_products=max_products, site_key=site_key, custom_url=custom_url,
+                                    status=scrape_status)
+    stage_workers = dict(PIPELINE_CONFIG['workers'], **(workers or {}))
     
-    # Step 2: Clean products
-    print("\n[Step 2] Cleaning product data...")
-    cleaned_products = clean_products(products)
+    partition = {'site': site_label(site_key, custom_url), 'run_date': date.today().isoformat()}
+    output_file = get_output_path('final', output_format, partition)
+    if detect_format(output_file) in COLUMNAR_FORMATS:
+        from columnar_io import require_pyarrow
+        require_pyarrow()  # fail before scraping rather than at the first write
+    
+    # Load the previous run's output for incremental mode
+    previous = {}
+    hashes = []
+    stats = {}
+    if incremental:
+        previous = load_previous(output_file, dedup, dedup_threshold)
+        print(f"\n[Incremental] Loaded {len(previous)} products from the previous run")
     
-    # Step 3: Detect brands
+    # Step 2 + 3: Clean products and detect brands (one fused stage when reusing previous output)
+    print("\n[Step 2] Cleaning product data...")
     print("\n[Step 3] Detecting brands...")
-    final_products = add_brand_to_products(cleaned_products)
+    if incremental:
+        stages = [
+            stream_stage('reuse', lambda items: iter_lookup(items, previous, hashes, stats)),
+            map_stage('process', process_lookup, stage_workers['process']),
+        ]
+    else:
+        # Hash raw products on the way in, so the next run can be incremental
+        products = iter_hashed(products, hashes)
+        stages = [
+            map_stage('clean', clean_product_record, stage_workers['clean']),
+            map_stage('brand', brand_product_record, stage_workers['brand']),
+        ]
+    
+    # Step 4 (optional): Cluster near-duplicates
+    dedup_stats = {}
+    if dedup:
+        print("\n[Step 4] Detecting near-duplicates...")
+        stages.append(stream_stage('dedup', lambda items: iter_dedup_products(items, dedup_stats, dedup_threshold)))
+    
+    # Step 5: Validate, folding quality metrics into running totals
+    quality = QualityAggregator()
+    stages.append(stream_stage(
+        'validate', lambda items: iter_validated(items, quality, batch_size=PIPELINE_CONFIG['validate_batch_size'])))
+    
+    # Step 6 (optional): Diff against the previous run's per-site content hashes
+    if delta:
+        delta_file, delta_index_file = get_delta_paths()
+        delta_index = load_index(delta_index_file)
+        detector = ChangeDetector(delta_index.get(partition['site'], {}))
+        stages.append(stream_stage('delta', lambda items: iter_detect_changes(items, detector)))
+    
+    pipeline_stats = {}
+    final_products = run_pipeline(products, stages, queue_size or PIPELINE_CONFIG['queue_size'], pipeline_stats,
+                                  source_name='scrape', sink_name='write')
     
-    # Save final output
-    os.makedirs('../data', exist_ok=True)
-    output_file = '../data/products_final.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(final_products, f, indent=2, ensure_ascii=False)
+    # Collect the summary while products stream to the output file
+    brand_counts = {}
+    sample = []
+    
+    def track(products):
+        for product in products:
+            brand = product.get('brand', 'Unknown')
+            brand_counts[brand] = brand_counts.get(brand, 0) + 1
+            if len(sample) < 5:
+                sample.append(product)
+            yield product
+    
+    # Save final output, plus the raw-hash index used by the next incremental run
+    positions = []
+    try:
+        count = write_products(output_file, track(final_products), positions=positions)
+    finally:
+        if incremental:
+            previous.close()
+    save_index(output_file, hashes, positions, dedup, dedup_threshold)
     
-    print(f"\n[Complete] Saved {len(final_products)} products to {output_file}")
+    print(f"\n[Complete] Saved {count} products to {output_file}")
+    
+    # The delta index only moves forward once the full output is saved; a capped or
+    # partial scrape keeps the products it did not see instead of deleting them
+    if delta:
+        complete = scrape_status.get('complete', False)
+        changes = detector.changes(complete)
+        write_delta(delta_file, changes, partition['site'], time.time())
+        delta_index[partition['site']] = detector.index(complete)
+        save_delta_index(delta_index_file, delta_index)
+        print(f"[Delta] Saved {len(changes)} changes to {delta_file}")
+        if not complete:
+            print("[Delta] The scrape did not reach the end of the site: no deletions recorded")
+    
+    # Index the saved products for /api/products, streaming them back from the output file
+    if store:
+        product_store = ProductStore()
+        stored = product_store.upsert_products(read_products(output_file), partition['site'])
+        print(f"[Store] Upserted {stored} products into {product_store.path}")
+        if delta:
+            product_store.record_changes(changes, partition['site'])
     
     # Print summary
     print("\n" + "=" * 60)
     print("Summary:")
     print("=" * 60)
-    brand_counts = {}
-    for product in final_products:
-        brand = product.get('brand', 'Unknown')
-        brand_counts[brand] = brand_counts.get(brand, 0) + 1
+    
+    print_stage_report(pipeline_stats)
+    
+    quality_metrics = quality.metrics()
+    print(f"\nValid: {quality_metrics['valid_products']}/{quality_metrics['total_products']} "
+          f"({quality_metrics['validity_percentage']:.1f}%), "
+          f"average completeness {quality_metrics['average_completeness']}%")
+    
+    if incremental:
+        print(f"\nReused: {stats['reused']}, Recomputed: {stats['recomputed']}")
+    
+    if delta:
+        counts = detector.summary(changes)
+        print(f"\nChanges: {counts['insert']} inserted, {counts['update']} updated "
+              f"({counts['price_changes']} price changes), {counts['delete']} deleted")
+    
+    if dedup:
+        print(f"\nNear-duplicates: {dedup_stats['duplicates']} products in {dedup_stats['clusters']} clusters")
     
     print("\nBrand Distribution:")
     for brand, count in sorted(brand_counts.items(), key=lambda x: x[1], reverse=True):
         print(f"  {brand}: {count}")
     
     print("\nSample Products:")
-    for i, product in enumerate(final_products[:5], 1):
+    for i, product in enumerate(sample, 1):
         print(f"\n{i}. {product.get('name', 'N/A')}")
         print(f"   Brand: {product.get('brand', 'N/A')}")
         print(f"   Price: {product.get('price', 'N/A')}")
@@ -97,11 +236,42 @@ if __name__ == '__main__':
     parser.add_argument('--url', '-u', type=str, help='Custom URL to scrape (use with --site custom)')
     parser.add_argument('--max', '-m', type=int, default=100, help='Maximum number of products to scrape')
     parser.add_argument('--list-sites', '-l', action='store_true', help='List all available sites')
+    parser.add_argument('--format', '-f', choices=['json', 'jsonl', 'parquet', 'arrow'],
+                        help='Output format (default from OUTPUT_CONFIG); parquet/arrow need pyarrow')
+    parser.add_argument('--incremental', '-i', action='store_true', help='Only clean/brand products that changed since the previous run')
+    parser.add_argument('--dedup', '-d', action='store_true', help='Tag near-duplicate products with a cluster_id')
+    parser.add_argument('--dedup-threshold', type=float, help='Name similarity (0-1) needed to count as a duplicate')
+    parser.add_argument('--store', action='store_true', help='Upsert the final products into the indexed product store')
+    parser.add_argument('--delta', action='store_true',
+                        help='Also write the inserts, updates and deletions since the previous run (data/products_delta.jsonl)')
+    parser.add_argument('--workers', '-w', action='append', default=[], metavar='STAGE=N',
+                        help='Threads for a pipeline stage (clean, brand, process), e.g. -w clean=4')
+    parser.add_argument('--queue-size', type=int, help='Capacity of the queues between pipeline stages')
+    parser.add_argument('--profile', nargs='?', metavar='PATH',
+                        const=os.path.join(OUTPUT_CONFIG['data_dir'], OUTPUT_CONFIG['profile_file']),
+                        help='Save a cProfile dump of every pipeline thread (default data/profile.prof)')
+    parser.add_argument('--trace', nargs='?', metavar='PATH',
+                        const=os.path.join(OUTPUT_CONFIG['data_dir'], OUTPUT_CONFIG['trace_file']),
+                        help='Save a Chrome trace / Perfetto timeline of fetches and stages (default data/trace.json)')
+    parser.add_argument('--top-urls', type=int, default=10, help='Slowest URLs to list with --profile/--trace')
     
     args = parser.parse_args()
     
+    stage_workers = {}
+    for option in args.workers:
+        stage, _, count = option.partition('=')
+        if stage not in PIPELINE_CONFIG['workers'] or not count.isdigit() or int(count) < 1:
+            parser.error(f"--workers expects STAGE=N with STAGE one of {', '.join(PIPELINE_CONFIG['workers'])}")
+        stage_workers[stage] = int(count)
+    
     if args.list_sites:
         list_available_sites()
     else:
-        main(site_key=args.site, custom_url=args.url, max_products=args.max)
+        run = partial(main, site_key=args.site, custom_url=args.url, max_products=args.max, output_format=args.format,
+                      incremental=args.incremental, dedup=args.dedup, dedup_threshold=args.dedup_threshold,
+                      store=args.store, workers=stage_workers, queue_size=args.queue_size, delta=args.delta)
+        if args.profile or args.trace:
+            run_profiled(run, args.profile, args.trace, args.top_urls)
+        else:
+            run()
 
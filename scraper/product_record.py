@@ -0,0 +1,130 @@
+"""
+Compact product record
+A __slots__ class used by the scraper, cleaning, brand detection and validation
+instead of per-stage dict copies; converted with to_dict() only at the JSON/API boundary
+"""
+import sys
+
+# Known fields, in the order they appear in output JSON
+FIELDS = (
+    'name',
+    'price',
+    'volume_weight',
+    'image_url',
+    'original_name',
+    'multipack',
+    'slug',
+    'brand',
+    'brand_confidence',
+    'cluster_id',
+)
+
+# Short, highly repetitive values worth sharing between records
+INTERNED_FIELDS = ('price', 'volume_weight', 'multipack', 'brand')
+
+
+class ProductRecord:
+    """
+    Product with a fixed set of slots
+    Unset slots mean "key absent", so records round-trip to exactly the dicts they came from.
+    Supports the dict-style access used across the pipeline (get, [], in, keys, items).
+    Unknown keys are kept in an optional `extra` dict.
+    """
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, **fields):
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a new record from a dict (or copy another record)"""
+        record = cls()
+        for key, value in data.items():
+            record[key] = value
+        return record
+
+    @classmethod
+    def coerce(cls, product):
+        """Return product itself if it is already a record, otherwise convert it"""
+        if isinstance(product, cls):
+            return product
+        return cls.from_dict(product)
+
+    def to_dict(self):
+        """Convert to a plain dict for JSON serialization or API responses"""
+        result = {}
+        for field in FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                result[field] = value
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    def copy(self):
+        """Shallow copy of the record"""
+        return ProductRecord.from_dict(self)
+
+    def intern_fields(self):
+        """Share memory for repetitive short values such as prices and volumes"""
+        for field in INTERNED_FIELDS:
+            value = getattr(self, field, None)
+            if type(value) is str:
+                setattr(self, field, sys.intern(value))
+        return self
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        for field in FIELDS:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                yield field, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __eq__(self, other):
+        if isinstance(other, (ProductRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"ProductRecord({self.to_dict()!r})"
+
+
+_MISSING = object()
+_FIELD_SET = frozenset(FIELDS)
+
+
+def to_dict(product):
+    """Convert a record (or pass through a dict) for the JSON/API boundary"""
+    if isinstance(product, ProductRecord):
+        return product.to_dict()
+    return product
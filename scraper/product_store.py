@@ -0,0 +1,513 @@
+"""
+Indexed product store
+Cleaned products are upserted into SQLite keyed by (site, slug), with indexed
+columns for brand, price, quantity and site and an FTS5 index over name and
+brand. search() answers full-text queries, filters and sorts one page at a
+time with keyset cursors, so a page costs the same at row 10 or row 1,000,000.
+"""
+import base64
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from config import STORE_CONFIG
+from data_cleaning import generate_slug
+from data_io import read_products, resolve_input_path
+from dedup import canonical_quantity
+from product_record import to_dict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    price REAL,
+    quantity_amount REAL,
+    quantity_unit TEXT,
+    pack_count INTEGER,
+    product TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (site, slug)
+);
+CREATE INDEX IF NOT EXISTS products_slug ON products (slug);
+CREATE INDEX IF NOT EXISTS products_site ON products (site, updated_at, id);
+CREATE INDEX IF NOT EXISTS products_site_name ON products (site, name COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS products_brand ON products (brand, id);
+CREATE INDEX IF NOT EXISTS products_brand_name ON products (brand, name COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS products_name ON products (name COLLATE NOCASE, id);
+CREATE INDEX IF NOT EXISTS products_price ON products (ifnull(price, 1e18), id);
+CREATE INDEX IF NOT EXISTS products_quantity ON products (quantity_unit, ifnull(quantity_amount, 1e18), id);
+CREATE INDEX IF NOT EXISTS products_quantity_sort ON products (ifnull(quantity_amount, 1e18), id);
+CREATE INDEX IF NOT EXISTS products_updated ON products (updated_at, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, brand, content='products', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name, brand) VALUES (new.id, new.name, new.brand);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand);
+END;
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    op TEXT NOT NULL,
+    old_price TEXT,
+    new_price TEXT,
+    product TEXT,
+    changed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_site ON changes (site, id);
+CREATE INDEX IF NOT EXISTS changes_time ON changes (changed_at, id);
+
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, brand ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, brand) VALUES ('delete', old.id, old.name, old.brand);
+    INSERT INTO products_fts (rowid, name, brand) VALUES (new.id, new.name, new.brand);
+END;
+"""
+
+# Unchanged products are skipped, so updated_at is when a product last changed
+UPSERT = """
+INSERT INTO products (site, slug, name, brand, price, quantity_amount, quantity_unit,
+                      pack_count, product, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (site, slug) DO UPDATE SET
+    name = excluded.name, brand = excluded.brand, price = excluded.price,
+    quantity_amount = excluded.quantity_amount, quantity_unit = excluded.quantity_unit,
+    pack_count = excluded.pack_count, product = excluded.product, updated_at = excluded.updated_at
+WHERE excluded.product IS NOT products.product
+"""
+
+# sort name -> SQL expression; each matches the leading column of an index exactly
+SORTS = {
+    'name': 'p.name COLLATE NOCASE',
+    'brand': 'p.brand',
+    'price': 'ifnull(p.price, 1e18)',  # missing prices and quantities sort last
+    'quantity': 'ifnull(p.quantity_amount, 1e18)',
+    'updated': 'p.updated_at',
+    'relevance': 'bm25(products_fts)',
+}
+
+# sort name -> filters whose index is also ordered by the sort, so they can drive a page
+ORDERED_FILTERS = {
+    'name': ('brand', 'site'),
+    'brand': ('brand',),
+    'price': ('price',),
+    'quantity': ('quantity', 'unit'),
+    'updated': ('site',),
+}
+
+PRICE_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+SEARCH_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+MIN_PREFIX_LENGTH = 2
+
+
+def site_label(site_key, custom_url=None):
+    """Site column value: the site key, or the host for custom URLs"""
+    if site_key == 'custom' and custom_url:
+        return urlparse(custom_url).netloc.lower() or 'custom'
+    return site_key or 'unknown'
+
+
+def product_row(product, site, now):
+    """Column values for one product, or None if it has no name"""
+    product = to_dict(product)
+    name = product.get('name') or ''
+    if not name:
+        return None
+    slug = product.get('slug') or generate_slug(name)
+    price_match = PRICE_PATTERN.search(product.get('price') or '')
+    quantity = canonical_quantity(product)
+    count, amount, unit = quantity if quantity else (None, None, None)
+    return (site, slug or name, name, product.get('brand') or 'Unknown',
+            float(price_match.group(0)) if price_match else None, amount, unit, count,
+            json.dumps(product, ensure_ascii=False, sort_keys=True), now)
+
+
+def fts_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, the last one as a
+    prefix (search-as-you-type). Exact terms keep AND queries fast, because only
+    prefix terms have to merge the doclists of every matching word. A one-letter
+    last word is matched exactly: prefixes start at the shortest indexed one
+    (prefix='2 3'), since a single letter would merge a large share of the index.
+    """
+    tokens = SEARCH_TOKEN_PATTERN.findall(text or '')
+    if not tokens:
+        return ''
+    last = f'"{tokens[-1]}"' + ('*' if len(tokens[-1]) >= MIN_PREFIX_LENGTH else '')
+    return ' '.join([f'"{token}"' for token in tokens[:-1]] + [last])
+
+
+def parse_since(since):
+    """
+    ('id', n) for a change id (the nextSince of the previous page) or ('time', unix
+    seconds) for an ISO-8601 date/time; None or '' means from the beginning
+    """
+    if since in (None, ''):
+        return 'id', 0
+    text = str(since).strip()
+    if text.isdigit():
+        return 'id', int(text)
+    try:
+        moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError('since must be a change id or an ISO-8601 time')
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return 'time', moment.timestamp()
+
+
+def encode_cursor(sort, value, row_id):
+    data = json.dumps([sort, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """(value, id) from a cursor made for the same sort"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise ValueError('Cursor does not match the requested sort')
+    if sort == 'relevance' and not (isinstance(value, list) and len(value) == 2):
+        raise ValueError('Invalid cursor')
+    return value, row_id
+
+
+class ProductStore:
+    """
+    SQLite product table with full-text search
+    Each call opens its own short-lived connection, like JobStore, so the store
+    can be shared between threads and server processes
+    """
+
+    def __init__(self, path=None):
+        self.path = path or STORE_CONFIG['database']
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def upsert_products(self, products, site, batch_size=None):
+        """
+        Insert or update products for a site, one transaction per batch
+        Returns the number of products written (unchanged ones count too)
+        """
+        batch_size = batch_size or STORE_CONFIG['batch_size']
+        now = time.time()
+        written = 0
+        conn = self._connect()
+        conn.execute(f"PRAGMA cache_size=-{STORE_CONFIG['cache_kb']}")
+        try:
+            batch = []
+            for product in products:
+                row = product_row(product, site, now)
+                if row is not None:
+                    batch.append(row)
+                if len(batch) >= batch_size:
+                    with conn:
+                        conn.executemany(UPSERT, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                with conn:
+                    conn.executemany(UPSERT, batch)
+                written += len(batch)
+            # Cheap: only re-analyzes tables whose statistics are missing or well out of date
+            conn.execute('PRAGMA analysis_limit=1000')
+            conn.execute('PRAGMA optimize')
+        finally:
+            conn.close()
+        return written
+
+    def analyze(self):
+        """Refresh planner statistics; run once after a bulk load rather than per upsert"""
+        with self._connect() as conn:
+            conn.execute('PRAGMA analysis_limit=1000')
+            conn.execute('ANALYZE')
+
+    def record_changes(self, changes, site, now=None):
+        """Append delta changes (see delta.py) to the change feed; returns how many"""
+        now = now or time.time()
+        rows = [(site, change['key'], change['op'],
+                 change.get('old_price'), change.get('new_price', change.get('price')),
+                 json.dumps(change['product'], ensure_ascii=False, sort_keys=True) if change.get('product') else None,
+                 now)
+                for change in changes]
+        with self._connect() as conn:
+            conn.executemany('INSERT INTO changes (site, slug, op, old_price, new_price, product, changed_at)'
+                             ' VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def changes(self, since=None, site=None, limit=None):
+        """
+        Changes after a change id (or at/after an ISO time), oldest first
+        Returns {'changes': [...], 'next_since': id to pass as since for the next page}
+        """
+        kind, value = parse_since(since)
+        limit = max(1, min(int(limit or STORE_CONFIG['page_size']), STORE_CONFIG['max_page_size']))
+        clauses = ['id > ?' if kind == 'id' else 'changed_at >= ?']
+        params = [value]
+        if site:
+            clauses.append('site = ?')
+            params.append(site)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT id, site, slug, op, old_price, new_price, product, changed_at FROM changes"
+                                f" WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?", (*params, limit)).fetchall()
+            if rows or kind == 'id':
+                next_since = rows[-1][0] if rows else value
+            else:
+                # Nothing since that time yet: resume after the newest change so far
+                next_since = conn.execute('SELECT ifnull(max(id), 0) FROM changes').fetchone()[0]
+        changes = [{'id': row_id, 'site': row_site, 'key': slug, 'op': op, 'old_price': old_price,
+                    'new_price': new_price, 'product': json.loads(product) if product else None,
+                    'changed_at': changed_at}
+                   for row_id, row_site, slug, op, old_price, new_price, product, changed_at in rows]
+        return {'changes': changes, 'next_since': next_since}
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def _choose_driver(self, conn, filters, sort, limit):
+        """
+        Name of the filter that should pick a page's rows, or None to walk the sort index.
+        A filter whose index is ordered by the sort wins outright. Otherwise sorting the
+        n rows of the smallest filter beats walking past non-matching rows of the sort
+        index (about limit * total / n of them) when n < sqrt(limit * total); counts stop
+        at that cutoff, so estimating stays cheap.
+        """
+        if not filters:
+            return None
+        for name, _, _ in filters:
+            if name in ORDERED_FILTERS.get(sort, ()):
+                return name
+        total = conn.execute('SELECT max(id) FROM products').fetchone()[0] or 0
+        driver, cutoff = None, int(math.sqrt((limit + 1) * total))
+        for name, condition, values in filters:
+            if name == 'text':
+                sql = 'SELECT count(*) FROM (SELECT 1 FROM products_fts WHERE products_fts MATCH ? LIMIT ?)'
+                # Exact words match a subset without merging every word a prefix matches,
+                # so they settle a broad query cheaply
+                attempts = [[values[0].replace('"*', '"')], values]
+            else:
+                sql = f"SELECT count(*) FROM (SELECT 1 FROM products p WHERE {condition.format('')} LIMIT ?)"
+                attempts = [values]
+            for attempt in attempts:
+                count = conn.execute(sql, attempt + [cutoff]).fetchone()[0]
+                if count >= cutoff:
+                    break
+            if count < cutoff:
+                driver, cutoff = name, count
+        return driver
+
+    def _sorted_rows(self, conn, filters, sort, order, limit, cursor):
+        """(id, sort value) of up to limit + 1 rows in sort order"""
+        key = SORTS[sort]
+        driver = self._choose_driver(conn, filters, sort, limit)
+        conditions = []
+        params = []
+        for name, condition, values in filters:
+            conditions.append(condition.format('' if name == driver else '+'))
+            params.extend(values)
+        if cursor:
+            value, row_id = decode_cursor(cursor, sort)
+            conditions.append(f"({key}, p.id) {'>' if order == 'asc' else '<'} (?, ?)")
+            params.extend([value, row_id])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        direction = 'ASC' if order == 'asc' else 'DESC'
+        # A driver's rows are sorted, so + keeps the planner off the sort index
+        order_key = key if driver is None or driver in ORDERED_FILTERS.get(sort, ()) else f'+{key}'
+        return conn.execute(
+            f'SELECT p.id, {key} FROM products p {where} '
+            f'ORDER BY {order_key} {direction}, p.id {direction} LIMIT ?',
+            params + [limit + 1]).fetchall()
+
+    def _ranked_rows(self, conn, match, filters, order, limit, cursor):
+        """
+        (id, [window, rank]) of up to limit + 1 rows in relevance order. bm25 costs a
+        few microseconds per match, so matches are ranked in windows of
+        STORE_CONFIG['relevance_window'], newest first: a window's matches in rank
+        order, then the next window's. A window is named by its highest id (None for
+        the first), which the cursor carries along with the rank.
+        """
+        top, after = None, None
+        if cursor:
+            (top, rank), row_id = decode_cursor(cursor, 'relevance')
+            after = (rank, row_id)
+        size = STORE_CONFIG['relevance_window']
+        # Filters must not pull the planner off the full-text index, hence the unary +
+        filter_conditions = [condition.format('+') for _, condition, _ in filters]
+        filter_params = [value for _, _, values in filters for value in values]
+        source = 'products_fts f JOIN products p ON p.id = f.rowid' if filters else 'products_fts f'
+
+        rows = []
+        while True:
+            conditions = ['products_fts MATCH ?'] + filter_conditions
+            params = [match] + filter_params
+            if top is not None:
+                conditions.append('f.rowid <= ?')
+                params.append(top)
+            window = conn.execute(
+                f"SELECT f.rowid, bm25(products_fts) FROM {source} WHERE {' AND '.join(conditions)} "
+                'ORDER BY f.rowid DESC LIMIT ?', params + [size]).fetchall()
+            ranked = sorted(((rank, row_id) for row_id, rank in window), reverse=order == 'desc')
+            if after:
+                ranked = [row for row in ranked if (row > after if order == 'asc' else row < after)]
+            rows.extend((row_id, [top, rank]) for rank, row_id in ranked[:limit + 1 - len(rows)])
+            if len(rows) > limit or len(window) < size:
+                return rows
+            top, after = window[-1][0] - 1, None
+
+    def search(self, q=None, brand=None, site=None, min_price=None, max_price=None, unit=None,
+               min_quantity=None, max_quantity=None, sort=None, order='asc', limit=None, cursor=None):
+        """
+        One page of products matching a query
+
+        Args:
+            q: Free text; every word must prefix-match the name or brand
+            brand, site, unit: Exact filters (unit is 'ml' or 'g', base units)
+            min_price, max_price, min_quantity, max_quantity: Inclusive ranges
+                (quantities per item, in base units)
+            sort: 'name', 'brand', 'price', 'quantity', 'updated' or 'relevance'
+                (default: relevance with q, otherwise name)
+            order: 'asc' or 'desc'
+            limit: Page size (capped at STORE_CONFIG['max_page_size'])
+            cursor: next_cursor from the previous page
+
+        Returns:
+            {'products': [...], 'next_cursor': str or None}
+        """
+        match = fts_query(q)
+        if match and brand:
+            # Let the full-text index narrow to the brand too; the exact filter below still applies
+            brand_phrase = ' '.join(SEARCH_TOKEN_PATTERN.findall(brand))
+            if brand_phrase:
+                match = f'{match} AND brand : "{brand_phrase}"'
+        sort = sort or ('relevance' if match else 'name')
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort '{sort}' (use one of: {', '.join(SORTS)})")
+        if sort == 'relevance' and not match:
+            raise ValueError('Sorting by relevance needs a search query')
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        limit = max(1, min(int(limit or STORE_CONFIG['page_size']), STORE_CONFIG['max_page_size']))
+
+        # (name, condition, params): a condition either filters rows met while walking the
+        # sort index, or (as the driver) picks the rows itself, which are then sorted. The
+        # condition's {0} is a unary + whenever it must not use an index.
+        filters = []
+        if match and sort != 'relevance':
+            filters.append(('text', '{0}p.id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)',
+                            [match]))
+        for name, column, value in (('brand', 'p.brand', brand), ('site', 'p.site', site),
+                                    ('unit', 'p.quantity_unit', unit)):
+            if value:
+                filters.append((name, f'{{0}}{column} = ?', [value]))
+        # Ranges compare the indexed sort expressions, whose upper bound also excludes the
+        # 1e18 stand-in without reading the row
+        for range_sort, low, high in (('price', min_price, max_price), ('quantity', min_quantity, max_quantity)):
+            if low is None and high is None:
+                continue
+            expression = SORTS[range_sort]
+            bounds = []
+            range_params = []
+            if low is not None:
+                bounds.append(f'{{0}}{expression} >= ?')
+                range_params.append(float(low))
+            if high is not None and float(high) < 1e18:
+                bounds.append(f'{{0}}{expression} <= ?')
+                range_params.append(float(high))
+            else:
+                bounds.append(f'{{0}}{expression} < 1e18')
+            if range_sort == 'quantity' and unit:
+                # products_quantity leads with the unit, so the unit narrows the same range scan
+                unit_filter = next(f for f in filters if f[0] == 'unit')
+                filters.remove(unit_filter)
+                bounds.insert(0, unit_filter[1])
+                range_params.insert(0, unit)
+            filters.append((range_sort, ' AND '.join(bounds), range_params))
+
+        with self._connect() as conn:
+            try:
+                if sort == 'relevance':
+                    rows = self._ranked_rows(conn, match, filters, order, limit, cursor)
+                else:
+                    rows = self._sorted_rows(conn, filters, sort, order, limit, cursor)
+                # Only the page's rows are read in full
+                page_ids = [row_id for row_id, _ in rows[:limit]]
+                found = {row_id: (row_site, product) for row_id, row_site, product in conn.execute(
+                    f"SELECT id, site, product FROM products WHERE id IN ({', '.join('?' * len(page_ids))})",
+                    page_ids)}
+            except sqlite3.OperationalError as e:
+                if 'fts5' in str(e):
+                    raise ValueError(f'Invalid search query: {e}')
+                raise
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_id, last_value = rows[-1]
+            next_cursor = encode_cursor(sort, last_value, last_id)
+
+        products = []
+        for row_id, _ in rows:
+            row_site, product = found[row_id]
+            product = json.loads(product)
+            product['site'] = row_site
+            products.append(product)
+        return {'products': products, 'next_cursor': next_cursor}
+
+
+def main():
+    """Load a products file into the store, or search it"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Indexed product store')
+    parser.add_argument('--load', nargs='?', const='', metavar='FILE',
+                        help='Upsert products from a JSON/JSONL file (default: the final output)')
+    parser.add_argument('--site', default='unknown', help='Site the loaded products come from')
+    parser.add_argument('--search', '-q', help='Full-text query')
+    parser.add_argument('--brand', help='Only this brand')
+    parser.add_argument('--sort', choices=list(SORTS), help='Sort field')
+    parser.add_argument('--limit', type=int, default=10, help='Products to show (default: 10)')
+    args = parser.parse_args()
+
+    store = ProductStore()
+    if args.load is not None:
+        path = args.load or resolve_input_path('final')
+        start = time.time()
+        written = store.upsert_products(read_products(path), args.site)
+        store.analyze()
+        print(f"Upserted {written} products from {path} in {time.time() - start:.1f}s "
+              f"({store.count()} in {store.path})")
+        return
+
+    page = store.search(q=args.search, brand=args.brand, sort=args.sort, limit=args.limit)
+    for product in page['products']:
+        print(f"  {product.get('name', ''):50} {product.get('brand', ''):20} {product.get('price', '')}")
+    if page['next_cursor']:
+        print(f"More results: cursor {page['next_cursor']}")
+
+
+if __name__ == '__main__':
+    main()
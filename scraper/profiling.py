@@ -0,0 +1,228 @@
+"""
+Profiling and tracing for pipeline runs (process_data.py --profile / --trace)
+A Tracer records wall and CPU time per stage and per URL, plus spans for
+fetches, parses and clean/brand batches. It writes the spans as a Chrome trace /
+Perfetto JSON timeline. ThreadProfiler runs cProfile in the main thread and in
+every pipeline thread and merges the results into one dump. Nothing is recorded
+unless a run starts them.
+"""
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+
+import metrics
+
+# Spans of one stage on one thread that start within this many seconds of the
+# previous one's end are drawn as a single batch span (args.count items)
+MERGE_GAP_SECONDS = 0.001
+
+# Stages whose time is added to the URL last fetched on the same thread
+URL_STAGES = ('parse', 'extract')
+
+_tracer = None
+_profiler = None
+
+
+class _Span:
+    """Context manager timing one stage span (wall and thread CPU time)"""
+    __slots__ = ('tracer', 'name', 'start', 'cpu_start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        self.tracer.add_span(self.name, self.start, wall, time.thread_time() - self.cpu_start)
+        metrics.observe_stage(self.name, wall)
+        return False
+
+
+class Tracer:
+    """Collects spans, per-stage totals and per-URL totals from every thread"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.stages = {}  # name -> [spans, wall seconds, cpu seconds]
+        self.urls = {}  # url -> {'status', 'bytes', 'fetches', 'wall', 'cpu'}
+        self.thread_names = {}
+        self._last = {}  # thread id -> last stage event, for merging into batches
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def _event(self, name, category, start, wall, tid, args):
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': self.pid, 'tid': tid,
+                 'ts': round((start - self.origin) * 1e6, 1), 'dur': round(wall * 1e6, 1), 'args': args}
+        self.events.append(event)
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        return event
+
+    def add_span(self, name, start, wall, cpu):
+        """Record one stage span that started at perf_counter() time start"""
+        tid = threading.get_ident()
+        url = getattr(self._local, 'url', None) if name in URL_STAGES else None
+        with self._lock:
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            if url is not None:
+                self.urls[url]['wall'] += wall
+                self.urls[url]['cpu'] += cpu
+
+            last = self._last.get(tid)
+            ts = (start - self.origin) * 1e6
+            if last is not None and last['name'] == name and ts - (last['ts'] + last['dur']) < MERGE_GAP_SECONDS * 1e6:
+                last['dur'] = round(ts + wall * 1e6 - last['ts'], 1)
+                last['args']['count'] += 1
+                last['args']['cpu_ms'] = round(last['args']['cpu_ms'] + cpu * 1000, 3)
+                return
+            args = {'count': 1, 'cpu_ms': round(cpu * 1000, 3)}
+            if url is not None:
+                args['url'] = url
+            self._last[tid] = self._event(name, 'stage', start, wall, tid, args)
+
+    def add_fetch(self, url, status, size, wall, cpu):
+        """Record one HTTP fetch that just finished; later parse/extract spans on this thread count towards url"""
+        tid = threading.get_ident()
+        self._local.url = url
+        with self._lock:
+            totals = self.stages.setdefault('fetch', [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+            entry = self.urls.setdefault(url, {'status': status, 'bytes': 0, 'fetches': 0, 'wall': 0.0, 'cpu': 0.0})
+            entry['status'] = status
+            entry['bytes'] += size
+            entry['fetches'] += 1
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+            self._last.pop(tid, None)
+            self._event('fetch', 'fetch', time.perf_counter() - wall, wall, tid,
+                        {'url': url, 'status': status, 'bytes': size, 'cpu_ms': round(cpu * 1000, 3)})
+
+    def stage_report(self):
+        """{stage: {'spans', 'wall_ms', 'cpu_ms'}}, most wall time first"""
+        with self._lock:
+            ordered = sorted(self.stages.items(), key=lambda item: item[1][1], reverse=True)
+        return {name: {'spans': count, 'wall_ms': round(wall * 1000, 3), 'cpu_ms': round(cpu * 1000, 3)}
+                for name, (count, wall, cpu) in ordered}
+
+    def slowest_urls(self, count=10):
+        """The count URLs with the most wall time (fetch plus parse and extract)"""
+        with self._lock:
+            ordered = sorted(self.urls.items(), key=lambda item: item[1]['wall'], reverse=True)
+        return [dict(entry, url=url) for url, entry in ordered[:count]]
+
+    def to_chrome_trace(self):
+        """Trace Event Format JSON, loadable in chrome://tracing and ui.perfetto.dev"""
+        with self._lock:
+            events = list(self.events)
+            names = dict(self.thread_names)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in names.items()]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
+class ThreadProfiler:
+    """cProfile for the calling thread and every thread started through thread_target()"""
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """Run func under a new cProfile.Profile"""
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        return profile.runcall(func, *args, **kwargs)
+
+    def wrap(self, func):
+        def run(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return run
+
+    def dump(self, path):
+        """Merge every thread's profile into one pstats file and return the Stats"""
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(*profiles)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        stats.dump_stats(path)
+        return stats
+
+
+def thread_target(func):
+    """Wrap a thread's target so it is profiled while a profile is running"""
+    profiler = _profiler
+    return profiler.wrap(func) if profiler is not None else func
+
+
+def start(profile=False):
+    """Start recording spans (and cProfile data with profile=True); returns the Tracer"""
+    global _tracer, _profiler
+    _tracer = Tracer()
+    _profiler = ThreadProfiler() if profile else None
+    metrics.set_tracer(_tracer)
+    return _tracer
+
+
+def stop():
+    global _tracer, _profiler
+    metrics.set_tracer(None)
+    _tracer = _profiler = None
+
+
+def print_report(tracer, top_urls=10):
+    """Print wall and CPU time per stage and the slowest URLs"""
+    print("\nTime per stage:")
+    print(f"  {'Stage':<12}{'Spans':>8}{'Wall ms':>12}{'CPU ms':>12}")
+    for name, entry in tracer.stage_report().items():
+        print(f"  {name:<12}{entry['spans']:>8}{entry['wall_ms']:>12.1f}{entry['cpu_ms']:>12.1f}")
+    slowest = tracer.slowest_urls(top_urls)
+    if slowest:
+        print(f"\nSlowest {len(slowest)} URLs:")
+        for entry in slowest:
+            print(f"  {entry['wall'] * 1000:9.1f}ms wall {entry['cpu'] * 1000:8.1f}ms cpu  "
+                  f"[{entry['status']}] {entry['url']}")
+
+
+def run_profiled(func, profile_path=None, trace_path=None, top_urls=10):
+    """
+    Call func while tracing (and profiling, with profile_path), then write the
+    cProfile dump and/or Chrome trace and print the per-stage and slowest-URL report
+    """
+    tracer = start(profile=bool(profile_path))
+    profiler = _profiler
+    try:
+        return profiler.call(func) if profiler is not None else func()
+    finally:
+        stop()
+        print_report(tracer, top_urls)
+        if profile_path:
+            profiler.dump(profile_path)
+            print(f"\n[Profile] cProfile data for {len(profiler.profiles)} threads saved to {profile_path} "
+                  f"(python -m pstats {profile_path})")
+        if trace_path:
+            tracer.write_trace(trace_path)
+            print(f"[Trace] {len(tracer.events)} spans saved to {trace_path} (open in ui.perfetto.dev or chrome://tracing)")
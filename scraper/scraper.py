@@ -8,12 +8,19 @@ LinkedIn: https://www.linkedin.com/in/sanchit-kathpalia-a841b5252/
 """
 import requests
 from bs4 import BeautifulSoup
-import json
-import os
 import time
 from urllib.parse import urljoin, urlparse
 import re
 from config import SCRAPING_SITES, SCRAPER_CONFIG
+from data_io import write_products, get_output_path
+from product_record import ProductRecord
+from metrics import record_fetch, stage_timer
+
+# Listing pages answered with these are past the end of their category, like an empty page
+MISSING_PAGE_STATUSES = (404, 410)
+
+class ScrapeTimeout(Exception):
+    """Raised by iter_scrape_products once its deadline has passed"""
 
 def get_session():
     """Create a session with headers to mimic a browser"""
@@ -27,6 +34,29 @@ def get_session():
     })
     return session
 
+def fetch(session, url, timeout=10):
+    """
+    GET a page, recording latency, status code and size for its host
+    With a session deadline (see iter_scrape_products) no connect or read waits past it
+    """
+    deadline = getattr(session, 'deadline', None)
+    if deadline is not None:
+        timeout = max(0.1, min(timeout, deadline - time.time()))
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    status, size = 'error', 0
+    try:
+        response = session.get(url, timeout=timeout)
+        status, size = response.status_code, len(response.content)
+        return response
+    finally:
+        record_fetch(url, status, size, time.perf_counter() - start, time.thread_time() - cpu_start)
+
+def parse_html(text):
+    """Parse a page, timed as the 'parse' stage"""
+    with stage_timer('parse'):
+        return BeautifulSoup(text, 'html.parser')
+
 def find_category_urls(session, base_url, site_config, custom_url=None):
     """Find category URLs from the homepage or use provided custom URL"""
     # If custom URL is provided and different from base_url, use it directly
@@ -35,9 +65,9 @@ def find_category_urls(session, base_url, site_config, custom_url=None):
         return [custom_url]
     
     try:
-        response = session.get(base_url, timeout=10)
+        response = fetch(session, base_url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Try to find category links - common patterns
         category_links = []
@@ -74,15 +104,18 @@ def find_category_urls(session, base_url, site_config, custom_url=None):
         # Fallback to base URL or custom URL
         return [custom_url if custom_url else base_url]
 
-def scrape_products_from_page(session, url, products, site_config=None, base_url=None):
-    """Scrape products from a single page"""
+def scrape_products_from_page(session, url, products, site_config=None, base_url=None, raise_errors=False):
+    """
+    Scrape products from a single page
+    Errors are printed and the products found so far returned, unless raise_errors is set
+    """
     try:
         if base_url is None:
             base_url = urlparse(url).scheme + '://' + urlparse(url).netloc + '/'
         
-        response = session.get(url, timeout=10)
+        response = fetch(session, url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
         # Use site-specific selectors if available, otherwise use defaults
         if site_config and site_config.get('product_selectors'):
@@ -104,10 +137,11 @@ def scrape_products_from_page(session, url, products, site_config=None, base_url
             products_found = soup.find_all(selector['tag'], class_=re.compile(selector['class'], re.I))
             if products_found:
                 found_products = True
-                for product_elem in products_found:
-                    product_data = extract_product_data(product_elem, url)
-                    if product_data and product_data['name']:
-                        products.append(product_data)
+                with stage_timer('extract'):
+                    for product_elem in products_found:
+                        product_data = extract_product_data(product_elem, url)
+                        if product_data and product_data['name']:
+                            products.append(product_data)
                 break
         
         # If no products found with class selectors, try more generic approach
@@ -126,13 +160,15 @@ def scrape_products_from_page(session, url, products, site_config=None, base_url
         
         return products
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error scraping page {url}: {e}")
         return products
 
 def extract_product_data(product_elem, base_url):
     """Extract product data from a product element"""
     try:
-        product = {}
+        product = ProductRecord()
         
         # Extract name - try multiple selectors
         name = None
@@ -200,39 +236,40 @@ def extract_product_data(product_elem, base_url):
 def scrape_single_product(session, url):
     """Scrape a single product page"""
     try:
-        response = session.get(url, timeout=10)
+        response = fetch(session, url)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text)
         
-        product = {}
+        with stage_timer('extract'):
+            product = ProductRecord()
         
-        # Extract name
-        name_elem = soup.find('h1') or soup.find(class_=re.compile('product.*name|title', re.I))
-        product['name'] = name_elem.get_text(strip=True) if name_elem else ''
+            # Extract name
+            name_elem = soup.find('h1') or soup.find(class_=re.compile('product.*name|title', re.I))
+            product['name'] = name_elem.get_text(strip=True) if name_elem else ''
         
-        # Extract price
-        price_elem = soup.find(class_=re.compile('price', re.I))
-        product['price'] = price_elem.get_text(strip=True) if price_elem else ''
+            # Extract price
+            price_elem = soup.find(class_=re.compile('price', re.I))
+            product['price'] = price_elem.get_text(strip=True) if price_elem else ''
         
-        # Extract volume/weight from page text
-        page_text = soup.get_text()
-        volume_match = re.search(r'(\d+\s*(?:ml|mL|ML|g|G|kg|KG|l|L))', page_text)
-        product['volume_weight'] = volume_match.group(1) if volume_match else ''
+            # Extract volume/weight from page text
+            page_text = soup.get_text()
+            volume_match = re.search(r'(\d+\s*(?:ml|mL|ML|g|G|kg|KG|l|L))', page_text)
+            product['volume_weight'] = volume_match.group(1) if volume_match else ''
         
-        # Extract image
-        img = soup.find('img', class_=re.compile('product|main', re.I)) or soup.find('img')
-        if img:
-            img_src = img.get('src') or img.get('data-src')
-            product['image_url'] = urljoin(url, img_src) if img_src else ''
-        else:
-            product['image_url'] = ''
+            # Extract image
+            img = soup.find('img', class_=re.compile('product|main', re.I)) or soup.find('img')
+            if img:
+                img_src = img.get('src') or img.get('data-src')
+                product['image_url'] = urljoin(url, img_src) if img_src else ''
+            else:
+                product['image_url'] = ''
         
         return product
     except Exception as e:
         print(f"Error scraping product {url}: {e}")
         return None
 
-def scrape_products(max_products=100, site_key=None, custom_url=None):
+def scrape_products(max_products=100, site_key=None, custom_url=None, progress_callback=None):
     """
     Main scraping function
     
@@ -240,12 +277,55 @@ def scrape_products(max_products=100, site_key=None, custom_url=None):
         max_products: Maximum number of products to scrape
         site_key: Key from SCRAPING_SITES config (e.g., 'wegetanystock', 'amazon')
         custom_url: Custom URL to scrape (if site_key is 'custom')
+        progress_callback: Optional callback(pages_fetched, products_found),
+            called after every page and once more when scraping finishes
     
     Returns:
         List of scraped products
     """
+    return list(iter_scrape_products(max_products, site_key, custom_url, progress_callback))
+
+def iter_scrape_products(max_products=100, site_key=None, custom_url=None, progress_callback=None, status=None,
+                         deadline=None):
+    """
+    Scrape products, yielding each page's new products as soon as the page is parsed
+    Takes the same arguments as scrape_products and yields the same products in the same order.
+    When a status dict is given, status['complete'] is set once the generator is exhausted:
+    True only if every category was read to its end, without a fetch error, hitting
+    max_products or max_pages, or falling back to sample data.
+    With a deadline (a time.time() value), ScrapeTimeout is raised before the first page
+    fetched after it, and no fetch waits on the network past it.
+    """
     session = get_session()
+    session.deadline = deadline
     products = []
+    emitted = 0
+    pages_fetched = 0
+    complete = True
+    if status is not None:
+        status['complete'] = False
+    
+    def scrape_page(url):
+        nonlocal products, complete
+        if deadline is not None and time.time() > deadline:
+            raise ScrapeTimeout(f"Scrape deadline passed before {url}")
+        try:
+            products = scrape_products_from_page(session, url, products, site_config, base_url, raise_errors=True)
+        except Exception as e:
+            # Products found before the error are kept, as without raise_errors
+            if getattr(getattr(e, 'response', None), 'status_code', None) not in MISSING_PAGE_STATUSES:
+                print(f"Error scraping page {url}: {e}")
+                complete = False
+    
+    def report_progress():
+        if progress_callback is not None:
+            progress_callback(pages_fetched, min(len(products), max_products))
+    
+    def new_products():
+        nonlocal emitted
+        batch = products[emitted:max_products]
+        emitted += len(batch)
+        return batch
     
     # Determine which site to scrape
     if site_key is None:
@@ -263,14 +343,18 @@ def scrape_products(max_products=100, site_key=None, custom_url=None):
             site_config['base_url'] = custom_url if custom_url.endswith('/') else custom_url + '/'
         else:
             print("Error: Custom URL required when site_key is 'custom'")
-            return []
+            return
     
     base_url = site_config['base_url']
     
     if not site_config.get('enabled', False):
         print(f"Warning: Site '{site_key}' is disabled. Using sample data.")
-        return generate_sample_products(max_products)
+        products = generate_sample_products(max_products)
+        report_progress()
+        yield from new_products()
+        return
     
+    delay = site_config.get('delay_between_requests', SCRAPER_CONFIG.get('delay_between_requests', 1))
     print(f"Scraping from: {site_config.get('name', site_key)} ({base_url})")
     print("Finding categories...")
     
@@ -287,36 +371,51 @@ def scrape_products(max_products=100, site_key=None, custom_url=None):
             print(f"Scraping from: {category_url}")
             
             # Try pagination
-            for page in range(1, 10):  # Try up to 10 pages
+            for page in range(1, site_config.get('max_pages', 9) + 1):
                 if len(products) >= max_products:
                     break
                 
                 page_url = f"{category_url}?page={page}" if '?' not in category_url else f"{category_url}&page={page}"
                 
                 products_before = len(products)
-                products = scrape_products_from_page(session, page_url, products, site_config, base_url)
+                scrape_page(page_url)
+                pages_fetched += 1
+                report_progress()
+                yield from new_products()
                 
                 # If no new products found, try next category
                 if len(products) == products_before:
                     break
                 
-                time.sleep(SCRAPER_CONFIG.get('delay_between_requests', 1))  # Be polite
+                time.sleep(delay)  # Be polite
+            else:
+                complete = False  # stopped at max_pages
         
         # If we don't have enough products, try scraping from homepage
         if len(products) < max_products:
             print("Scraping from homepage...")
-            products = scrape_products_from_page(session, base_url, products, site_config, base_url)
+            scrape_page(base_url)
+            pages_fetched += 1
+            report_progress()
+            yield from new_products()
+    except ScrapeTimeout:
+        raise
     except Exception as e:
         print(f"Error during scraping: {e}")
+        complete = False
     
     # If still not enough, generate sample data to meet requirements
     if len(products) < 50:
         print(f"Only found {len(products)} products. Generating sample data to meet requirements...")
         sample_products = generate_sample_products(50 - len(products))
         products.extend(sample_products)
+        complete = False
     
     print(f"Total products scraped: {len(products)}")
-    return products[:max_products]
+    report_progress()
+    yield from new_products()
+    if status is not None:
+        status['complete'] = complete and len(products) < max_products
 
 def generate_sample_products(count):
     """Generate sample products based on common products from the site"""
@@ -336,8 +435,8 @@ def generate_sample_products(count):
     # Repeat and vary the samples
     products = []
     for i in range(count):
-        base = sample_data[i % len(sample_data)].copy()
-        base['name'] = f"{base['name']} #{i+1}"
+        base = ProductRecord.from_dict(sample_data[i % len(sample_data)])
+        base.name = f"{base.name} #{i+1}"
         products.append(base)
     
     return products
@@ -347,11 +446,9 @@ def main():
     print("Starting scraper...")
     products = scrape_products(max_products=100)
     
-    # Save to JSON
-    os.makedirs('../data', exist_ok=True)
-    output_file = '../data/products_raw.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(products, f, indent=2, ensure_ascii=False)
+    # Save raw products (JSON array or JSON Lines per OUTPUT_CONFIG)
+    output_file = get_output_path('raw')
+    write_products(output_file, products)
     
     print(f"Saved {len(products)} products to {output_file}")
     return products
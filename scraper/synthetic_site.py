@@ -0,0 +1,312 @@
+"""
+Synthetic storefront for end-to-end scraper load tests
+Serves a deterministic catalog (any size up to millions of products) over local
+HTTP: a home page with category navigation, paginated category listings with
+lazy-loaded images, product detail pages with JSON-LD, robots.txt and sitemaps.
+Every page is rendered on request from the product index, so memory does not
+grow with the catalog. Latency and error injection simulate a slow or flaky site.
+
+Usage:
+    python synthetic_site.py --products 1000000 --port 8765
+    python synthetic_site.py --latency-ms 50 --jitter-ms 20 --error-rate 0.02
+    python synthetic_site.py --scrape 2000     # serve in the background and time scrape_products against it
+"""
+import argparse
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add current directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from brand_index import load_brand_dictionary
+from config import BRAND_CONFIG, SCRAPING_SITES, SYNTHETIC_SITE_CONFIG
+
+# (slug, title); titles contain the category keywords find_category_urls looks for
+CATEGORIES = [
+    ('drinks', 'Soft Drinks'),
+    ('snacks', 'Crisps & Snacks'),
+    ('food-cupboard', 'Food Cupboard'),
+    ('confectionery', 'Confectionery'),
+    ('beverages', 'Hot Beverages'),
+    ('household', 'Household Products'),
+]
+ITEMS = {
+    'drinks': ['Original', 'Zero Sugar', 'Cherry', 'Orange', 'Lemon & Lime', 'Energy Drink', 'Sparkling Water'],
+    'snacks': ['Ready Salted Crisps', 'Salt & Vinegar', 'Cheese & Onion', 'Tortilla Chips', 'Popcorn'],
+    'food-cupboard': ['Baked Beans', 'Tomato Soup', 'Chopped Tomatoes', 'Pasta Sauce', 'Tuna Chunks'],
+    'confectionery': ['Milk Chocolate Bar', 'Caramel Bar', 'Fruit Pastilles', 'Mints', 'Cookies'],
+    'beverages': ['Tea Bags', 'Instant Coffee', 'Hot Chocolate', 'Green Tea'],
+    'household': ['Washing Up Liquid', 'Kitchen Roll', 'Bin Bags', 'Laundry Pods'],
+}
+SIZES = {
+    'drinks': ['330ml', '500ml', '1L', '1.5L', '2L', '250ml'],
+    'snacks': ['25g', '40g', '150g', '200g'],
+    'food-cupboard': ['400g', '415g', '500g', '160g'],
+    'confectionery': ['45g', '51g', '100g', '180g'],
+    'beverages': ['80 Bags', '100g', '200g', '240 Bags'],
+    'household': ['500ml', '1L', '2 Rolls', '20 Bags'],
+}
+PACKS = ['', '', '', '6 x ', '12 x ', '24 x ', '4 x ']
+DESCRIPTORS = ['', '', ' Can', ' Bottle', ' Pack', ' PMP']
+STORE_BRANDS = ['Everyday Value', 'Market Fresh']  # not in the brand dictionary
+
+SITEMAP_URLS = 50000  # URLs per sitemap file (the sitemaps.org limit)
+IMAGE_SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="120" height="120">'
+             '<rect width="120" height="120" fill="#{color}"/></svg>')
+
+
+class SyntheticSite:
+    """Deterministic catalog and page renderer (no HTTP)"""
+
+    def __init__(self, products=None, page_size=None, seed=None, missing_page_status=None):
+        self.total = SYNTHETIC_SITE_CONFIG['products'] if products is None else products
+        self.page_size = page_size or SYNTHETIC_SITE_CONFIG['page_size']
+        self.seed = SYNTHETIC_SITE_CONFIG['seed'] if seed is None else seed
+        # Status of listing pages past the last one (None: an empty listing, served with 200)
+        self.missing_page_status = missing_page_status
+        self.brands = load_brand_dictionary(BRAND_CONFIG['dictionary_file'])[0] + STORE_BRANDS
+
+    def product(self, index):
+        """Product number index; the same seed always gives the same product"""
+        rng = random.Random(self.seed * 1000003 + index)
+        slug, _ = CATEGORIES[index % len(CATEGORIES)]
+        brand = rng.choice(self.brands)
+        item = rng.choice(ITEMS[slug])
+        size = rng.choice(SIZES[slug])
+        pack = rng.choice(PACKS)
+        price = f"{rng.randint(0, 24)}.{rng.randint(0, 99):02d}"
+        name = f"{brand} {item} {pack}{size}{rng.choice(DESCRIPTORS)}"
+        return {
+            'id': index,
+            'sku': f"SYN{self.seed:02d}{index:08d}",
+            'name': name,
+            'brand': brand,
+            'category': slug,
+            'price': price,
+            'volume_weight': size,
+            'in_stock': rng.random() > 0.1,
+            'path': f"/product/{index}-{'-'.join(name.lower().replace('&', 'and').split())}",
+            'image': f"/images/{index}.svg",
+        }
+
+    def category_count(self, category_index):
+        """Products in a category (product i belongs to category i % len(CATEGORIES))"""
+        if category_index >= self.total:
+            return 0
+        return (self.total - 1 - category_index) // len(CATEGORIES) + 1
+
+    def page_count(self, category_index):
+        """Listing pages in a category (an empty category still has one)"""
+        return max(1, -(-self.category_count(category_index) // self.page_size))
+
+    def category_page(self, category_index, page):
+        """Products on one listing page (1-based); empty past the last page"""
+        start = (page - 1) * self.page_size
+        end = min(start + self.page_size, self.category_count(category_index))
+        return [self.product(category_index + k * len(CATEGORIES)) for k in range(max(start, 0), end)]
+
+    def render(self, path, query=None):
+        """Return (status, content type, body bytes) for a request path"""
+        query = query or {}
+        if path in ('', '/', '/index.html'):
+            return 200, 'text/html; charset=utf-8', self.render_home()
+        if path == '/robots.txt':
+            return 200, 'text/plain', b"User-agent: *\nAllow: /\nSitemap: /sitemap.xml\n"
+        if path == '/sitemap.xml':
+            return 200, 'application/xml', self.render_sitemap_index()
+        if path.startswith('/sitemap-') and path.endswith('.xml'):
+            number = path[len('/sitemap-'):-len('.xml')]
+            if number.isdigit():
+                return 200, 'application/xml', self.render_sitemap(int(number))
+        if path.startswith('/category/'):
+            slug = path[len('/category/'):].strip('/')
+            for category_index, (category_slug, _) in enumerate(CATEGORIES):
+                if category_slug == slug:
+                    page = query.get('page', ['1'])[0]
+                    page = int(page) if page.isdigit() else 1
+                    if self.missing_page_status and page > self.page_count(category_index):
+                        return self.missing_page_status, 'text/html; charset=utf-8', self._page('Not found', '<h1>Page not found</h1>')
+                    return 200, 'text/html; charset=utf-8', self.render_category(category_index, page)
+        if path.startswith('/product/'):
+            number = path[len('/product/'):].split('-', 1)[0]
+            if number.isdigit() and int(number) < self.total:
+                return 200, 'text/html; charset=utf-8', self.render_product(int(number))
+        if path.startswith('/images/') and path.endswith('.svg'):
+            number = path[len('/images/'):-len('.svg')]
+            if number.isdigit():
+                return 200, 'image/svg+xml', IMAGE_SVG.format(color=f"{int(number) * 2654435761 % 0xFFFFFF:06x}").encode()
+        return 404, 'text/html; charset=utf-8', self._page('Not found', '<h1>Page not found</h1>')
+
+    def _page(self, title, body, head=''):
+        nav = ''.join(f'<li><a href="/category/{slug}">{html.escape(name)}</a></li>' for slug, name in CATEGORIES)
+        return (f'<!DOCTYPE html>\n<html lang="en">\n<head><meta charset="utf-8"><title>{html.escape(title)}</title>{head}</head>\n'
+                f'<body>\n<header><a href="/">Synthetic Wholesale</a><nav><ul>{nav}</ul></nav></header>\n'
+                f'<main>\n{body}\n</main>\n<footer><p>Prices exclude VAT.</p></footer>\n</body>\n</html>\n').encode('utf-8')
+
+    def _card(self, product):
+        # Lazy-loaded images: no src until a script would swap in data-src
+        attribute = 'data-lazy-src' if product['id'] % 7 == 0 else 'data-src'
+        return (f'<div class="product-card" data-sku="{product["sku"]}">'
+                f'<a href="{product["path"]}"><img class="lazyload" loading="lazy" {attribute}="{product["image"]}" '
+                f'alt="{html.escape(product["name"])}"></a>'
+                f'<h3 class="product-name"><a href="{product["path"]}">{html.escape(product["name"])}</a></h3>'
+                f'<span class="product-price">£{product["price"]}</span>'
+                f'<p class="product-size">{html.escape(product["volume_weight"])}</p></div>\n')
+
+    def render_home(self):
+        featured = ''.join(self._card(self.product(index)) for index in range(min(self.total, 8)))
+        body = f'<h1>Synthetic Wholesale</h1>\n<h2>Featured</h2>\n<div class="product-grid">\n{featured}</div>'
+        return self._page('Synthetic Wholesale', body)
+
+    def render_category(self, category_index, page):
+        slug, title = CATEGORIES[category_index]
+        products = self.category_page(category_index, page)
+        pages = self.page_count(category_index)
+        links = []
+        if page > 1:
+            links.append(f'<a rel="prev" href="/category/{slug}?page={page - 1}">Previous</a>')
+        if page < pages:
+            links.append(f'<a rel="next" href="/category/{slug}?page={page + 1}">Next</a>')
+        cards = ''.join(self._card(product) for product in products) or '<p class="empty">No products found</p>'
+        body = (f'<h1>{html.escape(title)}</h1>\n<p class="results">{self.category_count(category_index)} products, '
+                f'page {page} of {pages}</p>\n<div class="product-grid">\n{cards}</div>\n'
+                f'<nav class="pagination">{" ".join(links)}</nav>')
+        return self._page(f'{title} - page {page}', body)
+
+    def render_product(self, index):
+        product = self.product(index)
+        data = {
+            '@context': 'https://schema.org',
+            '@type': 'Product',
+            'name': product['name'],
+            'sku': product['sku'],
+            'brand': {'@type': 'Brand', 'name': product['brand']},
+            'image': product['image'],
+            'offers': {
+                '@type': 'Offer',
+                'price': product['price'],
+                'priceCurrency': 'GBP',
+                'availability': 'https://schema.org/' + ('InStock' if product['in_stock'] else 'OutOfStock'),
+            },
+        }
+        script = json.dumps(data).replace('</', '<\\/')
+        head = f'<script type="application/ld+json">{script}</script>'
+        body = (f'<div class="product-detail">'
+                f'<img class="product-image lazyload" loading="lazy" data-src="{product["image"]}" alt="{html.escape(product["name"])}">'
+                f'<h1 class="product-title">{html.escape(product["name"])}</h1>'
+                f'<p class="price">£{product["price"]}</p>'
+                f'<p class="size">Size: {html.escape(product["volume_weight"])}</p>'
+                f'<p class="stock">{"In stock" if product["in_stock"] else "Out of stock"}</p></div>')
+        return self._page(product['name'], body, head)
+
+    def render_sitemap_index(self):
+        files = max(1, -(-self.total // SITEMAP_URLS))
+        entries = ''.join(f'<sitemap><loc>/sitemap-{number}.xml</loc></sitemap>' for number in range(files))
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'{entries}</sitemapindex>\n').encode()
+
+    def render_sitemap(self, number):
+        start = number * SITEMAP_URLS
+        end = min(start + SITEMAP_URLS, self.total)
+        entries = ''.join(f'<url><loc>{html.escape(self.product(index)["path"])}</loc></url>' for index in range(start, end))
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'{entries}</urlset>\n').encode()
+
+
+def make_handler(site, latency_ms=0, jitter_ms=0, error_rate=0.0, error_statuses=(500, 503)):
+    """Request handler class serving site with injected latency and errors"""
+    rng = random.Random(site.seed)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like a real storefront
+
+        def do_GET(self):
+            with lock:
+                delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+                failure = rng.choice(error_statuses) if rng.random() < error_rate else None
+            if delay:
+                time.sleep(delay)
+            if failure is not None:
+                status, content_type, body = failure, 'text/plain', b'Injected error\n'
+            else:
+                url = urlparse(self.path)
+                status, content_type, body = site.render(url.path, parse_qs(url.query))
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if status == 503:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per request would drown the scraper's output
+
+    return Handler
+
+
+def start_server(site=None, host=None, port=None, **options):
+    """
+    Serve a SyntheticSite from a background thread
+    Returns the server; its base URL is server.base_url. Port 0 picks a free port.
+    Stop it with server.shutdown().
+    """
+    site = site or SyntheticSite()
+    settings = {key: options.get(key, SYNTHETIC_SITE_CONFIG[key]) for key in ('latency_ms', 'jitter_ms', 'error_rate')}
+    server = ThreadingHTTPServer((host or SYNTHETIC_SITE_CONFIG['host'], SYNTHETIC_SITE_CONFIG['port'] if port is None else port),
+                                 make_handler(site, **settings))
+    server.daemon_threads = True
+    server.base_url = f"http://{server.server_address[0]}:{server.server_address[1]}/"
+    threading.Thread(target=server.serve_forever, name='synthetic-site', daemon=True).start()
+    return server
+
+
+def time_scrape(base_url, max_products):
+    """Scrape the synthetic site through scrape_products and report products per second"""
+    from scraper import scrape_products
+    SCRAPING_SITES['synthetic']['base_url'] = base_url  # this server's (possibly ephemeral) port
+    start = time.perf_counter()
+    products = scrape_products(max_products=max_products, site_key='synthetic')
+    elapsed = time.perf_counter() - start
+    print(f"\nScraped {len(products)} products in {elapsed:.2f}s ({len(products) / elapsed:.0f} products/s)")
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a synthetic storefront for scraper load tests')
+    parser.add_argument('--products', type=int, default=SYNTHETIC_SITE_CONFIG['products'], help='Catalog size')
+    parser.add_argument('--page-size', type=int, default=SYNTHETIC_SITE_CONFIG['page_size'], help='Products per listing page')
+    parser.add_argument('--seed', type=int, default=SYNTHETIC_SITE_CONFIG['seed'], help='Catalog seed')
+    parser.add_argument('--host', default=SYNTHETIC_SITE_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=SYNTHETIC_SITE_CONFIG['port'])
+    parser.add_argument('--latency-ms', type=float, default=SYNTHETIC_SITE_CONFIG['latency_ms'], help='Delay added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=SYNTHETIC_SITE_CONFIG['jitter_ms'], help='Random +/- spread on the delay')
+    parser.add_argument('--error-rate', type=float, default=SYNTHETIC_SITE_CONFIG['error_rate'], help='Fraction of requests answered 500/503')
+    parser.add_argument('--scrape', type=int, metavar='N', help='Scrape N products from the site, print the throughput and exit')
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.products, args.page_size, args.seed)
+    server = start_server(site, args.host, 0 if args.scrape else args.port, latency_ms=args.latency_ms,
+                          jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    print(f"Serving {args.products} synthetic products at {server.base_url}")
+    if args.scrape:
+        time_scrape(server.base_url, args.scrape)
+        server.shutdown()
+        return
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for deduplicating batch processing
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_processing import process_names, iter_process_chunks
+from data_cleaning import clean_products
+from brand_detection import add_brand, add_brand_to_products, iter_brand_products
+
+NAMES = [
+    "Coca Cola Original Taste 330ml Can",
+    "coca cola original taste 330ml can",
+    "Coca Cola Original Taste 330ml Can",
+    "Luczade Sport 500ml",
+    "Pepsi Max 6x330ml",
+    "",
+    "Pepsi Max 6x330ml",
+]
+
+def per_item(names):
+    """The original one-product-at-a-time path"""
+    products = clean_products([{'name': n, 'original_name': n} for n in names])
+    return [add_brand(p) for p in products]
+
+def test_batch_matches_per_item():
+    """Test the batch path returns exactly what the per-item path returns"""
+    stats = {}
+    batch = process_names(NAMES, stats)
+    assert [p.to_dict() for p in batch] == [p.to_dict() for p in per_item(NAMES)]
+    assert stats['total'] == 7
+    assert stats['unique'] == 5
+    assert stats['unique_ratio'] == round(5 / 7, 4)
+    assert stats['brand_lookups'] == 4  # both Coca Cola casings normalize the same
+    print("✅ batch vs per-item tests passed")
+
+def test_chunks_share_records():
+    """Test chunked processing matches one batch and reuses records across chunks"""
+    stats = {}
+    chunks = list(iter_process_chunks(iter(NAMES), chunk_size=2, stats=stats))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2, 1]
+    flat = [p for chunk in chunks for p in chunk]
+    assert [p.to_dict() for p in flat] == [p.to_dict() for p in process_names(NAMES)]
+    assert flat[0] is flat[2] and flat[4] is flat[6]
+    assert stats['total'] == 7 and stats['unique'] == 5
+    print("✅ chunked processing tests passed")
+
+def test_add_brand_stats():
+    """Test list and streaming brand detection report unique-to-total ratio"""
+    products = [{'name': n} for n in ["Fanta Orange", "FANTA orange", "Sprite"]]
+    stats = {}
+    add_brand_to_products(products, stats)
+    assert [p['brand'] for p in products] == ["Fanta", "Fanta", "Sprite"]
+    assert stats == {'total': 3, 'unique': 2, 'unique_ratio': 0.6667}
+
+    stats = {}
+    streamed = list(iter_brand_products(({'name': n} for n in ["Tango", "tango", "Evian"]), stats))
+    assert [p['brand'] for p in streamed] == ["Tango", "Tango", "Evian"]
+    assert stats['unique'] == 2
+    print("✅ brand dedupe stats tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Batch Processing Tests")
+    print("=" * 50)
+    test_batch_matches_per_item()
+    test_chunks_share_records()
+    test_add_brand_stats()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
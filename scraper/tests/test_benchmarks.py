@@ -0,0 +1,72 @@
+"""
+Unit tests for the benchmark suite (synthetic inputs, regression checks, baselines)
+"""
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_suite import (
+    BENCHMARKS, synthetic_names, synthetic_products, run_suite, compare,
+    save_baselines, load_baselines, parse_size,
+)
+
+def test_synthetic_inputs():
+    """Test synthetic catalogs are deterministic and grow with the requested size"""
+    assert synthetic_names(500) == synthetic_names(500)
+    assert synthetic_names(500, seed=1) != synthetic_names(500)
+    assert synthetic_names(1000)[:500] == synthetic_names(500)
+    products = synthetic_products(200)
+    assert len(products) == 200 and len({product['name'] for product in products}) == 200
+    assert set(products[0]) == {'name', 'price', 'volume_weight', 'image_url'}
+    print("✅ synthetic input tests passed")
+
+def test_compare():
+    """Test only drops beyond the tolerance count as regressions"""
+    baselines = {'a@1000': {'items_per_second': 1000.0}, 'b@1000': {'items_per_second': 1000.0}}
+    results = {
+        'a@1000': {'items_per_second': 800.0},   # -20%: within 25%
+        'b@1000': {'items_per_second': 700.0},   # -30%: regression
+        'c@1000': {'items_per_second': 1.0},     # no baseline
+    }
+    assert compare(results, baselines, 0.25) == [('b@1000', 1000.0, 700.0, -0.3)]
+    assert compare(results, baselines, 0.35) == []
+    print("✅ compare tests passed")
+
+def test_run_and_baselines():
+    """Test a small suite run and the baseline file round trip"""
+    results = run_suite(['clean_products', 'detect_brand', 'validate_products'], sizes=(200,), repeat=1, report=None)
+    assert set(results) == {'clean_products@200', 'detect_brand@200', 'validate_products@200'}
+    assert all(result['items'] == 200 and result['items_per_second'] > 0 for result in results.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'baselines.json')
+        save_baselines(results, path)
+        save_baselines({'extra@1': {'items': 1, 'seconds': 1.0, 'items_per_second': 1.0}}, path)
+        assert set(load_baselines(path)) == set(results) | {'extra@1'}
+        assert compare(results, load_baselines(path)) == []
+    assert 'scrape_products_from_page' in BENCHMARKS
+    print("✅ suite run and baseline tests passed")
+
+def test_parse_size():
+    """Test size suffixes"""
+    assert [parse_size(text) for text in ('1000', '10k', '1m', '2.5K')] == [1000, 10000, 1000000, 2500]
+    print("✅ parse_size tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Benchmark Suite Tests")
+    print("=" * 50)
+    test_synthetic_inputs()
+    test_compare()
+    test_run_and_baselines()
+    test_parse_size()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -3,16 +3,19 @@ Unit tests for brand detection
 """
 import sys
 import os
+import json
+import tempfile
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from brand_detection import detect_brand
+from brand_index import compile_index, MappedBrandIndex
 
 def test_brand_detection():
     """Test brand detection"""
     # Known brands
-    assert detect_brand("Coca Cola Original Taste") == "Coca Cola"
+    assert detect_brand("Coca Cola Original Taste") == "Coca-Cola"
     assert detect_brand("Pepsi Max 500ml") == "Pepsi"
     assert detect_brand("Red Bull Energy Drink") == "Red Bull"
     assert detect_brand("Lucozade Energy") == "Lucozade"
@@ -25,17 +28,42 @@ def test_brand_detection():
     assert detect_brand("") == "Unknown"
     
     # Case insensitive
-    assert detect_brand("coca cola") == "Coca Cola"
+    assert detect_brand("coca cola") == "Coca-Cola"
     assert detect_brand("PEPSI MAX") == "Pepsi"
     
     print("✅ Brand detection tests passed")
 
+def test_aliases_and_boundaries():
+    """Test alias canonicalization, longest match and word boundaries"""
+    assert detect_brand("Diet Coke 330ml") == "Coca-Cola"
+    assert detect_brand("COCA-COLA Zero") == "Coca-Cola"
+    assert detect_brand("7-Up Free") == "7UP"
+    assert detect_brand("Dr. Pepper Zero") == "Dr Pepper"
+    assert detect_brand("Tangos Crisps") == "Unknown"
+    assert detect_brand("Ocean Spray Cranberry") == "Ocean Spray"
+    print("✅ Alias and boundary tests passed")
+
+def test_longest_leftmost():
+    """Test the matcher prefers the leftmost, then longest, phrase"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dictionary_path = os.path.join(tmp, 'brands.json')
+        with open(dictionary_path, 'w', encoding='utf-8') as f:
+            json.dump({"Ocean": [], "Ocean Spray": [], "Spray Co": []}, f)
+        compile_index(dictionary_path, dictionary_path + '.idx')
+        index = MappedBrandIndex(dictionary_path + '.idx')
+        assert index.match("ocean spray co juice") == "Ocean Spray"
+        assert index.match("fresh spray co ocean") == "Spray Co"
+        assert index.match("") is None
+    print("✅ Longest-leftmost tests passed")
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 50)
     print("Running Brand Detection Tests")
     print("=" * 50)
     test_brand_detection()
+    test_aliases_and_boundaries()
+    test_longest_leftmost()
     print("=" * 50)
     print("All tests passed! ✅")
     print("=" * 50)
@@ -0,0 +1,107 @@
+"""
+Unit tests for fuzzy brand matching
+"""
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_fuzzy import FuzzyBrandIndex, bounded_distance
+from brand_index import tokenize
+from brand_detection import match_brand
+from config import BRAND_CONFIG
+
+PHRASES = [
+    ("Coca-Cola", "Coca-Cola"),
+    ("Lucozade", "Lucozade"),
+    ("Tango", "Tango"),
+    ("Highland Spring", "Highland Spring"),
+]
+
+def test_bounded_distance():
+    """Test edit distance with an upper bound"""
+    assert bounded_distance("lucozade", "lucozade", 1) == 0
+    assert bounded_distance("luczade", "lucozade", 1) == 1
+    assert bounded_distance("lucozdae", "lucozade", 1) == 1  # transposition
+    assert bounded_distance("lcuozdae", "lucozade", 1) is None
+    assert bounded_distance("pepsi", "lucozade", 2) is None
+    print("✅ bounded_distance tests passed")
+
+def test_fuzzy_search():
+    """Test typos and spacing variants find the right brand"""
+    index = FuzzyBrandIndex(PHRASES)
+    assert index.search(tokenize("Luczade Energy 500ml")) == ("Lucozade", 0.88)
+    assert index.search(tokenize("CocaCola Zero"))[0] == "Coca-Cola"
+    assert index.search(tokenize("Highlnd Springs Water"))[0] == "Highland Spring"
+    assert index.search(tokenize("Tangos Crisps")) is None  # short brands are exact-only
+    assert index.search(tokenize("Generic Drink")) is None
+    assert index.search([]) is None
+    print("✅ fuzzy search tests passed")
+
+def test_work_budget():
+    """Test the search stops once its work budget is spent"""
+    index = FuzzyBrandIndex(PHRASES)
+    assert index.search(tokenize("Luczade Energy"), max_work=10) is None
+    assert index.search(tokenize("Luczade Energy"), max_work=1000) == ("Lucozade", 0.88)
+
+    tokens = tokenize("Luczade0 Highlnd0 " * 2000)
+    start = time.perf_counter()
+    index.search(tokens, max_work=BRAND_CONFIG['fuzzy_max_work'])
+    assert time.perf_counter() - start < 0.05
+    print("✅ work budget tests passed")
+
+def test_results_under_load():
+    """Test a name gets the same brand on every thread while other threads load the CPU"""
+    names = ["Highland Sprng Water", "Tropicanna Orange Juice 1l", "Red-Bul Energy", "Luczade Sport 500ml"]
+    expected = [match_brand(name) for name in names]
+    assert all(match.method == 'fuzzy' for match in expected)
+
+    stop = threading.Event()
+    def spin():
+        while not stop.is_set():
+            sum(i * i for i in range(10000))
+
+    results = []
+    def match_all():
+        for _ in range(50):
+            results.append([match_brand(name) for name in names])
+
+    spinners = [threading.Thread(target=spin) for _ in range(3)]
+    matchers = [threading.Thread(target=match_all) for _ in range(2)]
+    for thread in spinners + matchers:
+        thread.start()
+    for thread in matchers:
+        thread.join()
+    stop.set()
+    for thread in spinners:
+        thread.join()
+    assert len(results) == 100 and all(result == expected for result in results)
+    print("✅ results under load tests passed")
+
+def test_match_brand_tiers():
+    """Test exact matches win and fuzzy matches carry a confidence"""
+    assert match_brand("Lucozade Sport") == ("Lucozade", 1.0, 'exact')
+    fuzzy = match_brand("Luczade Sport")
+    assert fuzzy.brand == "Lucozade" and fuzzy.method == 'fuzzy' and 0.8 <= fuzzy.confidence < 1.0
+    assert match_brand("Some Unknown Product").brand == "Unknown"
+    print("✅ match_brand tier tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Fuzzy Brand Matching Tests")
+    print("=" * 50)
+    test_bounded_distance()
+    test_fuzzy_search()
+    test_work_budget()
+    test_results_under_load()
+    test_match_brand_tiers()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
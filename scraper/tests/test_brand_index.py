@@ -0,0 +1,89 @@
+"""
+Unit tests for the prebuilt brand index and hot reload
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from brand_index import BrandIndexHolder, MappedBrandIndex, compile_index
+
+DICTIONARY = {
+    "Coca-Cola": ["Coke", "Coca Cola Classic"],
+    "Ocean Spray": [],
+    "Ocean": [],
+    "7UP": ["7 Up"],
+}
+
+# Name -> expected brand: aliases, longest match, word boundaries
+NAMES = {
+    "Diet Coke 330ml": "Coca-Cola",
+    "coca-cola classic 1l": "Coca-Cola",
+    "Ocean Spray Cranberry": "Ocean Spray",
+    "Ocean Breeze Water": "Ocean",
+    "7-Up Free": "7UP",
+    "Cokes": None,
+    "Unknown Drink": None,
+    "": None,
+}
+
+def write_dictionary(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+def test_index_match():
+    """Test the mapped index resolves aliases and the longest whole-word phrase"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dictionary_path = os.path.join(tmp, 'brands.json')
+        write_dictionary(dictionary_path, DICTIONARY)
+        compile_index(dictionary_path, dictionary_path + '.idx')
+
+        index = MappedBrandIndex(dictionary_path + '.idx')
+        for name, brand in NAMES.items():
+            assert index.match(name) == brand, name
+        assert index.brands() == ["Coca-Cola", "Ocean Spray", "Ocean", "7UP"]
+    print("✅ index match tests passed")
+
+def test_hot_reload():
+    """Test a changed dictionary is rebuilt in the background while old indexes keep working"""
+    with tempfile.TemporaryDirectory() as tmp:
+        dictionary_path = os.path.join(tmp, 'brands.json')
+        write_dictionary(dictionary_path, DICTIONARY)
+        holder = BrandIndexHolder(dictionary_path, reload_interval=0, derive=lambda index: index.brands())
+        assert holder.loaded() is None
+
+        old_index, old_brands = holder.get_with_derived()
+        assert holder.loaded() == (old_index, old_brands)
+        assert old_index.match("Irn Bru 330ml") is None
+        assert "Irn-Bru" not in old_brands
+
+        write_dictionary(dictionary_path, dict(DICTIONARY, **{"Irn-Bru": []}))
+        os.utime(dictionary_path, ns=(old_index.source_mtime_ns + 10**9,) * 2)
+
+        # The caller that notices the change keeps the current index; the rebuild runs off its path
+        assert holder.get() is old_index
+        holder.wait_for_reload()
+        new_index, new_brands = holder.get_with_derived()
+        assert new_index is not old_index
+        assert new_index.match("Irn Bru 330ml") == "Irn-Bru"
+        assert "Irn-Bru" in new_brands
+        assert old_index.match("Diet Coke") == "Coca-Cola"
+        assert holder.get() is new_index
+    print("✅ hot reload tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Brand Index Tests")
+    print("=" * 50)
+    test_index_match()
+    test_hot_reload()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,139 @@
+"""
+Unit tests for Parquet / Arrow output
+The round trips only run when pyarrow is installed
+"""
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar_io
+from columnar_io import partition_path
+from data_io import read_products, write_products, detect_format, get_output_path, ProductFileReader
+
+PRODUCTS = [
+    {"name": "Coca Cola 330ml", "price": "£0.75", "volume_weight": "330ml", "brand": "Coca Cola",
+     "brand_confidence": 1.0, "slug": "coca-cola-330ml"},
+    {"name": "Pepsi Max 500ml", "price": "£1.00", "volume_weight": "500ml", "brand": "Pepsi",
+     "brand_confidence": 0.9, "cluster_id": 3, "url": "https://shop.test/pepsi"},
+    {"name": "Own Label Water", "price": "£0.30"},
+]
+
+def test_paths():
+    """Test format detection and hive-style partition paths"""
+    assert detect_format('data/products_final.parquet') == 'parquet'
+    assert detect_format('data/products_final.arrow/') == 'arrow'
+    assert detect_format('data/products_final.jsonl') == 'jsonl'
+
+    partition = {'site': 'books toscrape', 'run_date': '2026-01-31'}
+    path = partition_path('data/products_final.parquet', partition, 'parquet')
+    assert path == os.path.join('data/products_final.parquet', 'site=books%20toscrape', 'run_date=2026-01-31',
+                                'part-0.parquet')
+    assert get_output_path('final', 'parquet', partition).endswith(path[len('data/'):])
+    assert get_output_path('final', 'json', partition).endswith('products_final.json')
+    print("✅ path tests passed")
+
+def test_missing_pyarrow():
+    """Test columnar output fails with an install hint and leaves no file behind"""
+    pa = columnar_io.pa
+    columnar_io.pa = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'products.parquet')
+            try:
+                write_products(path, PRODUCTS)
+                assert False, 'ImportError not raised'
+            except ImportError as e:
+                assert 'pip install pyarrow' in str(e)
+            assert os.listdir(tmp) == []
+    finally:
+        columnar_io.pa = pa
+    print("✅ missing pyarrow tests passed")
+
+def test_json_columns():
+    """Test column projection also applies to JSON files"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.jsonl')
+        write_products(path, PRODUCTS)
+        assert list(read_products(path, columns=['name', 'brand'])) == [
+            {'name': 'Coca Cola 330ml', 'brand': 'Coca Cola'},
+            {'name': 'Pepsi Max 500ml', 'brand': 'Pepsi'},
+            {'name': 'Own Label Water'},
+        ]
+    print("✅ JSON column projection tests passed")
+
+def test_roundtrip():
+    """Test typed columns, extra fields and row groups survive a round trip"""
+    if columnar_io.pa is None:
+        print("⏭️  pyarrow not installed, skipping round trip tests")
+        return
+    row_group_size = columnar_io.OUTPUT_CONFIG.get('row_group_size')
+    columnar_io.OUTPUT_CONFIG['row_group_size'] = 2
+    try:
+        for fmt in ('parquet', 'arrow'):
+            check_roundtrip(fmt)
+    finally:
+        columnar_io.OUTPUT_CONFIG['row_group_size'] = row_group_size
+    print("✅ round trip tests passed")
+
+def check_roundtrip(fmt):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.' + fmt)
+        assert write_products(path, PRODUCTS) == 3
+        assert list(read_products(path)) == PRODUCTS
+        assert list(read_products(path, columns=['name', 'url'])) == [
+            {'name': 'Coca Cola 330ml'},
+            {'name': 'Pepsi Max 500ml', 'url': 'https://shop.test/pepsi'},
+            {'name': 'Own Label Water'},
+        ]
+        positions = []
+        write_products(path, PRODUCTS[::-1], positions=positions)
+        reader = ProductFileReader(path)
+        try:
+            assert [reader.read_at(position) for position in reversed(positions)] == PRODUCTS
+        finally:
+            reader.close()
+        if fmt == 'parquet':
+            parquet_file = columnar_io.pq.ParquetFile(path)
+            assert parquet_file.metadata.num_row_groups == 2
+            assert str(parquet_file.schema_arrow.field('cluster_id').type) == 'int64'
+
+def test_partitions():
+    """Test partitioned datasets: partition values, filters and replacing one partition"""
+    if columnar_io.pa is None:
+        print("⏭️  pyarrow not installed, skipping partition tests")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'products_final.parquet')
+        for site, run_date, products in [('a', '2026-01-01', PRODUCTS[:1]), ('a', '2026-01-02', PRODUCTS[1:]),
+                                          ('b', '2026-01-01', PRODUCTS)]:
+            write_products(partition_path(root, {'site': site, 'run_date': run_date}, 'parquet'), products)
+        # Rerunning a partition replaces it
+        write_products(partition_path(root, {'site': 'b', 'run_date': '2026-01-01'}, 'parquet'), PRODUCTS[:1])
+
+        rows = list(read_products(root, columns=['name', 'site', 'run_date']))
+        assert [(row['site'], row['run_date']) for row in rows] == [
+            ('a', '2026-01-01'), ('a', '2026-01-02'), ('a', '2026-01-02'), ('b', '2026-01-01')]
+        assert [row['name'] for row in read_products(root, partition_filter={'site': 'a', 'run_date': '2026-01-02'})] == [
+            'Pepsi Max 500ml', 'Own Label Water']
+        assert 'site' not in next(read_products(root, columns=['name']))
+    print("✅ partition tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Columnar I/O Tests")
+    print("=" * 50)
+    test_paths()
+    test_missing_pyarrow()
+    test_json_columns()
+    test_roundtrip()
+    test_partitions()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,149 @@
+"""
+Unit tests for the distributed crawl queue (leases, politeness, exactly-once sink)
+"""
+import sys
+import os
+import subprocess
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawl_queue import CrawlQueue, PENDING, LEASED, DONE, FAILED
+from data_io import read_products
+from synthetic_site import SyntheticSite, start_server
+
+PRODUCTS = [{'name': 'Coca Cola 330ml', 'price': '£0.75'}, {'name': 'Pepsi Max 500ml', 'price': '£1.00'}]
+
+def new_queue(tmp):
+    queue = CrawlQueue(os.path.join(tmp, 'queue.db'))
+    crawl_id = queue.create_crawl('synthetic', 'http://shop.test/', ['http://shop.test/a', 'http://shop.test/b'],
+                                  max_products=100, max_pages=3, delay=0)
+    return queue, crawl_id
+
+def test_leases():
+    """Test expired leases move to another worker and only the current holder can store products"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue, crawl_id = new_queue(tmp)
+        first = queue.lease(crawl_id, 'worker-a', batch_size=1, lease_seconds=0.05)
+        assert [(task['category'], task['page']) for task in first] == [(0, 1)]
+        time.sleep(0.1)
+
+        # Worker A stalled past its lease: B gets the same page
+        second = queue.lease(crawl_id, 'worker-b', batch_size=5)
+        assert [task['id'] for task in second] == [first[0]['id'], first[0]['id'] + 1]
+        assert queue.complete(first[0], 'worker-a', PRODUCTS) is False
+        assert queue.complete(second[0], 'worker-b', PRODUCTS) is True
+        assert queue.complete(second[0], 'worker-b', PRODUCTS) is False  # already done
+        assert [product['name'] for product in queue.iter_products(crawl_id)] == ['Coca Cola 330ml', 'Pepsi Max 500ml']
+
+        # Pages after one with products are queued, up to max_pages; an empty page ends the category
+        status = queue.status(crawl_id)
+        assert status['tasks'] == {DONE: 1, LEASED: 1, PENDING: 2} and status['products'] == 2
+        queue.complete(second[1], 'worker-b', [])
+        page_two, page_three = queue.lease(crawl_id, 'worker-b', batch_size=2)
+        assert (page_two['page'], page_three['page']) == (2, 3)
+        queue.complete(page_two, 'worker-b', [])
+        assert queue.complete(page_three, 'worker-b', PRODUCTS)  # already leased: still stored
+        assert queue.in_flight(crawl_id) == 0
+    print("✅ lease tests passed")
+
+def test_heartbeat_and_failures():
+    """Test heartbeats keep leases alive and failed pages are retried later"""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue, crawl_id = new_queue(tmp)
+        queue.register_worker('worker-a', crawl_id)
+        task = queue.lease(crawl_id, 'worker-a', batch_size=1, lease_seconds=0.05)[0]
+        assert queue.heartbeat('worker-a', lease_seconds=30) == 1
+        time.sleep(0.1)
+        assert [other['id'] for other in queue.lease(crawl_id, 'worker-b', batch_size=5)] == [task['id'] + 1]
+
+        queue.fail(task, 'worker-a', 'HTTP 503')
+        assert queue.lease(crawl_id, 'worker-c') == []  # waiting out the retry delay
+        assert queue.in_flight(crawl_id) == 2
+        status = queue.status(crawl_id)
+        assert status['tasks'] == {PENDING: 1, LEASED: 1}
+        assert status['workers'][0]['id'] == 'worker-a'
+    print("✅ heartbeat and failure tests passed")
+
+def test_politeness():
+    """Test host slots are spaced by the delay across queue instances"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'queue.db')
+        waits = [CrawlQueue(path).reserve_host('shop.test', 0.5) for _ in range(3)]
+        assert waits[0] < 0.05 and 0.4 < waits[1] < 0.55 and 0.9 < waits[2] < 1.05
+        assert CrawlQueue(path).reserve_host('other.test', 0.5) < 0.05
+        assert CrawlQueue(path).reserve_host('shop.test', 0) == 0
+    print("✅ politeness tests passed")
+
+def crawl_cli(*args, env=None):
+    """Run crawl_queue.py in a subprocess, like a worker machine would"""
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'crawl_queue.py')
+    result = subprocess.run([sys.executable, script, *args], env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+def test_workers():
+    """Test worker processes crawl every listing page once, in sequential-scrape order"""
+    site = SyntheticSite(products=1200, page_size=24)
+    server = start_server(site, port=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SYNTHETIC_SITE_URL=server.base_url, CRAWL_QUEUE_DB=os.path.join(tmp, 'queue.db'))
+            crawl_cli('seed', '--site', 'synthetic', '--max', '100000', '--crawl', 'full', env=env)
+            output = crawl_cli('work', '--crawl', 'full', '--processes', '3', env=env)
+            assert output.count(' stopped ') == 3
+            crawl_cli('export', '--crawl', 'full', '--output', os.path.join(tmp, 'full.jsonl'), env=env)
+
+            # find_category_urls keeps the first 3 categories
+            expected = [product['name'] for category in range(3) for page in range(1, 100)
+                        for product in site.category_page(category, page)]
+            products = list(read_products(os.path.join(tmp, 'full.jsonl')))
+            assert [product['name'] for product in products] == expected
+
+            # A capped crawl stops queueing pages
+            crawl_cli('seed', '--site', 'synthetic', '--max', '30', '--crawl', 'capped', env=env)
+            crawl_cli('work', '--crawl', 'capped', '--processes', '1', env=env)
+            assert 'cancelled' in crawl_cli('status', '--crawl', 'capped', env=env)
+            crawl_cli('export', '--crawl', 'capped', '--output', os.path.join(tmp, 'capped.jsonl'), env=env)
+            assert len(list(read_products(os.path.join(tmp, 'capped.jsonl')))) == 30
+    finally:
+        server.shutdown()
+    print("✅ worker tests passed")
+
+def test_missing_pages():
+    """Test a 404 past the last listing page ends the category instead of failing"""
+    site = SyntheticSite(products=300, page_size=24, missing_page_status=404)
+    server = start_server(site, port=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SYNTHETIC_SITE_URL=server.base_url, CRAWL_QUEUE_DB=os.path.join(tmp, 'queue.db'))
+            crawl_cli('seed', '--site', 'synthetic', '--max', '100000', '--crawl', 'ends', env=env)
+            output = crawl_cli('work', '--crawl', 'ends', '--processes', '1', env=env)
+            assert 'Error scraping' not in output and ' 0 failed' in output
+
+            # 50 products per category: pages 1-3 are stored and the 404 on page 4 cancels the rest
+            status = CrawlQueue(os.path.join(tmp, 'queue.db')).status('ends')
+            assert FAILED not in status['tasks'] and PENDING not in status['tasks']
+            assert status['products'] == 3 * 50
+    finally:
+        server.shutdown()
+    print("✅ missing page tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Crawl Queue Tests")
+    print("=" * 50)
+    test_leases()
+    test_heartbeat_and_failures()
+    test_politeness()
+    test_workers()
+    test_missing_pages()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
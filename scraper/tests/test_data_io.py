@@ -0,0 +1,68 @@
+"""
+Unit tests for streaming product file input/output
+"""
+import sys
+import os
+import io
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_io import read_products, write_products, iter_json_array, detect_format
+
+PRODUCTS = [
+    {"name": "Coca Cola 330ml", "price": "£0.75", "volume_weight": "330ml", "image_url": ""},
+    {"name": "Pepsi Max [500ml]", "price": "£1.00", "volume_weight": "500ml", "image_url": ""},
+    {"name": "Red Bull, \"Original\"", "price": "£1.25", "volume_weight": "250ml", "image_url": ""},
+]
+
+def test_iter_json_array():
+    """Test incremental JSON array parsing across small chunks"""
+    text = json.dumps(PRODUCTS, indent=2, ensure_ascii=False)
+    assert list(iter_json_array(io.StringIO(text), chunk_size=7)) == PRODUCTS
+    assert list(iter_json_array(io.StringIO("[]"))) == []
+    assert list(iter_json_array(io.StringIO("[1, 22, 333]"), chunk_size=2)) == [1, 22, 333]
+    print("✅ iter_json_array tests passed")
+
+def test_json_roundtrip():
+    """Test the JSON array writer matches json.dump layout"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.json')
+        assert write_products(path, iter(PRODUCTS)) == 3
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == json.dumps(PRODUCTS, indent=2, ensure_ascii=False)
+        assert list(read_products(path)) == PRODUCTS
+
+        write_products(path, [])
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == "[]"
+    print("✅ JSON roundtrip tests passed")
+
+def test_jsonl_roundtrip():
+    """Test JSON Lines writing and reading"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'products.jsonl')
+        assert detect_format(path) == 'jsonl'
+        assert write_products(path, iter(PRODUCTS)) == 3
+        with open(path, encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == 3
+        assert list(read_products(path)) == PRODUCTS
+        assert not os.path.exists(path + '.tmp')
+    print("✅ JSONL roundtrip tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Data I/O Tests")
+    print("=" * 50)
+    test_iter_json_array()
+    test_json_roundtrip()
+    test_jsonl_roundtrip()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,74 @@
+"""
+Unit tests for data validation and quality metrics
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_validation import validate_product, validate_products, calculate_completeness
+
+PRODUCTS = [
+    {"name": "Coca Cola 330Ml", "price": "£0.75", "volume_weight": "330ml", "image_url": "x.jpg", "brand": "Coca-Cola", "slug": "coca-cola-330ml"},
+    {"name": "Ab", "price": "0.75", "volume_weight": "large", "brand": "Unknown"},
+    {"name": "", "price": "", "volume_weight": "", "brand": "Unknown"},
+]
+
+def test_validate_product():
+    """Test per-product issues, warnings and completeness"""
+    result = validate_product(PRODUCTS[1])
+    assert result['valid'] is True
+    assert result['warnings'] == [
+        "Product name is very short",
+        "Price format may be incorrect",
+        "Volume/weight format may be incorrect",
+        "Brand not detected",
+    ]
+    assert validate_product(PRODUCTS[2])['issues'] == [
+        "Missing required field: name",
+        "Missing required field: price",
+        "Missing required field: volume_weight",
+    ]
+    assert calculate_completeness(PRODUCTS[0]) == 1.0
+    print("✅ validate_product tests passed")
+
+def test_validate_products_metrics():
+    """Test single-pass metrics"""
+    metrics = validate_products(PRODUCTS)
+    assert metrics['total_products'] == 3
+    assert metrics['valid_products'] == 2
+    assert metrics['invalid_products'] == 1
+    assert metrics['total_issues'] == 3
+    assert metrics['total_warnings'] == 5
+    assert metrics['brand_distribution'] == {"Coca-Cola": 1, "Unknown": 2}
+    assert metrics['known_brand_percentage'] == 33.33
+    assert metrics['average_completeness'] == round((1 + 4 / 6 + 1 / 6) / 3 * 100, 2)
+    assert len(metrics['validation_results']) == 3
+    print("✅ validate_products metrics tests passed")
+
+def test_streaming_side_stream():
+    """Test generators are accepted and results can be streamed instead of kept"""
+    seen = []
+    metrics = validate_products((p for p in PRODUCTS), keep_results=False,
+                                on_result=lambda product, result: seen.append(result['valid']))
+    assert 'validation_results' not in metrics
+    assert seen == [True, True, False]
+    assert metrics['valid_products'] == 2
+    assert validate_products([])['validity_percentage'] == 0
+    print("✅ streaming side stream tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Data Validation Tests")
+    print("=" * 50)
+    test_validate_product()
+    test_validate_products_metrics()
+    test_streaming_side_stream()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,69 @@
+"""
+Unit tests for near-duplicate detection
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import canonical_quantity, dedup_products, jaccard, minhash_signature, shingle_hashes, shingles
+from data_cleaning import clean_product
+from brand_detection import add_brand
+
+def prepare(name, volume_weight=''):
+    return add_brand(clean_product({'name': name, 'volume_weight': volume_weight}))
+
+def test_canonical_quantity():
+    """Test sizes are normalized to base units with pack counts"""
+    assert canonical_quantity({'volume_weight': '330ml'}) == (1, 330, 'ml')
+    assert canonical_quantity({'volume_weight': '1.5L'}) == (1, 1500, 'ml')
+    assert canonical_quantity({'volume_weight': '', 'name': 'Walkers 6x25g'}) == (1, 25, 'g')
+    assert canonical_quantity({'volume_weight': '250ml', 'multipack': '4pk'}) == (4, 250, 'ml')
+    assert canonical_quantity({'volume_weight': '1kg'}) == canonical_quantity({'volume_weight': '1000 g'})
+    assert canonical_quantity({'name': 'Mystery Box'}) is None
+    print("✅ canonical quantity tests passed")
+
+def test_signature():
+    """Test signatures are deterministic and agree more for similar names"""
+    a = shingle_hashes(shingles("Coca Cola Original Taste 330ml"))
+    b = shingle_hashes(shingles("Coca-Cola Original 330ml"))
+    assert minhash_signature(a, 48) == minhash_signature(set(a), 48)
+    assert len(minhash_signature(a, 48)) == 48
+    assert jaccard(a, b) > 0.65
+    assert jaccard(a, shingle_hashes(shingles("Fanta Orange 330ml"))) < 0.3
+    print("✅ signature tests passed")
+
+def test_clusters():
+    """Test near-duplicates share a cluster only when brand and quantity agree"""
+    products = [
+        prepare("Coca Cola Original Taste 330Ml", "330ml"),
+        prepare("Coca-Cola Original 330ml Can", "330ml"),
+        prepare("Coca-Cola Original 500ml", "500ml"),
+        prepare("Fanta Orange 330ml", "330ml"),
+        prepare("Pepsi Max 500ml #1", "500ml"),
+        prepare("Pepsi Max 500ml #2", "500ml"),
+    ]
+    stats = {}
+    clusters = [p['cluster_id'] for p in dedup_products(products, stats)]
+    assert clusters == [0, 0, 1, 2, 3, 3]
+    assert stats == {'total': 6, 'clusters': 4, 'duplicates': 2}
+
+    strict = [p['cluster_id'] for p in dedup_products(products, threshold=0.95)]
+    assert strict == [0, 1, 2, 3, 4, 5]
+    print("✅ cluster tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Dedup Tests")
+    print("=" * 50)
+    test_canonical_quantity()
+    test_signature()
+    test_clusters()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,96 @@
+"""
+Unit tests for delta export (change detection between runs)
+"""
+import sys
+import os
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from delta import ChangeDetector, iter_detect_changes, load_index, save_index, write_delta, product_key, content_hash
+from product_record import ProductRecord
+
+PRODUCTS = [
+    {'name': 'Coca Cola 330ml', 'slug': 'coca-cola-330ml', 'price': '£0.75', 'brand': 'Coca-Cola'},
+    {'name': 'Pepsi Max 500ml', 'slug': 'pepsi-max-500ml', 'price': '£1.00', 'brand': 'Pepsi'},
+    {'name': 'Fanta Orange 330ml', 'slug': 'fanta-orange-330ml', 'price': '£0.70', 'brand': 'Fanta'},
+]
+
+def run(products, previous):
+    detector = ChangeDetector(previous)
+    assert list(iter_detect_changes(products, detector)) == products
+    return detector
+
+def test_changes():
+    """Test inserts, updates with old and new price, deletions and unchanged products"""
+    first = run(PRODUCTS, {})
+    assert [(change['op'], change['key']) for change in first.changes()] == [
+        ('insert', 'coca-cola-330ml'), ('insert', 'pepsi-max-500ml'), ('insert', 'fanta-orange-330ml')]
+
+    second_run = [dict(PRODUCTS[0], price='£0.80'), PRODUCTS[1], dict(PRODUCTS[2], brand='Fanta UK'),
+                  {'name': 'Red Bull 250ml', 'price': '£1.25'}]
+    second = run(second_run[:2] + second_run[3:], first.current)
+    changes = second.changes()
+    assert changes == [
+        {'op': 'update', 'key': 'coca-cola-330ml', 'old_price': '£0.75', 'new_price': '£0.80', 'product': second_run[0]},
+        {'op': 'insert', 'key': 'red-bull-250ml', 'price': '£1.25', 'product': second_run[3]},
+        {'op': 'delete', 'key': 'fanta-orange-330ml', 'old_price': '£0.70'},
+    ]
+    assert second.summary() == {'insert': 1, 'update': 1, 'delete': 1, 'price_changes': 1}
+
+    # Non-price changes are updates too; the last duplicate of a key wins
+    third = run([second_run[2], PRODUCTS[2], ProductRecord.from_dict(PRODUCTS[0])], first.current)
+    assert [(change['op'], change['key']) for change in third.changes()] == [('delete', 'pepsi-max-500ml')]
+    assert product_key({'name': 'Red Bull 250ml'}) == 'red-bull-250ml'
+    print("✅ change detection tests passed")
+
+def test_incomplete_run():
+    """Test a capped or partial run deletes nothing and keeps unseen keys for the next run"""
+    first = run(PRODUCTS, {})
+    cheaper = dict(PRODUCTS[0], price='£0.80')
+    capped = run([cheaper], first.current)
+    assert [(change['op'], change['key']) for change in capped.changes(complete=False)] == [('update', 'coca-cola-330ml')]
+    index = capped.index(complete=False)
+    assert sorted(index) == sorted(first.current) and index['coca-cola-330ml'][1] == '£0.80'
+    assert run([cheaper] + PRODUCTS[1:], index).changes() == []
+    assert capped.index() == capped.current
+
+    # Run-dependent fields do not make an update
+    assert content_hash(dict(PRODUCTS[0], cluster_id=7, brand_confidence=0.9)) == content_hash(PRODUCTS[0])
+    assert content_hash(dict(PRODUCTS[0], image_url='https://cdn.test/coke.jpg')) != content_hash(PRODUCTS[0])
+    print("✅ incomplete run tests passed")
+
+def test_index_and_delta_file():
+    """Test the per-site index round trip and the JSON Lines delta file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'index.json')
+        assert load_index(index_path) == {}
+        detector = run(PRODUCTS, {})
+        save_index(index_path, {'shop': detector.current, 'other': {}})
+        assert load_index(index_path)['shop'] == detector.current
+        assert run(PRODUCTS, load_index(index_path)['shop']).changes() == []
+
+        delta_path = os.path.join(tmp, 'delta.jsonl')
+        assert write_delta(delta_path, detector.changes(), 'shop', 1700000000.0) == 3
+        with open(delta_path, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[0] == {'op': 'insert', 'key': 'coca-cola-330ml', 'price': '£0.75', 'product': PRODUCTS[0],
+                            'site': 'shop', 'run_at': 1700000000.0}
+    print("✅ index and delta file tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Delta Export Tests")
+    print("=" * 50)
+    test_changes()
+    test_incomplete_run()
+    test_index_and_delta_file()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,146 @@
+"""
+Unit tests for incremental processing
+"""
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental import record_hash, load_previous, save_index, iter_incremental, get_index_path
+from data_io import write_products
+import columnar_io
+from columnar_io import partition_path
+
+RAW = [
+    {"name": "Coca Cola 330ml Can", "price": "£0.75", "volume_weight": "330ml", "image_url": ""},
+    {"name": "Pepsi Max 500ml", "price": "£1.00", "volume_weight": "500ml", "image_url": ""},
+]
+
+def fake_process(product):
+    return dict(product, processed=True)
+
+def test_record_hash():
+    """Test hashes only depend on the raw fields"""
+    assert record_hash(RAW[0]) == record_hash(dict(RAW[0]))
+    assert record_hash(RAW[0]) == record_hash(dict(RAW[0], brand="Coca Cola"))
+    assert record_hash(RAW[0]) != record_hash(dict(RAW[0], price="£0.80"))
+    print("✅ record_hash tests passed")
+
+def run_once(final_path, raw, previous, **options):
+    """Write one incremental run and its index, returning the stats"""
+    hashes, positions, stats = [], [], {}
+    write_products(final_path, iter_incremental(raw, previous, fake_process, hashes, stats), positions=positions)
+    if hasattr(previous, 'close'):
+        previous.close()
+    save_index(final_path, hashes, positions, **options)
+    return stats
+
+def test_incremental_reuse():
+    """Test unchanged records are reused and changed ones recomputed, for every JSON layout"""
+    for name in ('products_final.json', 'products_final.jsonl'):
+        with tempfile.TemporaryDirectory() as tmp:
+            final_path = os.path.join(tmp, name)
+            assert run_once(final_path, RAW, {}) == {'reused': 0, 'recomputed': 2}
+
+            previous = load_previous(final_path)
+            assert len(previous) == 2
+            assert previous.get(record_hash(RAW[1]))['name'] == "Pepsi Max 500ml"
+
+            changed = [RAW[0], dict(RAW[1], price="£1.10")]
+            hashes, stats = [], {}
+            results = list(iter_incremental(changed, previous, fake_process, hashes, stats))
+            previous.close()
+            assert stats == {'reused': 1, 'recomputed': 1}
+            assert results[0]['processed'] is True
+            assert results[1]['price'] == "£1.10"
+    print("✅ incremental reuse tests passed")
+
+def test_lazy_previous():
+    """Test products are read from the previous output on lookup, even after it is replaced"""
+    with tempfile.TemporaryDirectory() as tmp:
+        final_path = os.path.join(tmp, 'products_final.jsonl')
+        raw = [dict(RAW[0], name=f"Product ñ {i}") for i in range(200)]
+        run_once(final_path, raw, {})
+
+        previous = load_previous(final_path)
+        # Rewriting the output while reusing from it (as every incremental run does)
+        assert run_once(final_path, raw[::-1], previous) == {'reused': 200, 'recomputed': 0}
+        previous = load_previous(final_path)
+        assert previous.get(record_hash(raw[7]))['name'] == "Product ñ 7"
+        previous.close()
+    print("✅ lazy previous output tests passed")
+
+def test_index_per_format():
+    """Test JSON and JSON Lines output keep separate indexes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'products_final.json')
+        jsonl_path = os.path.join(tmp, 'products_final.jsonl')
+        assert get_index_path(json_path) != get_index_path(jsonl_path)
+        run_once(json_path, RAW, {})
+        run_once(jsonl_path, RAW[:1], {})
+        assert len(load_previous(json_path)) == 2
+        assert len(load_previous(jsonl_path)) == 1
+    print("✅ per-format index tests passed")
+
+def test_dedup_settings():
+    """Test changing dedup settings invalidates the index (reused products carry cluster ids)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        final_path = os.path.join(tmp, 'products_final.json')
+        run_once(final_path, RAW, {}, dedup=True)
+        assert len(load_previous(final_path, dedup=True)) == 2
+        assert len(load_previous(final_path)) == 0
+        assert len(load_previous(final_path, dedup=True, dedup_threshold=0.9)) == 0
+    print("✅ dedup settings tests passed")
+
+def test_missing_index():
+    """Test a missing index means nothing is reused"""
+    with tempfile.TemporaryDirectory() as tmp:
+        final_path = os.path.join(tmp, 'products_final.json')
+        write_products(final_path, RAW)
+        assert len(load_previous(final_path)) == 0
+    print("✅ missing index tests passed")
+
+def test_run_date_partitions():
+    """Test a columnar run reuses the newest earlier run_date partition of its site"""
+    if columnar_io.pa is None:
+        print("⏭️  pyarrow not installed, skipping run_date partition tests")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'products_final.parquet')
+        def day(site, run_date):
+            path = partition_path(root, {'site': site, 'run_date': run_date}, 'parquet')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return path
+
+        assert run_once(day('shop', '2026-01-30'), RAW, {}) == {'reused': 0, 'recomputed': 2}
+        run_once(day('other', '2026-01-31'), RAW[:1], {})
+        assert len(load_previous(day('shop', '2026-01-29'))) == 0  # nothing before it
+
+        previous = load_previous(day('shop', '2026-01-31'))
+        assert len(previous) == 2
+        assert run_once(day('shop', '2026-01-31'), RAW, previous) == {'reused': 2, 'recomputed': 0}
+        previous = load_previous(day('shop', '2026-02-02'))
+        assert previous.get(record_hash(RAW[1]))['name'] == "Pepsi Max 500ml"
+        previous.close()
+    print("✅ run_date partition tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Incremental Processing Tests")
+    print("=" * 50)
+    test_record_hash()
+    test_incremental_reuse()
+    test_lazy_previous()
+    test_index_per_format()
+    test_dedup_settings()
+    test_missing_index()
+    test_run_date_partitions()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
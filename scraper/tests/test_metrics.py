@@ -0,0 +1,70 @@
+"""
+Unit tests for runtime metrics
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from config import METRICS_CONFIG
+
+def test_histogram_rendering():
+    """Test histograms render cumulative buckets, sum and count per label set"""
+    metrics.reset()
+    metrics.observe('scraper_stage_seconds', 0.003, (('stage', 'parse'),))
+    metrics.observe('scraper_stage_seconds', 0.2, (('stage', 'parse'),))
+    with metrics.stage_timer('clean'):
+        pass
+    text = metrics.render()
+    assert '# TYPE scraper_stage_seconds histogram' in text
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="0.001"} 0' in text
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="0.005"} 1' in text
+    assert 'scraper_stage_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'scraper_stage_seconds_sum{stage="parse"} 0.203' in text
+    assert 'scraper_stage_seconds_count{stage="clean"} 1' in text
+    print("✅ histogram rendering tests passed")
+
+def test_fetch_metrics():
+    """Test fetches are counted per host and status, including failures"""
+    metrics.reset()
+    metrics.record_fetch('http://shop.example/drinks', 200, 15, 0.12)
+    metrics.record_fetch('http://down.example/', 'error', 0, 10.0)
+    text = metrics.render()
+    assert 'scraper_fetch_requests_total{host="shop.example",status="200"} 1' in text
+    assert 'scraper_fetch_requests_total{host="down.example",status="error"} 1' in text
+    assert 'scraper_fetch_bytes_total{host="shop.example"} 15' in text
+    assert 'scraper_fetch_seconds_count{host="down.example"} 1' in text
+    print("✅ fetch metrics tests passed")
+
+def test_disabled():
+    """Test nothing is recorded while metrics are disabled"""
+    metrics.reset()
+    METRICS_CONFIG['enabled'] = False
+    try:
+        assert metrics.stage_timer('parse') is metrics.NULL_TIMER
+        with metrics.stage_timer('parse'):
+            pass
+        metrics.inc('scraper_fetch_requests_total')
+        metrics.record_fetch('http://shop.example/', 200, 15, 0.12)
+    finally:
+        METRICS_CONFIG['enabled'] = True
+    # Only the HELP and TYPE lines remain
+    assert all(line.startswith('#') for line in metrics.render().splitlines())
+    print("✅ disabled metrics tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Metrics Tests")
+    print("=" * 50)
+    test_histogram_rendering()
+    test_fetch_metrics()
+    test_disabled()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,96 @@
+"""
+Unit tests for the staged pipeline runner
+"""
+import sys
+import os
+import random
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import run_pipeline, map_stage, stream_stage, bottleneck
+
+def jittered_double(value):
+    time.sleep(random.random() * 0.001)
+    return value * 2
+
+def test_order_and_stats():
+    """Test multi-worker stages keep input order and every stage reports its items"""
+    stats = {}
+    stages = [
+        map_stage('double', jittered_double, workers=4),
+        stream_stage('running_total', lambda items: (value + 1 for value in items)),
+    ]
+    results = list(run_pipeline(range(500), stages, queue_size=8, stats=stats, source_name='numbers', sink_name='collect'))
+    assert results == [value * 2 + 1 for value in range(500)]
+    assert list(stats) == ['numbers', 'double', 'running_total', 'collect', 'wall_seconds']
+    assert all(stats[name]['items'] == 500 for name in ('numbers', 'double', 'running_total', 'collect'))
+    assert stats['double']['workers'] == 4
+    assert stats['double']['queue_max'] <= 8
+    assert bottleneck(stats) == 'double'
+    print("✅ order and stats tests passed")
+
+def test_backpressure():
+    """Test a slow consumer stops the source from running far ahead"""
+    produced = []
+
+    def source():
+        for value in range(200):
+            produced.append(value)
+            yield value
+
+    queue_size = 4
+    stages = [map_stage('same', lambda value: value, workers=2)]
+    for consumed, value in enumerate(run_pipeline(source(), stages, queue_size=queue_size), 1):
+        time.sleep(0.001)
+        # Queues plus the map stage's reorder window bound the items in flight
+        assert len(produced) - consumed <= 3 * queue_size + 4
+    assert len(produced) == 200
+    print("✅ backpressure tests passed")
+
+def test_errors_stop_the_pipeline():
+    """Test a failing stage raises in the caller and every stage thread exits"""
+    def fail_on_ten(value):
+        if value == 10:
+            raise ValueError('bad item')
+        return value
+
+    before = threading.active_count()
+    try:
+        list(run_pipeline(range(10000), [map_stage('check', fail_on_ten, workers=3)], queue_size=4))
+        assert False, 'ValueError not raised'
+    except ValueError as e:
+        assert str(e) == 'bad item'
+    assert threading.active_count() == before
+
+    # Stopping early also shuts the stages down
+    results = run_pipeline(range(10000), [map_stage('same', lambda value: value)], queue_size=4)
+    assert next(results) == 0
+    results.close()
+    assert threading.active_count() == before
+    print("✅ error handling tests passed")
+
+def test_empty_source():
+    """Test an empty source finishes cleanly"""
+    stats = {}
+    assert list(run_pipeline([], [map_stage('same', lambda value: value, workers=2)], stats=stats)) == []
+    assert stats['same']['items'] == 0
+    print("✅ empty source tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Pipeline Tests")
+    print("=" * 50)
+    test_order_and_stats()
+    test_backpressure()
+    test_errors_stop_the_pipeline()
+    test_empty_source()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,79 @@
+"""
+Unit tests for the compact product record
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_record import ProductRecord
+from data_cleaning import clean_product, clean_products
+
+def test_roundtrip():
+    """Test records round-trip to the dicts they came from"""
+    raw = {"name": "Pepsi Max", "price": "£1.00", "site": "shop"}
+    record = ProductRecord.from_dict(raw)
+    assert record.to_dict() == raw
+    assert record.get('volume_weight') is None
+    assert 'volume_weight' not in record
+    assert record['site'] == "shop"
+    assert record == raw
+    print("✅ roundtrip tests passed")
+
+def test_dict_style_access():
+    """Test dict-style reads and writes"""
+    record = ProductRecord(name="Fanta Orange")
+    record['brand'] = "Fanta"
+    assert record.brand == "Fanta"
+    assert record.get('missing', 'default') == 'default'
+    try:
+        record['price']
+        assert False, "Expected KeyError"
+    except KeyError:
+        pass
+    print("✅ dict-style access tests passed")
+
+def test_clean_product_output():
+    """Test clean_product returns a record without mutating its input"""
+    raw = {"name": "coca cola 330ml can", "price": "PMP £1.25", "volume_weight": "330 ml", "image_url": ""}
+    cleaned = clean_product(raw)
+    assert isinstance(cleaned, ProductRecord)
+    assert raw['name'] == "coca cola 330ml can"
+    assert cleaned.to_dict() == {
+        "name": "Coca Cola 330Ml",
+        "price": "£1.25",
+        "volume_weight": "330ml",
+        "image_url": "",
+        "original_name": "coca cola 330ml can",
+        "multipack": "",
+        "slug": "coca-cola-330ml",
+    }
+    print("✅ clean_product output tests passed")
+
+def test_clean_products_copies():
+    """Test clean_products leaves both dicts and records it was given unchanged"""
+    raw = {"name": "pepsi max 500ml", "price": "£1.00"}
+    record = ProductRecord.from_dict(raw)
+    cleaned = clean_products([raw, record])
+    assert raw == {"name": "pepsi max 500ml", "price": "£1.00"}
+    assert record == raw
+    assert cleaned[0] is not raw and cleaned[1] is not record
+    assert cleaned[0] == cleaned[1] and cleaned[1].name == "Pepsi Max 500Ml"
+    print("✅ clean_products copy tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Product Record Tests")
+    print("=" * 50)
+    test_roundtrip()
+    test_dict_style_access()
+    test_clean_product_output()
+    test_clean_products_copies()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,179 @@
+"""
+Unit tests for the indexed product store
+"""
+import sys
+import os
+import random
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import STORE_CONFIG
+from product_store import ProductStore, fts_query, site_label
+
+PRODUCTS = [
+    {'name': 'Coca Cola Original 330ml', 'slug': 'coca-cola-original-330ml', 'brand': 'Coca-Cola', 'price': '£0.99', 'volume_weight': '330ml'},
+    {'name': 'Coca Cola Zero 1.5L', 'slug': 'coca-cola-zero-15l', 'brand': 'Coca-Cola', 'price': '£2.10', 'volume_weight': '1.5L'},
+    {'name': 'Pepsi Max 500ml', 'slug': 'pepsi-max-500ml', 'brand': 'Pepsi', 'price': '£1.25', 'volume_weight': '500ml'},
+    {'name': 'Heinz Baked Beans 415g', 'slug': 'heinz-baked-beans-415g', 'brand': 'Heinz', 'price': '', 'volume_weight': '415g'},
+    {'name': 'Walkers Crisps 6x25g', 'brand': 'Walkers', 'price': '£1.80', 'volume_weight': '25g', 'multipack': '6x'},
+]
+
+def make_store(tmp):
+    store = ProductStore(os.path.join(tmp, 'products.db'))
+    store.upsert_products(PRODUCTS, 'shop')
+    return store
+
+def names(page):
+    return [product['name'] for product in page['products']]
+
+def test_upsert():
+    """Test products are keyed by site and slug and updated in place"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        assert store.count() == 5
+        store.upsert_products([dict(PRODUCTS[2], price='£1.00')], 'shop')
+        store.upsert_products(PRODUCTS[:1] + [{'name': ''}], 'other.example')
+        assert store.count() == 6
+        page = store.search(q='pepsi')
+        assert page['products'] == [dict(PRODUCTS[2], price='£1.00', site='shop')]
+        assert names(store.search(site='other.example')) == ['Coca Cola Original 330ml']
+    assert site_label('custom', 'https://Shop.Example/drinks') == 'shop.example'
+    print("✅ upsert tests passed")
+
+def test_search_and_filters():
+    """Test full-text prefix search, filters and sorts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        assert fts_query('coca "cola') == '"coca" "cola"*'
+        assert fts_query('6 x') == '"6" "x"'
+        assert sorted(names(store.search(q='coca'))) == ['Coca Cola Original 330ml', 'Coca Cola Zero 1.5L']
+        assert names(store.search(q='coca zer')) == ['Coca Cola Zero 1.5L']
+        assert names(store.search(q='heinz')) == ['Heinz Baked Beans 415g']
+        assert names(store.search(brand='Pepsi')) == ['Pepsi Max 500ml']
+
+        # Missing prices sort last; ranges only match products with a price
+        by_price = names(store.search(sort='price'))
+        assert by_price[0] == 'Coca Cola Original 330ml' and by_price[-1] == 'Heinz Baked Beans 415g'
+        assert names(store.search(min_price=1, max_price=2, sort='price')) == ['Pepsi Max 500ml', 'Walkers Crisps 6x25g']
+
+        # Quantities are per item in base units
+        assert names(store.search(unit='ml', min_quantity=500, sort='quantity', order='desc')) == ['Coca Cola Zero 1.5L', 'Pepsi Max 500ml']
+        assert store.search(q='walkers')['products'][0]['multipack'] == '6x'
+    print("✅ search and filter tests passed")
+
+def test_keyset_pagination():
+    """Test cursors walk every product exactly once and reject mismatched sorts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        for sort, order in (('name', 'asc'), ('price', 'desc'), ('brand', 'asc')):
+            seen = []
+            cursor = None
+            while True:
+                page = store.search(sort=sort, order=order, limit=2, cursor=cursor)
+                seen.extend(names(page))
+                cursor = page['next_cursor']
+                if not cursor:
+                    break
+            assert seen == names(store.search(sort=sort, order=order, limit=10))
+            assert len(seen) == 5
+
+        cursor = store.search(sort='name', limit=2)['next_cursor']
+        for kwargs in ({'sort': 'price', 'cursor': cursor}, {'cursor': 'not-a-cursor'},
+                       {'sort': 'relevance'}, {'sort': 'size'}):
+            try:
+                store.search(**kwargs)
+                assert False, f"expected ValueError for {kwargs}"
+            except ValueError:
+                pass
+    print("✅ keyset pagination tests passed")
+
+def test_query_plans():
+    """Test each plan (driving filter, sort index walk, relevance windows) pages through exactly the matching rows"""
+    rng = random.Random(3)
+    products = [{'name': f"{rng.choice(['Cola', 'Lemonade', 'Orange Juice'])} {rng.choice(['Zero', 'Original'])} {i}",
+                 'slug': f'p-{i}', 'brand': rng.choice(['Coca-Cola', 'Pepsi', 'Tango']),
+                 'price': f'£{rng.randint(0, 300) / 100:.2f}', 'volume_weight': rng.choice(['330ml', '500ml', '1L'])}
+                for i in range(600)]
+    price = lambda product: float(product['price'][1:])
+    cases = [
+        ({'brand': 'Pepsi', 'sort': 'price'}, lambda p: p['brand'] == 'Pepsi'),
+        ({'min_price': 1.0, 'max_price': 1.1}, lambda p: 1.0 <= price(p) <= 1.1),
+        ({'min_price': 0.5, 'sort': 'updated', 'order': 'desc'}, lambda p: price(p) >= 0.5),
+        ({'q': 'zero', 'sort': 'name'}, lambda p: 'Zero' in p['name']),
+        ({'q': 'orange juice zer', 'max_price': 2, 'sort': 'price'}, lambda p: 'Orange Juice Zero' in p['name'] and price(p) <= 2),
+        ({'q': '12', 'sort': 'price'}, lambda p: p['name'].split()[-1].startswith('12')),
+        ({'q': 'cola', 'site': 'shop'}, lambda p: 'Cola' in p['name'] + p['brand']),
+        ({'q': 'lemonade', 'brand': 'Tango', 'order': 'desc'}, lambda p: 'Lemonade' in p['name'] and p['brand'] == 'Tango'),
+    ]
+    window = STORE_CONFIG['relevance_window']
+    STORE_CONFIG['relevance_window'] = 40
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ProductStore(os.path.join(tmp, 'products.db'))
+            store.upsert_products(products, 'shop')
+            store.analyze()
+            for kwargs, matches in cases:
+                seen = []
+                cursor = None
+                while True:
+                    page = store.search(limit=7, cursor=cursor, **kwargs)
+                    seen.extend(product['slug'] for product in page['products'])
+                    cursor = page['next_cursor']
+                    if not cursor:
+                        break
+                assert len(seen) == len(set(seen)), kwargs
+                assert set(seen) == {p['slug'] for p in products if matches(p)}, kwargs
+                if kwargs.get('sort') == 'price':
+                    prices = [price(products[int(slug[2:])]) for slug in seen]
+                    assert prices == sorted(prices), kwargs
+    finally:
+        STORE_CONFIG['relevance_window'] = window
+    print("✅ query plan tests passed")
+
+def test_change_feed():
+    """Test recorded changes page by change id and filter by site and time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        assert store.changes() == {'changes': [], 'next_since': 0}
+        store.record_changes([
+            {'op': 'insert', 'key': 'pepsi-max-500ml', 'price': '£1.25', 'product': PRODUCTS[2]},
+            {'op': 'update', 'key': 'coca-cola-zero-15l', 'old_price': '£2.10', 'new_price': '£1.99', 'product': PRODUCTS[1]},
+        ], 'shop', now=1000.0)
+        store.record_changes([{'op': 'delete', 'key': 'walkers-crisps', 'old_price': '£1.80'}], 'other', now=2000.0)
+
+        first = store.changes(limit=2)
+        assert [(change['op'], change['new_price']) for change in first['changes']] == [('insert', '£1.25'), ('update', '£1.99')]
+        assert first['changes'][1]['old_price'] == '£2.10' and first['changes'][0]['product'] == PRODUCTS[2]
+        rest = store.changes(since=first['next_since'])
+        assert [change['key'] for change in rest['changes']] == ['walkers-crisps']
+        assert rest['changes'][0]['product'] is None
+        assert store.changes(since=rest['next_since']) == {'changes': [], 'next_since': rest['next_since']}
+
+        assert [change['site'] for change in store.changes(site='shop')['changes']] == ['shop', 'shop']
+        assert [change['op'] for change in store.changes(since='1970-01-01T00:25:00Z')['changes']] == ['delete']
+        assert store.changes(since='2030-01-01')['next_since'] == 3
+        try:
+            store.changes(since='yesterday')
+            assert False, 'ValueError not raised'
+        except ValueError:
+            pass
+    print("✅ change feed tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Product Store Tests")
+    print("=" * 50)
+    test_upsert()
+    test_search_and_filters()
+    test_keyset_pagination()
+    test_query_plans()
+    test_change_feed()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
@@ -0,0 +1,91 @@
+"""
+Unit tests for pipeline profiling and tracing
+"""
+import sys
+import os
+import json
+import pstats
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+from metrics import record_fetch, stage_timer
+from pipeline import run_pipeline, map_stage
+
+def test_spans_and_urls():
+    """Test fetch, parse and clean spans, URL attribution and batch merging"""
+    tracer = profiling.start()
+    try:
+        record_fetch('http://shop.test/slow', 200, 2048, 0.5, 0.01)
+        with stage_timer('parse'):
+            time.sleep(0.01)
+        record_fetch('http://shop.test/fast', 200, 512, 0.05, 0.001)
+        for _ in range(5):
+            with stage_timer('clean'):
+                pass
+    finally:
+        profiling.stop()
+
+    report = tracer.stage_report()
+    assert report['fetch']['spans'] == 2 and report['clean']['spans'] == 5
+    assert report['parse']['wall_ms'] >= 10
+
+    slowest = tracer.slowest_urls(1)
+    assert [entry['url'] for entry in slowest] == ['http://shop.test/slow']
+    assert slowest[0]['wall'] > 0.51 and slowest[0]['bytes'] == 2048
+
+    trace = tracer.to_chrome_trace()
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [event['name'] for event in spans] == ['fetch', 'parse', 'fetch', 'clean']
+    assert spans[1]['args']['url'] == 'http://shop.test/slow'
+    # Back-to-back clean spans on one thread become one batch span
+    assert spans[3]['args']['count'] == 5
+    assert any(event['ph'] == 'M' and event['name'] == 'thread_name' for event in trace['traceEvents'])
+
+    # Nothing is recorded once stopped
+    with stage_timer('clean'):
+        pass
+    assert tracer.stage_report()['clean']['spans'] == 5
+    print("✅ span and URL tests passed")
+
+def traced_double(value):
+    with stage_timer('clean'):
+        return value * 2
+
+def test_run_profiled():
+    """Test run_profiled writes a cProfile dump covering pipeline threads and a trace file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profile_path = os.path.join(tmp, 'profile.prof')
+        trace_path = os.path.join(tmp, 'trace.json')
+
+        def run():
+            return list(run_pipeline(range(100), [map_stage('double', traced_double, workers=2)]))
+
+        assert profiling.run_profiled(run, profile_path, trace_path) == [value * 2 for value in range(100)]
+
+        functions = {name for (_, _, name) in pstats.Stats(profile_path).stats}
+        assert 'traced_double' in functions  # ran in a worker thread
+
+        with open(trace_path, encoding='utf-8') as f:
+            trace = json.load(f)
+        spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        assert sum(event['args']['count'] for event in spans if event['name'] == 'clean') == 100
+    assert profiling.thread_target(run) is run
+    print("✅ run_profiled tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Profiling Tests")
+    print("=" * 50)
+    test_spans_and_urls()
+    test_run_profiled()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
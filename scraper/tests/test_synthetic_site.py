@@ -0,0 +1,106 @@
+"""
+Unit tests for the synthetic storefront
+"""
+import sys
+import os
+import json
+import re
+import urllib.error
+import urllib.request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_site import SyntheticSite, CATEGORIES, SITEMAP_URLS, start_server
+from config import SCRAPING_SITES
+
+def test_catalog():
+    """Test the catalog is deterministic and listings page through every product once"""
+    site = SyntheticSite(products=1000, page_size=48, seed=3)
+    assert site.product(123) == SyntheticSite(products=1000, seed=3).product(123)
+    assert site.product(123) != SyntheticSite(products=1000, seed=4).product(123)
+
+    seen = []
+    for category_index in range(len(CATEGORIES)):
+        page = 1
+        while True:
+            products = site.category_page(category_index, page)
+            if not products:
+                break
+            assert all(product['category'] == CATEGORIES[category_index][0] for product in products)
+            seen += [product['id'] for product in products]
+            page += 1
+    assert sorted(seen) == list(range(1000))
+
+    # A million-product catalog costs nothing until a page is rendered
+    big = SyntheticSite(products=1000000)
+    assert big.category_count(0) == 166667
+    assert big.product(999999)['id'] == 999999
+    print("✅ catalog tests passed")
+
+def test_pages():
+    """Test listings, product pages with JSON-LD, sitemaps and 404s"""
+    site = SyntheticSite(products=120000, page_size=24)
+    status, _, body = site.render('/category/drinks', {'page': ['2']})
+    text = body.decode('utf-8')
+    assert status == 200
+    assert text.count('class="product-card"') == 24
+    assert 'rel="next" href="/category/drinks?page=3"' in text and 'rel="prev"' in text
+    assert 'data-src="/images/' in text and 'data-lazy-src="/images/' in text
+    assert ' src=' not in text  # images only load lazily
+
+    product = site.product(42)
+    status, _, body = site.render(product['path'])
+    match = re.search(r'<script type="application/ld\+json">(.*?)</script>', body.decode('utf-8'))
+    data = json.loads(match.group(1))
+    assert data['@type'] == 'Product' and data['name'] == product['name'] and data['sku'] == product['sku']
+    assert data['offers']['price'] == product['price'] and data['brand']['name'] == product['brand']
+
+    status, _, body = site.render('/sitemap.xml')
+    assert body.decode().count('<sitemap>') == 3  # 120000 products at 50000 per file
+    status, _, body = site.render('/sitemap-2.xml')
+    assert body.decode().count('<url>') == 120000 - 2 * SITEMAP_URLS
+    assert site.render('/category/drinks', {'page': ['99999']})[2].decode().count('product-card') == 0
+    assert SyntheticSite(products=120, missing_page_status=410).render('/category/drinks', {'page': ['2']})[0] == 410
+    assert site.render('/nope')[0] == 404
+    assert site.render('/product/120000-missing')[0] == 404
+    print("✅ page rendering tests passed")
+
+def test_server():
+    """Test the HTTP server, latency and error injection, and the site config entry"""
+    server = start_server(SyntheticSite(products=500), port=0, latency_ms=30)
+    try:
+        with urllib.request.urlopen(server.base_url) as response:
+            assert response.status == 200
+            assert 'href="/category/drinks"' in response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+
+    server = start_server(SyntheticSite(products=500), port=0, error_rate=1.0)
+    try:
+        urllib.request.urlopen(server.base_url + 'category/drinks')
+        assert False, 'injected error not raised'
+    except urllib.error.HTTPError as e:
+        assert e.code in (500, 503)
+    finally:
+        server.shutdown()
+
+    site_config = SCRAPING_SITES['synthetic']
+    assert site_config['enabled'] and site_config['delay_between_requests'] == 0
+    assert site_config['product_selectors'][0]['class'] == 'product-card'
+    print("✅ server tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Synthetic Site Tests")
+    print("=" * 50)
+    test_catalog()
+    test_pages()
+    test_server()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
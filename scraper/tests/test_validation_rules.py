@@ -0,0 +1,83 @@
+"""
+Unit tests for the compiled validation rule engine
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from validation_rules import RULES, compile_plan, register_rule, iter_batches
+from data_validation import validate_products
+
+PRODUCTS = [
+    {"name": "Coca Cola 330Ml", "price": "£0.75", "volume_weight": "330ml", "image_url": "x.jpg", "brand": "Coca-Cola", "slug": "coca-cola-330ml"},
+    {"name": "Ab", "price": "0.75", "volume_weight": "large", "brand": "Unknown"},
+    {"name": "", "price": "", "volume_weight": "", "brand": "Unknown"},
+] * 5
+
+def test_plan_projection_and_skipping():
+    """Test plans only read the fields their rules declare"""
+    plan = compile_plan(include=['price_format', 'required_price'])
+    assert plan.rule_names == ['required_price', 'price_format']
+    assert plan.fields == ['price']
+
+    full = validate_products(PRODUCTS, plan=compile_plan())
+    skipped = validate_products(PRODUCTS, plan=compile_plan(exclude=['brand_detected']))
+    assert skipped['total_warnings'] == full['total_warnings'] - 10
+    assert 'brand_detected' not in skipped['rule_timings_ms']
+    assert set(full['rule_timings_ms']) == set(RULES)
+
+    for options in ({'include': ['no_such_rule']}, {'exclude': ['brand_detectd']}):
+        try:
+            compile_plan(**options)
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert str(e).startswith("Unknown validation rules: ")
+    print("✅ plan projection tests passed")
+
+def test_skipped_completeness():
+    """Test skipping the completeness rule reports the score as unavailable, not 0%"""
+    metrics = validate_products(PRODUCTS, plan=compile_plan(exclude=['completeness']))
+    assert metrics['average_completeness'] is None
+    assert all(result['completeness_score'] is None for result in metrics['validation_results'])
+    assert validate_products(PRODUCTS)['average_completeness'] > 0
+    print("✅ skipped completeness tests passed")
+
+def test_custom_rule():
+    """Test registered rules run in registration order"""
+    @register_rule('slug_lowercase', ('slug',))
+    def check_slug(slugs):
+        return ["Slug is not lowercase" if slug and slug != slug.lower() else None for slug in slugs]
+
+    try:
+        results = compile_plan().run([{"name": "Fanta", "price": "£1", "volume_weight": "1l", "slug": "Fanta", "brand": "Unknown"}])
+        assert results[0]['warnings'] == ["Brand not detected", "Slug is not lowercase"]
+    finally:
+        del RULES['slug_lowercase']
+    print("✅ custom rule tests passed")
+
+def test_process_pool_matches_serial():
+    """Test batched and pooled runs give the same results as one batch"""
+    serial = validate_products(PRODUCTS, batch_size=len(PRODUCTS))
+    pooled = validate_products(iter(PRODUCTS), batch_size=4, processes=2)
+    assert pooled['validation_results'] == serial['validation_results']
+    assert pooled['total_warnings'] == serial['total_warnings']
+    assert [len(batch) for batch in iter_batches(range(10), 4)] == [4, 4, 2]
+    print("✅ process pool tests passed")
+
+def run_all_tests():
+    """Run all tests"""
+    print("=" * 50)
+    print("Running Validation Rule Tests")
+    print("=" * 50)
+    test_plan_projection_and_skipping()
+    test_skipped_completeness()
+    test_custom_rule()
+    test_process_pool_matches_serial()
+    print("=" * 50)
+    print("All tests passed! ✅")
+    print("=" * 50)
+
+if __name__ == '__main__':
+    run_all_tests()
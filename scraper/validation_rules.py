@@ -0,0 +1,224 @@
+"""
+Validation rule engine
+Rules declare the fields they read and check a whole column batch at once.
+compile_plan() picks the rules to run and builds a ValidationPlan, which projects
+only the fields those rules need, runs over columnar batches (optionally in a
+process pool) and records the time spent in each rule.
+"""
+import re
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from metrics import observe_stage, stage_timer
+
+# severity is 'issue' (makes a product invalid), 'warning', or 'score' (completeness)
+Rule = namedtuple('Rule', ['name', 'fields', 'severity', 'check'])
+
+# Registered rules, in the order their messages are reported
+RULES: Dict[str, Rule] = {}
+
+REQUIRED_FIELDS = ('name', 'price', 'volume_weight')
+COMPLETENESS_FIELDS = ('name', 'price', 'volume_weight', 'image_url', 'brand', 'slug')
+PRICE_PATTERN = re.compile(r'[£$€]\s*\d+')
+VOLUME_WEIGHT_PATTERN = re.compile(r'\d+\s*(ml|g|l|kg)', re.I)
+
+
+def register_rule(name: str, fields: Sequence[str], severity: str = 'warning', check: Optional[Callable] = None):
+    """
+    Register a rule; usable directly or as a decorator
+
+    check receives one list per declared field (same length) and returns a list
+    with one entry per row: a message (or None) for issues/warnings, a float for scores.
+    Use module-level functions so rules can run in worker processes.
+    """
+    if severity not in ('issue', 'warning', 'score'):
+        raise ValueError(f"Unknown rule severity: {severity}")
+
+    def decorator(func):
+        RULES[name] = Rule(name, tuple(fields), severity, func)
+        return func
+
+    if check is not None:
+        return decorator(check)
+    return decorator
+
+
+def _check_required(field, values):
+    message = f"Missing required field: {field}"
+    return [None if value else message for value in values]
+
+
+for _field in REQUIRED_FIELDS:
+    register_rule(f'required_{_field}', (_field,), 'issue', partial(_check_required, _field))
+
+
+@register_rule('name_too_short', ('name',))
+def _check_name_too_short(names):
+    return ["Product name is very short" if name and len(name) < 3 else None for name in names]
+
+
+@register_rule('name_too_long', ('name',))
+def _check_name_too_long(names):
+    return ["Product name is very long" if name and len(name) > 200 else None for name in names]
+
+
+@register_rule('price_format', ('price',))
+def _check_price_format(prices):
+    search = PRICE_PATTERN.search
+    return ["Price format may be incorrect" if price and not search(price) else None for price in prices]
+
+
+@register_rule('volume_weight_format', ('volume_weight',))
+def _check_volume_weight_format(values):
+    search = VOLUME_WEIGHT_PATTERN.search
+    return ["Volume/weight format may be incorrect" if value and not search(value) else None for value in values]
+
+
+@register_rule('brand_detected', ('brand',))
+def _check_brand_detected(brands):
+    return ["Brand not detected" if brand == 'Unknown' else None for brand in brands]
+
+
+@register_rule('completeness', COMPLETENESS_FIELDS, 'score')
+def _score_completeness(*columns):
+    count = len(columns)
+    return [sum(1 for value in row if value) / count for row in zip(*columns)]
+
+
+def to_columns(products: Sequence[Any], fields: Sequence[str]) -> Dict[str, List[Any]]:
+    """Project a batch of products (dicts or ProductRecords) into one list per field"""
+    return {field: [product.get(field) for product in products] for field in fields}
+
+
+class ValidationPlan:
+    """
+    Compiled set of rules
+    fields is the projection the rules need; timings holds seconds spent per rule.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        self.rule_names = [rule.name for rule in self.rules]
+        fields = []
+        for rule in self.rules:
+            for field in rule.fields:
+                if field not in fields:
+                    fields.append(field)
+        self.fields = fields
+        self.timings = {name: 0.0 for name in self.rule_names}
+
+    def run_columns(self, columns: Dict[str, List[Any]], count: int):
+        """
+        Run every rule over one columnar batch
+        Returns (issues, warnings, scores) with one entry per row; scores are
+        None when the plan has no completeness rule
+        """
+        issues = [[] for _ in range(count)]
+        warnings = [[] for _ in range(count)]
+        scores = [None] * count
+
+        for rule in self.rules:
+            start = time.perf_counter()
+            output = rule.check(*[columns[field] for field in rule.fields])
+            if rule.severity == 'score':
+                scores = output
+            else:
+                target = issues if rule.severity == 'issue' else warnings
+                for row, message in enumerate(output):
+                    if message:
+                        target[row].append(message)
+            self.timings[rule.name] += time.perf_counter() - start
+
+        return issues, warnings, scores
+
+    def run(self, products: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Validate a batch of products and return one result dict per product"""
+        with stage_timer('validate'):
+            issues, warnings, scores = self.run_columns(to_columns(products, self.fields), len(products))
+        return [
+            {
+                'valid': len(row_issues) == 0,
+                'issues': row_issues,
+                'warnings': row_warnings,
+                'completeness_score': score,
+            }
+            for row_issues, row_warnings, score in zip(issues, warnings, scores)
+        ]
+
+    def run_batches(self, batches: Iterable[Sequence[Any]], processes: Optional[int] = None) -> Iterator[Tuple[Sequence[Any], List[Dict[str, Any]]]]:
+        """
+        Validate batches of products, yielding (batch, results) pairs in order
+        With processes > 1 the column batches run in a process pool, keeping at
+        most two batches per worker in flight
+        """
+        if not processes or processes <= 1:
+            for batch in batches:
+                yield batch, self.run(batch)
+            return
+
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = deque()
+            for batch in batches:
+                columns = to_columns(batch, self.fields)
+                pending.append((batch, executor.submit(_run_batch, self.rule_names, columns, len(batch))))
+                if len(pending) >= processes * 2:
+                    done, future = pending.popleft()
+                    yield done, self._collect(future.result())
+            while pending:
+                done, future = pending.popleft()
+                yield done, self._collect(future.result())
+
+    def _collect(self, worker_output):
+        results, timings = worker_output
+        for name, seconds in timings.items():
+            self.timings[name] += seconds
+        observe_stage('validate', sum(timings.values()))
+        return results
+
+    def timing_report(self) -> Dict[str, float]:
+        """Milliseconds spent per rule, most expensive first"""
+        ordered = sorted(self.timings.items(), key=lambda item: item[1], reverse=True)
+        return {name: round(seconds * 1000, 3) for name, seconds in ordered}
+
+
+def _run_batch(rule_names, columns, count):
+    """Process pool entry point: run a plan over one column batch"""
+    plan = compile_plan(include=rule_names)
+    issues, warnings, scores = plan.run_columns(columns, count)
+    results = [
+        {'valid': not row_issues, 'issues': row_issues, 'warnings': row_warnings, 'completeness_score': score}
+        for row_issues, row_warnings, score in zip(issues, warnings, scores)
+    ]
+    return results, plan.timings
+
+
+def compile_plan(include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None) -> ValidationPlan:
+    """
+    Build a plan from the registered rules
+
+    Args:
+        include: Rule names to run (default: all registered rules)
+        exclude: Rule names to skip
+    """
+    names = list(RULES) if include is None else list(include)
+    skipped = list(exclude or ())
+    unknown = [name for name in names + skipped if name not in RULES]
+    if unknown:
+        raise ValueError(f"Unknown validation rules: {', '.join(unknown)}")
+    # Registration order decides message order, whatever order names were given in
+    return ValidationPlan([rule for name, rule in RULES.items() if name in names and name not in skipped])
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch